@@ -0,0 +1,196 @@
+from bisect import bisect_right
+from time import perf_counter
+
+from walk_core import (
+    BTN_LEFT,
+    BTN_RIGHT,
+    BTN_SHIFT,
+    BTN_SPACE,
+    BTN_S,
+    KIND_FLASHLIGHT,
+    KIND_OBSTACLE,
+    KIND_POWER,
+    KIND_TRASH,
+)
+
+# 先読みで入力を決める自動操縦
+# 落下物は全て同じ速さで落ちるので、各落下物が犬の高さにいるフレームの範囲は犬の動きに関係なく決まる
+# それを最初に 1 回だけ求めておき、犬の x だけを入力の並びごとに進めて当たりを調べる
+# WalkSim はコピーせず、配列を読むだけ
+
+# 1 区間の間押し続ける入力（何も押さなければ今の向きのまま進む）
+ACTIONS = (0, BTN_LEFT, BTN_RIGHT, BTN_LEFT | BTN_SHIFT, BTN_RIGHT | BTN_SHIFT)
+
+DEATH = -100000.0
+
+
+class Autopilot:
+    # policy(sim) と同じ形で呼ぶと、そのフレームの入力を返す
+    # 1 手目を first_ticks フレーム、2 手目を second_ticks フレーム押し続けた 5 x 5 通りを調べる
+    # budget 秒を超えたら残りの 1 手目は 2 手目を同じ入力の続きだけにして打ち切る
+
+    def __init__(self, first_ticks=6, second_ticks=18, budget=0.001):
+        self.first_ticks = first_ticks
+        self.second_ticks = second_ticks
+        self.horizon = first_ticks + second_ticks
+        self.budget = budget
+        self.over_budget = 0  # 時間切れで打ち切った回数
+        self.last_time = 0.0  # 直前の判断にかかった時間
+
+    def __call__(self, sim):
+        if not sim.game_started:
+            return BTN_S
+        if sim.game_over or sim.is_cleared:
+            return 0
+        t0 = perf_counter()
+        buttons = self.plan(sim)
+        if self.should_fire(sim):
+            buttons |= BTN_SPACE
+        self.last_time = perf_counter() - t0
+        return buttons
+
+    def should_fire(self, sim):
+        # パワーアップ中、弾が当たるレーンに障害物があれば撃つ
+        if not sim.has_power or sim.reload_timer > 0:
+            return False
+        x = sim.pet_x + 3
+        for lane_no, center in enumerate(sim.lane_centers):
+            if abs(center - x) < 12:
+                for pool, i in sim.lane_index.lanes[lane_no]:
+                    if pool is sim.obstacles and pool.y[i] < sim.pet_y:
+                        return True
+        return False
+
+    def prepare(self, sim):
+        # 先読みの間の落下距離・便意の増加量・回復量と、フレームごとに犬の高さにいる落下物を求める
+        horizon = self.horizon
+        speed = sim.speed
+        fall = [0.0] * (horizon + 1)
+        poop_inc = [0.0] * (horizon + 1)
+        heal = [0.0] * (horizon + 1)
+        poop_mult = sim.poop_speed_multiplier
+        heal_mult = sim.heal_multiplier
+        total = 0.0
+        for t in range(1, horizon + 1):
+            if speed < sim.max_speed:
+                speed += sim.speed_increase
+            total += speed
+            fall[t] = total
+            poop_mult += sim.poop_acceleration
+            poop_inc[t] = sim.base_poop_increase * poop_mult
+            heal_mult += sim.heal_acceleration
+            heal[t] = sim.base_heal_amount * heal_mult
+
+        kinds = {
+            id(sim.obstacles): KIND_OBSTACLE,
+            id(sim.trash_bags): KIND_TRASH,
+            id(sim.power_items): KIND_POWER,
+            id(sim.flashlight_items): KIND_FLASHLIGHT,
+        }
+        pet_y = sim.pet_y
+        active = [[] for _ in range(horizon + 1)]  # t -> [(x, 種類, 番号)]
+        later = []  # 先読みより後に犬の高さに来るもの (x, 種類, 何フレーム後か)
+        n = 0
+        for lane in sim.lane_index.lanes:
+            for pool, i in lane:
+                y = pool.y[i]
+                if y >= pet_y + 12:
+                    continue
+                kind = kinds[id(pool)]
+                x = pool.x[i]
+                # 犬の高さ（pet_y - 12 < y < pet_y + 12）にいるフレームの範囲
+                first = bisect_right(fall, pet_y - 12 - y, 1)
+                if first > horizon:
+                    # 先読みの後も同じ速さで落ちるとして到着までのフレーム数を見積もる
+                    later.append((x, kind, horizon + (pet_y - 12 - y - fall[horizon]) / max(speed, 0.1)))
+                    continue
+                for t in range(first, horizon + 1):
+                    if y + fall[t] >= pet_y + 12:
+                        break
+                    active[t].append((x, kind, n))
+                n += 1
+        return poop_inc, heal, active, later
+
+    def plan(self, sim):
+        start = perf_counter()
+        poop_inc, heal, active, later = self.prepare(sim)
+        root = (sim.pet_x, sim.pet_vx, sim.stamina_gauge, sim.poop_gauge, 0, 0.0)
+        first = self.first_ticks
+        second = self.second_ticks
+
+        def advance(state, buttons, t, n):
+            # state から buttons を n フレーム押し続けた後の状態（死んだら None と死んだフレーム）
+            x, vx, stamina, poop, picked, reward = state
+            dash = buttons & BTN_SHIFT
+            left = buttons & BTN_LEFT
+            right = buttons & BTN_RIGHT
+            for t in range(t, t + n):
+                if dash and stamina > 0:
+                    stamina -= 1
+                elif stamina < 100:
+                    stamina += 0.2
+                speed = sim.pet_speed_fast if (dash and stamina > 0) else sim.pet_speed
+                if left:
+                    vx = -speed
+                elif right:
+                    vx = speed
+                x += vx
+                if x < sim.left_wall:
+                    x = sim.left_wall
+                    vx = -vx
+                if x > sim.right_wall:
+                    x = sim.right_wall
+                    vx = -vx
+                poop += poop_inc[t]
+                for ex, kind, k in active[t]:
+                    if abs(ex - x) >= 12 or picked >> k & 1:
+                        continue
+                    if kind == KIND_OBSTACLE:
+                        return None, t
+                    picked |= 1 << k
+                    if kind == KIND_TRASH:
+                        poop = max(poop - heal[t], 0)
+                    elif kind == KIND_POWER:
+                        reward += 30
+                    else:
+                        reward += 5
+                if poop >= 100:
+                    return None, t
+            return (x, vx, stamina, poop, picked, reward), t + 1
+
+        def value(state):
+            # 先読みの終わりの評価: 拾ったもの、便意の高さ、その先の障害物と（便意が高いときは）ゴミ袋への近さ
+            x, vx, stamina, poop, picked, reward = state
+            score = reward - max(0.0, poop - 40) * 3 + stamina * 0.05
+            for ex, kind, t in later:
+                dx = abs(ex - x)
+                if kind == KIND_OBSTACLE:
+                    if dx < 16:
+                        score -= 400 / (1 + t - self.horizon)
+                elif kind == KIND_TRASH and poop > 50:
+                    score -= dx * (poop - 50) * 0.05
+            return score
+
+        best_score = DEATH * 2
+        best_action = 0
+        for a, action in enumerate(ACTIONS):
+            state, t = advance(root, action, 1, first)
+            if state is None:
+                score = DEATH + t
+            else:
+                # 時間切れなら 2 手目は同じ入力の続きだけを見る
+                if a > 0 and perf_counter() - start > self.budget:
+                    seconds = (action,)
+                    self.over_budget += 1
+                else:
+                    seconds = ACTIONS
+                score = DEATH * 2
+                for action2 in seconds:
+                    end, t2 = advance(state, action2, t, second)
+                    s = DEATH + t2 if end is None else value(end)
+                    if s > score:
+                        score = s
+            if score > best_score:
+                best_score = score
+                best_action = action
+        return best_action
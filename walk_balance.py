@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+
+from walk_bots import POLICIES, policy_inputs
+from walk_core import GAME_OVER_REASONS, WalkSim
+from walk_turbo import run_to_end
+
+# バランス調整用: パラメータの組み合わせごとに N 個のシードを自動プレイし、
+# クリア率・ゲームオーバーの理由・進行度の分布を列ごとの配列（.npz）にまとめる
+#
+#   python walk_balance.py --grid max_speed=3,4,5 --grid min_spawn_distance=30,40 \
+#       --seeds 1000 --policy dodge --out results.npz
+
+# 変えられるパラメータ（WalkSim の同名の属性を上書きする）
+PARAMS = (
+    "speed_increase",
+    "max_speed",
+    "min_spawn_distance",
+    "base_poop_increase",
+    "poop_acceleration",
+    "heal_acceleration",
+    "spawn_roll",
+    "spawn_period",
+    "min_spawn_interval",
+    "day_speed_range",
+    "night_speed_range",
+)
+RANGE_PARAMS = ("day_speed_range", "night_speed_range")
+
+# 1 回のプレイの結果の番号（0 はクリア、それ以外は GAME_OVER_REASONS の番号、最後は時間切れ）
+OUTCOMES = ("cleared",) + GAME_OVER_REASONS[1:] + ("unfinished",)
+PROGRESS_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def parse_value(name, text):
+    if name in RANGE_PARAMS:
+        low, high = text.split(":")
+        return (float(low), float(high))
+    if name in ("spawn_roll", "min_spawn_interval"):
+        return int(text)
+    return float(text)
+
+
+def parse_grid(specs):
+    # ["max_speed=3,4", ...] -> (名前のタプル, 値の組み合わせのリスト)
+    names = []
+    values = []
+    for spec in specs:
+        name, _, text = spec.partition("=")
+        if name not in PARAMS:
+            raise SystemExit(f"unknown parameter: {name} (choose from {', '.join(PARAMS)})")
+        names.append(name)
+        values.append([parse_value(name, v) for v in text.split(",")])
+    return tuple(names), list(product(*values))
+
+
+def play_chunk(names, cell, policy, seeds, max_ticks):
+    # 1 つのワーカーで seeds を順にプレイし、(結果の番号, 進行度, ステップ数) の配列を返す
+    outcomes = array("b")
+    progress = array("f")
+    ticks = array("i")
+    make_policy = POLICIES[policy]
+    done = lambda sim: sim.game_over or sim.is_cleared
+    for seed in seeds:
+        sim = WalkSim(seed)
+        for name, value in zip(names, cell):
+            setattr(sim, name, value)
+        n = run_to_end(sim, policy_inputs(sim, make_policy(seed)), max_ticks, done)
+        if sim.is_cleared:
+            outcomes.append(0)
+        elif sim.game_over:
+            outcomes.append(GAME_OVER_REASONS.index(sim.game_over_reason))
+        else:
+            outcomes.append(len(OUTCOMES) - 1)
+        progress.append(sim.progress / sim.max_progress)
+        ticks.append(n)
+    return outcomes, progress, ticks
+
+
+def run_grid(names, cells, policy="dodge", seeds=100, first_seed=0, max_ticks=20000,
+             workers=None, chunk=50):
+    # 組み合わせ × シードをチャンクに分けてプロセスプールで回し、列ごとの配列を返す
+    # シードは組み合わせごとに同じものを使う（比べやすいように）
+    tasks = []
+    for c, cell in enumerate(cells):
+        for start in range(first_seed, first_seed + seeds, chunk):
+            tasks.append((c, range(start, min(start + chunk, first_seed + seeds))))
+
+    n = len(cells) * seeds
+    run_cell = np.empty(n, dtype=np.int32)
+    run_seed = np.empty(n, dtype=np.int64)
+    run_outcome = np.empty(n, dtype=np.int8)
+    run_progress = np.empty(n, dtype=np.float32)
+    run_ticks = np.empty(n, dtype=np.int32)
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(play_chunk, names, cells[c], policy, chunk_seeds, max_ticks)
+            for c, chunk_seeds in tasks
+        ]
+        k = 0
+        for (c, chunk_seeds), future in zip(tasks, futures):
+            outcomes, progress, ticks = future.result()
+            m = len(chunk_seeds)
+            run_cell[k:k + m] = c
+            run_seed[k:k + m] = chunk_seeds
+            run_outcome[k:k + m] = np.frombuffer(outcomes, dtype=np.int8)
+            run_progress[k:k + m] = np.frombuffer(progress, dtype=np.float32)
+            run_ticks[k:k + m] = np.frombuffer(ticks, dtype=np.int32)
+            k += m
+
+    return {
+        "run_cell": run_cell,
+        "run_seed": run_seed,
+        "run_outcome": run_outcome,
+        "run_progress": run_progress,
+        "run_ticks": run_ticks,
+    }
+
+
+def summarize(names, cells, runs):
+    # 組み合わせごとの集計（1 列 1 配列）
+    columns = {}
+    for j, name in enumerate(names):
+        if name in RANGE_PARAMS:
+            columns[name + "_low"] = np.array([cell[j][0] for cell in cells])
+            columns[name + "_high"] = np.array([cell[j][1] for cell in cells])
+        else:
+            columns[name] = np.array([cell[j] for cell in cells])
+
+    counts = np.zeros((len(cells), len(OUTCOMES)), dtype=np.int64)
+    np.add.at(counts, (runs["run_cell"], runs["run_outcome"]), 1)
+    total = counts.sum(axis=1)
+    columns["runs"] = total
+    columns["clear_rate"] = counts[:, 0] / np.maximum(total, 1)
+    for k, name in enumerate(OUTCOMES[1:], 1):
+        columns["rate_" + outcome_key(name)] = counts[:, k] / np.maximum(total, 1)
+
+    progress = [runs["run_progress"][runs["run_cell"] == c] for c in range(len(cells))]
+    for p in PROGRESS_PERCENTILES:
+        columns[f"progress_p{p}"] = np.array([np.percentile(v, p) if len(v) else 0.0 for v in progress])
+    columns["progress_mean"] = np.array([v.mean() if len(v) else 0.0 for v in progress])
+    ticks = [runs["run_ticks"][runs["run_cell"] == c] for c in range(len(cells))]
+    columns["ticks_mean"] = np.array([v.mean() if len(v) else 0.0 for v in ticks])
+    return columns
+
+
+def outcome_key(name):
+    # ゲームオーバーの理由を列名に使える形にする
+    return {
+        "Look ahead!!": "obstacle",
+        "Don't leave the poop behind!!": "poop",
+    }.get(name, name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="パラメータの組み合わせごとに自動プレイして集計する")
+    parser.add_argument("--grid", action="append", default=[], metavar="NAME=V1,V2",
+                        help="変えるパラメータと値（範囲は LOW:HIGH）。複数指定で全組み合わせ")
+    parser.add_argument("--seeds", type=int, default=100, help="組み合わせごとのシード数")
+    parser.add_argument("--first-seed", type=int, default=0)
+    parser.add_argument("--policy", default="dodge", choices=sorted(POLICIES))
+    parser.add_argument("--max-ticks", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk", type=int, default=50, help="1 タスクでプレイするシード数")
+    parser.add_argument("--out", default="balance.npz", help="結果（列ごとの配列）の保存先")
+    args = parser.parse_args(argv)
+
+    names, cells = parse_grid(args.grid)
+    runs = run_grid(names, cells, args.policy, args.seeds, args.first_seed, args.max_ticks,
+                    args.workers, args.chunk)
+    columns = summarize(names, cells, runs)
+    np.savez_compressed(args.out, **columns, **runs)
+
+    for c, cell in enumerate(cells):
+        label = ", ".join(f"{name}={value}" for name, value in zip(names, cell)) or "defaults"
+        print(f"{label}: clear {columns['clear_rate'][c]:.1%}  "
+              f"obstacle {columns['rate_obstacle'][c]:.1%}  poop {columns['rate_poop'][c]:.1%}  "
+              f"progress p50 {columns['progress_p50'][c]:.0%}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
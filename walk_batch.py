@@ -0,0 +1,338 @@
+import numpy as np
+
+from walk_core import (
+    WalkSim,
+    BTN_LEFT,
+    BTN_RIGHT,
+    BTN_SHIFT,
+    BTN_SPACE,
+    KIND_FLASHLIGHT,
+    KIND_OBSTACLE,
+    KIND_POWER,
+    KIND_TRASH,
+)
+
+# ゲームごとに変えられる調整用パラメータ（既定値は WalkSim から取る）
+TUNING = (
+    "speed_increase",
+    "max_speed",
+    "min_spawn_distance",
+    "spawn_period",
+    "min_spawn_interval",
+    "base_poop_increase",
+    "poop_acceleration",
+    "base_heal_amount",
+    "heal_acceleration",
+    "pet_speed",
+    "pet_speed_fast",
+    "power_duration",
+    "flashlight_duration",
+    "reload_time",
+    "bullet_vy",
+    "max_progress",
+)
+
+
+class BatchWalkSim:
+    # N 本の WalkSim を NumPy で同時に 1 フレームずつ進める
+    # スタート画面とクリア演出は省略し、プレイ中のみを扱う
+    # 乱数の引き方は WalkSim と違うので 1 本ずつの結果は一致しないが、分布は同じ
+    # level（walk_level.Level）を渡すと、そのレベルのレーンや調整用の値で進める（エンドレスのステージごとの上がり方は入れない）
+    # 落下物と弾の配列は WalkSim の EntityPool と同じく、空きがなくなったら広げる（生成を捨てない）
+
+    def __init__(self, n, seed=0, capacity=16, bullet_capacity=4, level=None, **params):
+        self.n = n
+        self.capacity = capacity
+        self.bullet_capacity = bullet_capacity
+        self.rng = np.random.default_rng(seed)
+        self.frame_count = 1  # WalkSim で S を押した次のフレームに合わせる
+
+        defaults = WalkSim()
+        if level is not None:
+            level.apply(defaults)
+        self.defaults = defaults  # reset_rows で使う初期値
+        self.width = defaults.width
+        self.height = defaults.height
+        self.lane_centers = np.array(defaults.lane_centers, dtype=np.float64)
+        self.left_wall = defaults.left_wall
+        self.right_wall = defaults.right_wall
+        self.pet_y = defaults.pet_y
+
+        for name in TUNING:
+            value = params.pop(name, getattr(defaults, name))
+            setattr(self, name, np.broadcast_to(np.asarray(value, dtype=np.float64), (n,)).copy())
+        # 日中・夜明けの速度の範囲、アイテム出現の抽選幅（rndi(0, 20) の 20）
+        self.day_speed_range = params.pop("day_speed_range", defaults.day_speed_range)
+        self.night_speed_range = params.pop("night_speed_range", defaults.night_speed_range)
+        spawn_roll = params.pop("spawn_roll", defaults.spawn_roll)
+        self.spawn_roll = np.broadcast_to(np.asarray(spawn_roll, dtype=np.int64), (n,)).copy()
+        if params:
+            raise TypeError("unknown parameters: " + ", ".join(sorted(params)))
+
+        self.pet_x = np.full(n, float(defaults.pet_x))
+        self.pet_vx = np.full(n, defaults.pet_vx)
+        self.poop_gauge = np.zeros(n)
+        self.stamina_gauge = np.full(n, 100.0)
+        self.speed = np.ones(n)
+        self.poop_speed_multiplier = np.ones(n)
+        self.heal_multiplier = np.ones(n)
+        self.score = np.zeros(n)
+        self.progress = np.zeros(n)
+
+        self.day_cycle = np.zeros(n)
+        self.day_speed = np.full(n, defaults.day_speed)
+        self.night_speed = np.full(n, defaults.night_speed)
+        self.is_darkening = np.ones(n, dtype=bool)
+
+        self.has_power = np.zeros(n, dtype=bool)
+        self.power_timer = np.zeros(n)
+        self.has_flashlight = np.zeros(n, dtype=bool)
+        self.fl_timer = np.zeros(n)
+        self.reload_timer = np.zeros(n)
+
+        self.game_over = np.zeros(n, dtype=bool)
+        self.is_cleared = np.zeros(n, dtype=bool)
+        # 0: 続行中, 1: "Look ahead!!", 2: "Don't leave the poop behind!!"
+        self.game_over_reason = np.zeros(n, dtype=np.int8)
+        self.end_frame = np.zeros(n, dtype=np.int64)
+
+        # 落下物（固定長の配列 + 生存マスク）
+        self.ent_x = np.zeros((n, capacity))
+        self.ent_y = np.zeros((n, capacity))
+        self.ent_kind = np.zeros((n, capacity), dtype=np.int8)
+        self.ent_alive = np.zeros((n, capacity), dtype=bool)
+
+        # 弾
+        self.bullet_x = np.zeros((n, bullet_capacity))
+        self.bullet_y = np.zeros((n, bullet_capacity))
+        self.bullet_alive = np.zeros((n, bullet_capacity), dtype=bool)
+
+    def reset_rows(self, rows):
+        # rows のゲームを最初から（プレイ開始直後の状態に）やり直す
+        # frame_count と乱数は WalkSim.reset_game と同じく続きから
+        defaults = self.defaults
+        self.pet_x[rows] = defaults.pet_x
+        self.pet_vx[rows] = defaults.pet_vx
+        self.poop_gauge[rows] = 0
+        self.stamina_gauge[rows] = 100.0
+        self.speed[rows] = 1.0
+        self.poop_speed_multiplier[rows] = 1.0
+        self.heal_multiplier[rows] = 1.0
+        self.score[rows] = 0
+        self.progress[rows] = 0
+
+        self.day_cycle[rows] = 0
+        self.day_speed[rows] = defaults.day_speed
+        self.night_speed[rows] = defaults.night_speed
+        self.is_darkening[rows] = True
+
+        self.has_power[rows] = False
+        self.power_timer[rows] = 0
+        self.has_flashlight[rows] = False
+        self.fl_timer[rows] = 0
+        self.reload_timer[rows] = 0
+
+        self.game_over[rows] = False
+        self.is_cleared[rows] = False
+        self.game_over_reason[rows] = 0
+        self.end_frame[rows] = 0
+        self.ent_alive[rows] = False
+        self.bullet_alive[rows] = False
+
+    @property
+    def active(self):
+        return ~(self.game_over | self.is_cleared)
+
+    def step(self, buttons=0):
+        active = self.active
+        if not active.any():
+            return
+        buttons = np.broadcast_to(np.asarray(buttons, dtype=np.int64), (self.n,))
+        rng = self.rng
+
+        # 昼夜サイクルの更新
+        dark = active & self.is_darkening
+        light = active & ~self.is_darkening
+        np.add(self.day_cycle, self.day_speed, out=self.day_cycle, where=dark)
+        np.add(self.day_cycle, self.night_speed, out=self.day_cycle, where=light)
+        to_night = dark & (self.day_cycle >= 0.5)
+        to_day = light & (self.day_cycle >= 0.6)
+        if to_night.any():
+            self.is_darkening[to_night] = False
+            self.day_cycle[to_night] = 0.5
+            self.night_speed[to_night] = rng.uniform(*self.night_speed_range, size=int(to_night.sum()))
+        if to_day.any():
+            self.is_darkening[to_day] = True
+            self.day_cycle[to_day] = 0
+            self.day_speed[to_day] = rng.uniform(*self.day_speed_range, size=int(to_day.sum()))
+
+        # 便意ゲージ・回復倍率・スピード
+        np.add(self.poop_speed_multiplier, self.poop_acceleration, out=self.poop_speed_multiplier, where=active)
+        np.add(self.poop_gauge, self.base_poop_increase * self.poop_speed_multiplier, out=self.poop_gauge, where=active)
+        np.add(self.heal_multiplier, self.heal_acceleration, out=self.heal_multiplier, where=active)
+        np.add(self.speed, self.speed_increase, out=self.speed, where=active & (self.speed < self.max_speed))
+
+        self._spawn(active)
+
+        # 犬の移動
+        dash = (buttons & BTN_SHIFT) != 0
+        use_stamina = active & dash & (self.stamina_gauge > 0)
+        recover = active & ~use_stamina & (self.stamina_gauge < 100)
+        np.subtract(self.stamina_gauge, 1, out=self.stamina_gauge, where=use_stamina)
+        np.add(self.stamina_gauge, 0.2, out=self.stamina_gauge, where=recover)
+        current_speed = np.where(dash & (self.stamina_gauge > 0), self.pet_speed_fast, self.pet_speed)
+        left = active & ((buttons & BTN_LEFT) != 0)
+        right = active & ~left & ((buttons & BTN_RIGHT) != 0)
+        np.negative(current_speed, out=self.pet_vx, where=left)
+        np.copyto(self.pet_vx, current_speed, where=right)
+        np.add(self.pet_x, self.pet_vx, out=self.pet_x, where=active)
+        hit_wall = active & ((self.pet_x < self.left_wall) | (self.pet_x > self.right_wall))
+        np.clip(self.pet_x, self.left_wall, self.right_wall, out=self.pet_x)
+        np.negative(self.pet_vx, out=self.pet_vx, where=hit_wall)
+
+        # 落下物の移動と犬との当たり判定
+        alive = self.ent_alive & active[:, None]
+        np.add(self.ent_y, self.speed[:, None], out=self.ent_y, where=alive)
+        self.ent_alive &= ~(alive & (self.ent_y > self.height))
+        # 犬の高さにいる落下物がある行だけ x 方向を調べる
+        near = alive & (self.ent_y > self.pet_y - 12) & (self.ent_y < self.pet_y + 12)
+        rows = np.nonzero(near.any(axis=1))[0]
+        if rows.size:
+            touch = near[rows] & (np.abs(self.ent_x[rows] - self.pet_x[rows, None]) < 12)
+            kind = self.ent_kind[rows]
+            crashed = (touch & (kind == KIND_OBSTACLE)).any(axis=1)
+            self.game_over_reason[rows[crashed]] = 1
+            self.game_over[rows[crashed]] = True
+            eaten = (touch & (kind == KIND_TRASH)).sum(axis=1)
+            heal = eaten * self.base_heal_amount[rows] * self.heal_multiplier[rows]
+            self.poop_gauge[rows] = np.maximum(self.poop_gauge[rows] - heal, 0)
+            powered = rows[(touch & (kind == KIND_POWER)).any(axis=1)]
+            self.has_power[powered] = True
+            self.power_timer[powered] = self.power_duration[powered]
+            lit = rows[(touch & (kind == KIND_FLASHLIGHT)).any(axis=1)]
+            self.has_flashlight[lit] = True
+            self.fl_timer[lit] = self.flashlight_duration[lit]
+            self.ent_alive[rows] &= ~(touch & (kind != KIND_OBSTACLE))
+
+        burst = active & (self.poop_gauge >= 100)
+        self.game_over_reason[burst & (self.game_over_reason == 0)] = 2
+        self.game_over |= burst
+
+        # スコアとタイマー
+        np.add(self.score, self.speed * 0.1, out=self.score, where=active)
+        powered = active & self.has_power
+        np.subtract(self.power_timer, 1, out=self.power_timer, where=powered)
+        self.has_power &= ~(powered & (self.power_timer <= 0))
+        np.subtract(self.fl_timer, 1, out=self.fl_timer, where=active & self.has_flashlight)
+        self.has_flashlight &= ~(active & (self.fl_timer <= 0))
+        np.subtract(self.reload_timer, 1, out=self.reload_timer, where=active & (self.reload_timer > 0))
+
+        self._shoot(active, buttons)
+
+        # 進行度とクリア判定
+        np.add(self.progress, 0.5, out=self.progress, where=active)
+        self.is_cleared |= active & (self.progress >= self.max_progress)
+        ended = active & ~self.active
+        self.end_frame[ended] = self.frame_count
+
+        self.frame_count += 1
+
+    def _spawn(self, active):
+        spawn_interval = np.trunc(self.spawn_period / self.speed)
+        spawn_interval = np.maximum(self.min_spawn_interval, spawn_interval).astype(np.int64)
+        spawning = active & (self.frame_count % spawn_interval == 0)
+        if not spawning.any():
+            return
+        rng = self.rng
+        rows = np.nonzero(spawning)[0]
+        ent_x = self.ent_x[rows]
+        near = self.ent_alive[rows] & (np.abs(self.ent_y[rows]) < self.min_spawn_distance[rows, None])
+
+        # 各レーンが空いているか（同じレーンと隣接レーンもチェック）
+        n_lanes = len(self.lane_centers)
+        free = np.empty((rows.size, n_lanes), dtype=bool)
+        for lane in range(n_lanes):
+            free[:, lane] = ~(near & (np.abs(ent_x - self.lane_centers[lane]) <= 40)).any(axis=1)
+        n_free = free.sum(axis=1)
+        ok = n_free > 0
+        rows, free, n_free = rows[ok], free[ok], n_free[ok]
+        if rows.size == 0:
+            return
+
+        # 空いているレーンから 1 つ選ぶ
+        pick = (rng.random(rows.size) * n_free).astype(np.int64)
+        lane = np.argmax(np.cumsum(free, axis=1) > pick[:, None], axis=1)
+        is_item = rng.integers(0, self.spawn_roll[rows] + 1) < 1
+        coin = rng.integers(0, 2, size=rows.size)
+        kind = np.where(is_item, np.where(coin, KIND_FLASHLIGHT, KIND_POWER),
+                        np.where(coin, KIND_TRASH, KIND_OBSTACLE))
+        x = self.lane_centers[lane] + np.where(is_item, 2, 0)
+
+        # 空きスロットに入れる（どれかのゲームで満杯なら先に広げる）
+        if self.ent_alive[rows].all(axis=1).any():
+            self._grow_entities()
+        slot = np.argmin(self.ent_alive[rows], axis=1)
+        self.ent_x[rows, slot] = x
+        self.ent_y[rows, slot] = 0
+        self.ent_kind[rows, slot] = kind
+        self.ent_alive[rows, slot] = True
+
+    def _grow_entities(self):
+        # 落下物の配列を 2 倍にする（増えたスロットは空き）
+        extra = self.capacity
+        self.ent_x = np.pad(self.ent_x, ((0, 0), (0, extra)))
+        self.ent_y = np.pad(self.ent_y, ((0, 0), (0, extra)))
+        self.ent_kind = np.pad(self.ent_kind, ((0, 0), (0, extra)))
+        self.ent_alive = np.pad(self.ent_alive, ((0, 0), (0, extra)))
+        self.capacity += extra
+
+    def _grow_bullets(self):
+        extra = self.bullet_capacity
+        self.bullet_x = np.pad(self.bullet_x, ((0, 0), (0, extra)))
+        self.bullet_y = np.pad(self.bullet_y, ((0, 0), (0, extra)))
+        self.bullet_alive = np.pad(self.bullet_alive, ((0, 0), (0, extra)))
+        self.bullet_capacity += extra
+
+    def _shoot(self, active, buttons):
+        # 弾の発射
+        fire = active & self.has_power & ((buttons & BTN_SPACE) != 0) & (self.reload_timer == 0)
+        if fire.any():
+            rows = np.nonzero(fire)[0]
+            if self.bullet_alive[rows].all(axis=1).any():
+                self._grow_bullets()
+            slot = np.argmin(self.bullet_alive[rows], axis=1)
+            self.bullet_x[rows, slot] = self.pet_x[rows] + 3
+            self.bullet_y[rows, slot] = self.pet_y
+            self.bullet_alive[rows, slot] = True
+            self.reload_timer[rows] = self.reload_time[rows]
+
+        # 弾の移動と当たり判定（弾のスロット順に処理）
+        moving = self.bullet_alive & active[:, None]
+        np.add(self.bullet_y, self.bullet_vy[:, None], out=self.bullet_y, where=moving)
+        self.bullet_alive &= ~(moving & (self.bullet_y < -10))
+        obstacles = self.ent_alive & (self.ent_kind == KIND_OBSTACLE)
+        for b in range(self.bullet_capacity):
+            live = self.bullet_alive[:, b] & active
+            if not live.any():
+                continue
+            hit = (
+                obstacles
+                & live[:, None]
+                & (np.abs(self.bullet_x[:, b, None] - self.ent_x) < 12)
+                & (np.abs(self.bullet_y[:, b, None] - self.ent_y) < 12)
+            )
+            rows = np.nonzero(hit.any(axis=1))[0]
+            if rows.size == 0:
+                continue
+            slot = np.argmax(hit[rows], axis=1)
+            self.ent_alive[rows, slot] = False
+            obstacles[rows, slot] = False
+            self.bullet_alive[rows, b] = False
+
+    def run(self, policy=None, max_ticks=100000):
+        # policy(batch) -> ボタンのビットマスク配列。全ゲーム終了まで回す
+        for _ in range(max_ticks):
+            if not self.active.any():
+                break
+            self.step(0 if policy is None else policy(self))
+        return self
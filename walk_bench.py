@@ -0,0 +1,374 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+
+from walk_bots import dodge, zigzag
+from walk_core import BTN_P, BTN_R, BTN_S, BTN_SPACE, WalkSim
+from walk_draw import draw_pack, draw_scene
+from walk_framebuffer import Framebuffer
+from walk_level import load_level
+from walk_pack import PackSim, new_pack, pack_policy
+from walk_profile import FrameProfiler
+from walk_sprites import SpriteCache
+
+# 画面なしで動く負荷テスト。名前付きの場面ごとに update() と draw() の速さを計り、JSON に保存する
+# コミットごとに保存しておけば --compare で遅くなったところが分かる
+#
+#   python walk_bench.py --out bench.json                 # 全ての場面
+#   python walk_bench.py entities_10k bullet_storm        # 一部だけ
+#   python walk_bench.py --compare old.json --out new.json
+#
+# 場面ごとに新しいプロセスで動かす（最大 RSS が他の場面の影響を受けないように）
+# 描画は Framebuffer に draw_every フレームごとに行い、描画呼び出し数と時間を計る
+# メモリの確保は tracemalloc を有効にした別の区間（alloc_ticks フレーム）で計る
+# 長く動かしても重くならないことは、最初と最後の 1/10 の区間の update() の時間と RSS を比べて確かめる
+# （1/10 が MIN_WINDOW_TICKS フレームに満たない短い実行では計らず、JSON では null にする）
+
+
+MIN_WINDOW_TICKS = 100
+
+
+def keep_playing(sim):
+    # 負荷を一定に保つため、ゲームオーバーとクリアにならないようにする（エンドレスはステージを進める）
+    sim.game_over = False
+    sim.game_over_reason = ""
+    if sim.poop_gauge >= 90:
+        sim.poop_gauge = 0
+    if sim.endless is None and sim.progress >= sim.max_progress - 1:
+        sim.progress = 0
+
+
+def restart(policy):
+    # 終わったら R で最初からやり直しながら policy で遊び続ける
+    def play(sim):
+        if sim.game_over or sim.show_clear_screen:
+            return BTN_R
+        return policy(sim)
+    return play
+
+
+def fill_entities(sim, n):
+    # 落下物（障害物とゴミ袋を交互）を n 個まで足す
+    # レーンごとに一番上のものより gap だけ上に置くので、LaneIndex の y の順は崩れない
+    # gap は画面の高さに n 個がほぼ均等に並ぶ間隔
+    lanes = sim.lane_index.lanes
+    gap = len(lanes) * sim.height / n
+    pools = (sim.obstacles, sim.trash_bags)
+    total = len(sim.obstacles) + len(sim.trash_bags)
+    while total < n:
+        lane_no = total % len(lanes)
+        top = sim.height
+        if lanes[lane_no]:
+            pool, i = lanes[lane_no][-1]
+            top = pool.y[i]
+        pool = pools[total % 2]
+        sim.lane_index.add(pool, pool.spawn(sim.lane_centers[lane_no], top - gap, lane_no))
+        total += 1
+
+
+def started(seed, **params):
+    sim = WalkSim(seed)
+    for name, value in params.items():
+        setattr(sim, name, value)
+    sim.step(BTN_S)
+    return sim
+
+
+def scene_max_speed(seed):
+    # 最高速 4.0 で遊び続ける
+    sim = started(seed, max_speed=4.0)
+    sim.speed = 4.0
+    return sim, dodge, keep_playing
+
+
+def scene_flood(seed):
+    # 生成の最小距離を 0 にし、生成の間隔も 1 フレームまで詰めて画面を落下物で埋める
+    sim = started(seed, min_spawn_distance=0, spawn_period=0, min_spawn_interval=1, max_speed=4.0)
+    sim.speed = 4.0
+    return sim, dodge, keep_playing
+
+
+def scene_entities(n):
+    def scene(seed):
+        sim = started(seed)
+
+        def hook(sim):
+            keep_playing(sim)
+            fill_entities(sim, n)
+
+        hook(sim)
+        return sim, dodge, hook
+    return scene
+
+
+def scene_bullet_storm(seed):
+    # リロードなしで撃ち続ける（パワーアップは切らさない）
+    sim = started(seed, reload_time=0)
+
+    def hook(sim):
+        keep_playing(sim)
+        sim.has_power = True
+        sim.power_timer = sim.power_duration
+
+    def fire(sim):
+        return zigzag(sim) | BTN_SPACE
+
+    hook(sim)
+    return sim, fire, hook
+
+
+def scene_poops(n):
+    def scene(seed):
+        # クリア画面にうんちが n 個ある状態で、毎フレーム P を押して足し続ける（古いものから消える）
+        sim = started(seed, max_poops=n)
+        sim.poop_list = type(sim.poop_list)(maxlen=n)
+        sim.is_cleared = True
+        sim.show_clear_screen = True
+        while len(sim.poop_list) < n:
+            sim.step(BTN_P)
+        return sim, lambda sim: BTN_P, None
+    return scene
+
+
+def scene_soak(seed):
+    # 普通に遊んで、終わったらやり直すのを繰り返す
+    return WalkSim(seed), restart(dodge), None
+
+
+def scene_endless_soak(seed):
+    # エンドレスで死なずに何時間分も進め続ける（難しさは上限まで上がり、その後は一定）
+    sim = load_level("endless").new_sim(seed)
+    sim.step(BTN_S)
+    return sim, dodge, keep_playing
+
+
+def scene_pack(n):
+    def scene(seed):
+        # 群れモードで n 匹の dodge を遊ばせ続ける（倒れた犬は起こし、便意ゲージも戻す）
+        sim = new_pack(seed, n)
+        sim.step([BTN_S] * n)
+
+        def hook(sim):
+            keep_playing(sim)
+            for k in range(n):
+                sim.dog_alive[k] = 1
+                if sim.dog_poop[k] >= 90:
+                    sim.dog_poop[k] = 0
+            sim.dogs_alive = n
+
+        return sim, pack_policy([dodge] * n), hook
+    return scene
+
+
+# 名前 -> (作り方, フレーム数, 描画の間隔)
+SCENARIOS = {
+    "max_speed": (scene_max_speed, 20000, 10),
+    "flood": (scene_flood, 20000, 10),
+    "entities_1k": (scene_entities(1000), 5000, 10),
+    "entities_10k": (scene_entities(10000), 1000, 10),
+    "bullet_storm": (scene_bullet_storm, 20000, 10),
+    "poops_10k": (scene_poops(10000), 600, 10),
+    "soak_1m": (scene_soak, 1000000, 1000),
+    "pack_64": (scene_pack(64), 5000, 10),
+    "endless_soak": (scene_endless_soak, 1000000, 1000),  # 60 FPS で約 4.6 時間分
+}
+
+
+def run_ticks(sim, policy, hook, ticks):
+    # ticks フレーム進め、step() にかかった時間の合計を返す
+    step = sim.step
+    elapsed = 0.0
+    for _ in range(ticks):
+        buttons = policy(sim)
+        t0 = perf_counter()
+        step(buttons)
+        elapsed += perf_counter() - t0
+        if hook is not None:
+            hook(sim)
+    return elapsed
+
+
+def current_rss_kb():
+    # 今の RSS（/proc がなければ最大 RSS で代わりにする）
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_scenario(name, seed=0, scale=1.0, alloc_ticks=1000):
+    make, ticks, draw_every = SCENARIOS[name]
+    ticks = max(1, int(ticks * scale))
+    sim, policy, hook = make(seed)
+    draw = draw_pack if isinstance(sim, PackSim) else draw_scene
+
+    screen = Framebuffer()
+    sprites = SpriteCache(screen, bank=Framebuffer(256, 256))
+    profiler = FrameProfiler(window=max(1, ticks // draw_every + 1))
+    profiler.instrument(screen)
+
+    update_time = 0.0
+    entities = 0
+    done = 0
+    tenth = ticks // 10
+    windows = tenth >= MIN_WINDOW_TICKS
+    first = [0.0, 0]  # 最初の 1/10 の (時間, フレーム数)
+    last = [0.0, 0]   # 最後の 1/10
+    rss_first = None
+    drawn_at = 0
+    while done < ticks:
+        # 1/10 の区間の境目で区切る（区間の時間がちょうど 1/10 の分になるように）
+        n = min(drawn_at + draw_every, ticks) - done
+        for edge in (tenth, ticks - tenth):
+            if windows and done < edge < done + n:
+                n = edge - done
+        elapsed = run_ticks(sim, policy, hook, n)
+        update_time += elapsed
+        if done < tenth:
+            first[0] += elapsed
+            first[1] += n
+        elif done >= ticks - tenth:
+            last[0] += elapsed
+            last[1] += n
+        done += n
+        if windows and rss_first is None and done >= tenth:
+            rss_first = current_rss_kb()
+        if done - drawn_at < draw_every and done < ticks:
+            continue
+        drawn_at = done
+        entities += sum(len(pool) for pool in sim.pools)
+        profiler.start()
+        draw(screen, sim, sprites, sim.frame_count)
+        profiler.lap("draw")
+        profiler.count_sim(sim)
+        profiler.end_frame()
+    frames = profiler.frames
+    draw = profiler.stats()
+    rss_last = current_rss_kb()
+
+    # tracemalloc は遅くなるので別の区間で計る
+    alloc_ticks = min(alloc_ticks, ticks)
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks()
+    run_ticks(sim, policy, hook, alloc_ticks)
+    after, peak = tracemalloc.get_traced_memory()
+    blocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+
+    return {
+        "ticks": ticks,
+        "update_seconds": update_time,
+        "ticks_per_sec": ticks / update_time if update_time > 0 else 0.0,
+        "update_us_per_tick": update_time / ticks * 1e6,
+        "update_us_first_tenth": first[0] / first[1] * 1e6 if windows else None,
+        "update_us_last_tenth": last[0] / last[1] * 1e6 if windows else None,
+        "frames_drawn": frames,
+        "draw_us_p50": draw["frame"]["p50"],
+        "draw_us_p99": draw["frame"]["p99"],
+        "draw_us_mean": draw["frame"]["mean"],
+        "draw_calls_per_frame": draw["draw_calls"]["mean"],
+        "draw_calls_max": draw["draw_calls"]["max"],
+        "entities_mean": entities / frames if frames else 0.0,
+        "bullets_max": draw["bullets"]["max"],
+        "poops_max": draw["poops"]["max"],
+        "alloc_ticks": alloc_ticks,
+        "alloc_bytes_per_tick": (after - before) / alloc_ticks,
+        "alloc_blocks_per_tick": blocks / alloc_ticks,
+        "alloc_peak_bytes": peak - before,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_kb_first_tenth": rss_first,
+        "rss_kb_end": rss_last,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(old, new, threshold):
+    # 前の結果と比べて ticks/s と描画時間の変化を表示し、threshold 以上遅くなった場面の名前を返す
+    slower = []
+    for name, result in new["scenarios"].items():
+        base = old.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        speed = result["ticks_per_sec"] / base["ticks_per_sec"] if base["ticks_per_sec"] else 0.0
+        draw = base["draw_us_p50"] / result["draw_us_p50"] if result["draw_us_p50"] else 0.0
+        mark = ""
+        if speed < 1 - threshold or draw < 1 - threshold:
+            mark = "  <-- slower"
+            slower.append(name)
+        # 最初と最後の 1/10 の時間の比（長く動かすと重くなるか）。どちらかの実行が短くて計っていなければ出さない
+        drift = ""
+        if result.get("update_us_first_tenth") and base.get("update_us_first_tenth"):
+            drift = (f"  last/first 1/10 x{base['update_us_last_tenth'] / base['update_us_first_tenth']:.2f}"
+                     f" -> x{result['update_us_last_tenth'] / result['update_us_first_tenth']:.2f}")
+        print(f"{name:14} update x{speed:.2f}  draw x{draw:.2f}{drift}{mark}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="更新と描画の負荷テスト")
+    parser.add_argument("names", nargs="*", help=f"場面（省略で全て）: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="フレーム数の倍率（短く試すとき 0.1 など）")
+    parser.add_argument("--alloc-ticks", type=int, default=1000, help="tracemalloc で計るフレーム数")
+    parser.add_argument("--out", metavar="FILE", help="結果を JSON で保存する")
+    parser.add_argument("--compare", metavar="FILE", help="前の結果の JSON と比べる")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="これ以上遅くなったら終了コード 1（--compare のとき）")
+    args = parser.parse_args(argv)
+
+    names = args.names or list(SCENARIOS)
+    for name in names:
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario: {name} (choose from {', '.join(SCENARIOS)})")
+
+    results = {}
+    for name in names:
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as pool:
+            result = pool.submit(run_scenario, name, args.seed, args.scale, args.alloc_ticks).result()
+        results[name] = result
+        print(f"{name:14} {result['ticks_per_sec']:10,.0f} ticks/s  "
+              f"draw p50 {result['draw_us_p50']:7.0f}us  {result['draw_calls_per_frame']:7.1f} calls  "
+              f"alloc {result['alloc_bytes_per_tick']:7.1f} B/tick  rss {result['peak_rss_kb'] / 1024:.0f} MB  "
+              + (f"first/last 1/10 {result['update_us_first_tenth']:.1f}/{result['update_us_last_tenth']:.1f} us/tick  "
+                 f"{result['rss_kb_first_tenth'] / 1024:.0f}/{result['rss_kb_end'] / 1024:.0f} MB"
+                 if result["update_us_first_tenth"] is not None else "first/last 1/10 - (too short)"))
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "scale": args.scale,
+        "scenarios": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, report, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,114 @@
+from walk_autopilot import Autopilot
+from walk_core import (
+    BTN_LEFT,
+    BTN_RIGHT,
+    BTN_SHIFT,
+    BTN_SPACE,
+    BTN_S,
+    WalkRandom,
+)
+
+# スクリプトで動く自動プレイヤー（バランス調整用）
+# policy(sim) はそのフレームの入力ビットマスクを返す。タイトルでは S を押す
+
+
+def policy_inputs(sim, policy):
+    # sim の状態を見ながら 1 フレームずつ入力を作る（walk_turbo.run_to_end に渡す）
+    while True:
+        yield policy(sim)
+
+
+def idle(sim):
+    # 何も押さない（犬は壁で跳ね返りながら進む）
+    return 0 if sim.game_started else BTN_S
+
+
+def zigzag(sim):
+    # 60 フレームごとに左右を切り替える
+    if not sim.game_started:
+        return BTN_S
+    return BTN_LEFT if (sim.frame_count // 60) % 2 == 0 else BTN_RIGHT
+
+
+class RandomWalk:
+    # ランダムな間隔で左右を切り替え、パワーアップ中は撃つ
+    def __init__(self, seed=0):
+        self.rng = WalkRandom(seed)
+        self.buttons = 0
+        self.hold = 0
+
+    def __call__(self, sim):
+        if not sim.game_started:
+            return BTN_S
+        if self.hold <= 0:
+            self.buttons = (0, BTN_LEFT, BTN_RIGHT)[self.rng.randint(0, 2)]
+            self.hold = self.rng.randint(10, 60)
+        self.hold -= 1
+        if sim.has_power:
+            return self.buttons | BTN_SPACE
+        return self.buttons
+
+
+def nearest_lane(sim, x):
+    centers = sim.lane_centers
+    return min(range(len(centers)), key=lambda lane: abs(centers[lane] - x))
+
+
+def lane_gap(sim, lane, pool):
+    # lane で犬より上から近づいてくる pool の落下物までの距離（無ければ None）
+    pet_y = sim.pet_y
+    for p, i in sim.lane_index.lanes[lane]:
+        if p is pool:
+            dy = pet_y - p.y[i]
+            if dy > -12:
+                return dy
+    return None
+
+
+def steer(sim, target_x):
+    # 目標の x に向かう。着いたら左右を交互に押してその場に留まる
+    if sim.pet_x < target_x - 2:
+        return BTN_RIGHT
+    if sim.pet_x > target_x + 2:
+        return BTN_LEFT
+    return BTN_LEFT if sim.pet_vx > 0 else BTN_RIGHT
+
+
+def dodge(sim):
+    # 今のレーンに障害物が迫ったら空いているレーンへ走って移る
+    # 便意ゲージが高いときはゴミ袋のあるレーンへ向かい、パワーアップ中は撃つ
+    if not sim.game_started:
+        return BTN_S
+    current = nearest_lane(sim, sim.pet_x)
+    danger = 24 + 12 * sim.speed
+
+    def safe(lane):
+        gap = lane_gap(sim, lane, sim.obstacles)
+        return gap is None or gap > danger * (1 + abs(lane - current))
+
+    target = current
+    if sim.poop_gauge > 60:
+        bags = [(gap, lane) for lane in range(len(sim.lane_centers))
+                for gap in (lane_gap(sim, lane, sim.trash_bags),)
+                if gap is not None and safe(lane)]
+        if bags:
+            target = min(bags)[1]
+    if not safe(target):
+        choices = [lane for lane in range(len(sim.lane_centers)) if safe(lane)]
+        if choices:
+            target = min(choices, key=lambda lane: abs(lane - current))
+    buttons = steer(sim, sim.lane_centers[target])
+    if target != current:
+        buttons |= BTN_SHIFT
+    if sim.has_power:
+        buttons |= BTN_SPACE
+    return buttons
+
+
+POLICIES = {
+    "idle": lambda seed: idle,
+    "zigzag": lambda seed: zigzag,
+    "random": RandomWalk,
+    "dodge": lambda seed: dodge,
+    "autopilot": lambda seed: Autopilot(),
+}
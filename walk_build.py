@@ -0,0 +1,229 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+import pyxel
+
+# ブラウザ（pyxel.js）で遊ぶ dog_game.pyxapp と、それを開く index.html を build/ に作る
+# リポジトリの index.html はソースの walk_web.py をそのまま動かす（ビルドしなくても遊べる）。
+# build/ の中身を置けば、バイトコード入りで最初のフレームまでが短くなる
+#
+#   python walk_build.py                         # build/dog_game.pyxapp と build/index.html を作る
+#   python walk_build.py --python python3.12     # バイトコードを作る Python を指定する
+#   python walk_build.py --bench                 # 起動から最初のフレームまでの時間を比べる
+#
+# 中身:
+#   - ゲームで使うモジュール（RUNTIME_MODULES）と起動スクリプト walk_web.py
+#   - バイトコード（__pycache__/*.pyc）。.pyc は作った Python のバージョンでしか使われないので、
+#     pyxel.js の Pyodide と同じバージョン（WEB_PYTHON）の Python で作る。見つからなければ警告して入れない
+#     （入れても使われず、大きくなるだけ）。展開するとファイルの時刻が変わるので、時刻で確かめない形
+#     （unchecked-hash）で作る
+# pyxel package は __pycache__ を入れないので、zip は同じ形（<名前>/... と起動スクリプトの設定ファイル）で書く
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APP_NAME = "dog_game"
+STARTUP_SCRIPT = "walk_web.py"
+BUILD_DIR = os.path.join(ROOT, "build")
+
+# pyxel.js が動かす Pyodide の Python のバージョン（pyxel を上げて変わったら合わせる）
+WEB_PYTHON = "3.12"
+
+PAGE = """<script src="https://cdn.jsdelivr.net/gh/kitao/pyxel/wasm/pyxel.js"></script>
+<!-- python walk_build.py で作ったもの（同じフォルダの {name} を開く） -->
+<pyxel-play root="." name="{name}"></pyxel-play>
+"""
+
+# ブラウザ版で読むことのあるモジュール（F1 のプロファイラ・F2 のターボ・F3 の自動操縦の分も）
+# 群れ・ゴースト・ランキング・NumPy を使うもの（walk_batch など）はコマンドラインからしか使わないので入れない
+RUNTIME_MODULES = (
+    "walk_web",
+    "dog_test",
+    "walk_core",
+    "walk_pool",
+    "walk_clock",
+    "walk_draw",
+    "walk_sprites",
+    "walk_clear",
+    "walk_light",
+    "walk_autopilot",
+    "walk_bots",
+    "walk_profile",
+    "walk_turbo",
+    "walk_level",
+    "walk_endless",
+    "walk_replay",
+)
+
+
+def cache_tag(python):
+    # その Python の .pyc の名前に付く印（例: cpython-312）。動かせなければ None
+    try:
+        out = subprocess.run([python, "-c", "import sys; print(sys.implementation.cache_tag)"],
+                             capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.strip()
+
+
+def web_python(version=WEB_PYTHON):
+    # ブラウザ版と同じバージョンの Python（PATH の python3.12 など。なければ None）
+    tag = "cpython-" + version.replace(".", "")
+    for python in (sys.executable, shutil.which("python" + version)):
+        if python is not None and cache_tag(python) == tag:
+            return python
+    return None
+
+
+def stage(app_dir, python=None):
+    # app_dir にモジュールを集め、python を渡したらその Python でバイトコードを作る
+    if os.path.exists(app_dir):
+        shutil.rmtree(app_dir)
+    os.makedirs(app_dir)
+    for name in RUNTIME_MODULES:
+        shutil.copy(os.path.join(ROOT, name + ".py"), app_dir)
+    if python is not None:
+        subprocess.run([python, "-m", "compileall", "-q", "--invalidation-mode", "unchecked-hash", app_dir],
+                       check=True)
+
+
+def package(app_dir, path):
+    # pyxel package と同じ形の .pyxapp を書く（__pycache__ も入れる）
+    name = os.path.basename(app_dir)
+    parent = os.path.dirname(app_dir)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(f"{name}/{pyxel.APP_STARTUP_SCRIPT_FILE}", STARTUP_SCRIPT)
+        for folder, dirs, files in os.walk(app_dir):
+            dirs.sort()
+            for file in sorted(files):
+                file = os.path.join(folder, file)
+                zf.write(file, os.path.relpath(file, parent))
+    os.replace(tmp, path)
+
+
+def build(out_dir=BUILD_DIR, python=None):
+    # out_dir に .pyxapp とそれを開く index.html を書く（python はバイトコードを作る Python。None なら入れない）
+    app_dir = os.path.join(out_dir, APP_NAME)
+    path = os.path.join(out_dir, APP_NAME + pyxel.APP_FILE_EXTENSION)
+    stage(app_dir, python)
+    package(app_dir, path)
+    with open(os.path.join(out_dir, "index.html"), "w") as f:
+        f.write(PAGE.format(name=os.path.basename(path)))
+    return path
+
+
+# 起動の速さを計る子プロセス: pyxel の代わりに画面なしの pyxel.Image に描く物を渡して起動スクリプトを動かし、
+# 最初のフレームを描き終えるまでの時間と、それまでに読んだゲームのモジュールの数を出す
+# （pyxel 自体の読み込みはブラウザでは先に済んでいるので計らない）
+FIRST_FRAME = """
+import json, runpy, sys
+from time import perf_counter
+import pyxel
+
+class Headless:
+    def __init__(self):
+        self.screen = pyxel.Image(160, 120)
+        self.images = [pyxel.Image(256, 256) for _ in range(3)]
+        self.width, self.height, self.frame_count = 160, 120, 0
+    def __getattr__(self, name):
+        return getattr(self.screen if hasattr(self.screen, name) else pyxel, name)
+    def init(self, *args, **kwargs):
+        pass
+    def btn(self, key):
+        return False
+    btnp = btn
+    def rndi(self, a, b):
+        return a
+    def blt(self, x, y, img, *args):
+        self.screen.blt(x, y, self.images[img] if isinstance(img, int) else img, *args)
+    def run(self, update, draw):
+        update()
+        draw()
+        modules = sorted(name for name in sys.modules if name in RUNTIME_MODULES)
+        print(json.dumps({"first_frame_ms": (perf_counter() - start) * 1000, "modules": modules}))
+        raise SystemExit(0)
+
+RUNTIME_MODULES = set(sys.argv[2:])
+sys.modules["pyxel"] = Headless()
+sys.path.insert(0, sys.argv[1])
+start = perf_counter()
+runpy.run_path(sys.argv[1] + "/" + STARTUP_SCRIPT, run_name="__main__")
+"""
+
+
+def first_frame(app_dir):
+    # -B: .pyc は書かない（毎回ページを開いたときと同じに、ないものはその場でコンパイルする）
+    code = FIRST_FRAME.replace("STARTUP_SCRIPT", repr(STARTUP_SCRIPT))
+    out = subprocess.run([sys.executable, "-B", "-c", code, app_dir, *RUNTIME_MODULES],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+
+def bench(runs=10):
+    # 起動から最初のフレームまでの時間（中央値）を、.py だけのものとバイトコード入りのもので比べる
+    # 計るのはこの Python なので、バイトコードもこの Python で作る（.pyxapp の中身はブラウザ版のバージョン）
+    #   source:   .py だけ（リポジトリの index.html と同じ）
+    #   bytecode: .py とバイトコード（build/ の .pyxapp と同じ）
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        dirs = {
+            "source": os.path.join(tmp, "source", APP_NAME),
+            "bytecode": os.path.join(tmp, "bytecode", APP_NAME),
+        }
+        stage(dirs["source"])
+        stage(dirs["bytecode"], sys.executable)
+        for mode, app_dir in dirs.items():
+            times = []
+            for _ in range(runs):
+                result = first_frame(app_dir)
+                times.append(result["first_frame_ms"])
+            results[mode] = {"first_frame_ms": statistics.median(times), "modules": result["modules"]}
+    base = results["source"]["first_frame_ms"]
+    for mode, result in results.items():
+        print(f"{mode:9} first frame {result['first_frame_ms']:7.1f} ms  x{base / result['first_frame_ms']:.2f}  "
+              f"{len(result['modules'])} modules")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ブラウザ版の dog_game.pyxapp を作る")
+    parser.add_argument("--out", default=BUILD_DIR, help="書き出すフォルダ")
+    parser.add_argument("--python", help=f"バイトコードを作る Python（既定は PATH の python{WEB_PYTHON}）")
+    parser.add_argument("--web-python", default=WEB_PYTHON, help="ブラウザ版の Python のバージョン")
+    parser.add_argument("--bench", action="store_true", help="作ったあと、起動から最初のフレームまでの時間を比べる")
+    parser.add_argument("--runs", type=int, default=10, help="--bench で 1 つを起動する回数")
+    parser.add_argument("--json", metavar="FILE", help="--bench の結果を JSON で保存する")
+    args = parser.parse_args(argv)
+
+    tag = "cpython-" + args.web_python.replace(".", "")
+    # ブラウザ版と違うバージョンの .pyc は使われないので、作らずに警告する
+    if args.python is None:
+        python = web_python(args.web_python)
+        if python is None:
+            print(f"warning: no Python {args.web_python} found, building without bytecode (use --python)",
+                  file=sys.stderr)
+    else:
+        python = args.python
+        if cache_tag(python) != tag:
+            print(f"warning: {python} makes {cache_tag(python)} bytecode but the browser runs {tag}, "
+                  "building without bytecode", file=sys.stderr)
+            python = None
+    path = build(args.out, python)
+    print(f"{path}: {os.path.getsize(path) / 1024:.0f} KB "
+          f"({'no bytecode' if python is None else f'bytecode for {tag}'})")
+    if args.bench:
+        results = bench(args.runs)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
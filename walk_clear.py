@@ -0,0 +1,126 @@
+from walk_core import BTN_P, BTN_R
+from walk_sprites import poop_bounce
+
+# クリアのあとの演出（ドアが降りて開き、犬が入って閉まる → クリア画面）
+# 最後まで進んだときにしか使わないので、WalkSim.update と draw_scene から最初に要るときに読む
+# （起動時に読み込むモジュールを減らす。中身は WalkSim.update と draw_scene にあったものと同じ）
+
+
+def update_clear_screen(sim, buttons):
+    # クリア画面: R でやり直し、P でうんちを置く
+    if buttons & BTN_R:
+        sim.reset_game()
+    if buttons & BTN_P:
+        # ランダムな位置とサイズを生成
+        poop_size = sim.rndi(3, 6)  # サイズを3から5の範囲でランダム
+        poop_x = sim.rndi(0, sim.width - poop_size)
+        poop_y = sim.rndi(0, sim.height - poop_size)
+        sim.poop_list.append((poop_x, poop_y, poop_size))  # うんちをリストに追加
+
+
+def update_door(sim):
+    # クリア時に全てのオブジェクトを消去
+    sim.clear_entities()
+
+    sim.clear_timer += 1
+
+    # ドアの降下アニメーション
+    if sim.door_state == 0:
+        sim.clear_door_y += 1
+        if sim.clear_door_y >= sim.height // 2 - 30:
+            sim.door_state = 1
+            sim.clear_timer = 0
+
+    # ドアの停止
+    elif sim.door_state == 1 and sim.clear_timer > 30:
+        sim.door_state = 2
+
+    # ドアの開扉
+    elif sim.door_state == 2:
+        sim.door_open_width = min(20, sim.door_open_width + 1)
+        if sim.door_open_width >= 20:
+            sim.door_state = 3
+            sim.clear_timer = 0
+
+    # 犬がドアに向かって移動
+    elif sim.door_state == 3:
+        target_x = sim.width // 2 - 6  # ドアの中心に合わせた位置
+        target_y = sim.clear_door_y + 35
+
+        # X軸の移動
+        if abs(sim.pet_x - target_x) > 1:
+            if sim.pet_x < target_x:
+                sim.pet_x += 1
+            elif sim.pet_x > target_x:
+                sim.pet_x -= 1
+        else:
+            sim.pet_x = target_x  # 完全に中心に合わせる
+
+        # 位置が合ったらY軸方向に移動開始
+        if abs(sim.pet_x - target_x) <= 1:
+            if sim.pet_y > target_y:
+                sim.pet_y -= 1
+
+            # 目標位置に到達したら閉扉開始
+            if sim.pet_y <= target_y:
+                sim.door_state = 4
+                sim.clear_timer = 0
+
+    # ドアの閉扉（より自然な動き）
+    elif sim.door_state == 4:
+        if sim.door_open_width > 0:
+            sim.door_open_width = max(0, sim.door_open_width - 0.5)
+        if sim.door_open_width <= 0:
+            sim.door_state = 5
+            sim.clear_timer = 0
+
+    # クリア画面への遷移
+    elif sim.door_state == 5 and sim.clear_timer > 30:
+        sim.show_clear_screen = True
+
+
+def draw_clear_screen(g, sim, sprites, frame, prof=None):
+    # クリア画面の描画
+    g.cls(3)
+
+    # "GAME CLEAR!" の文字を虹色に点滅
+    clear_color = (frame // 4) % 15 + 1
+    g.text(60, 40, "GAME CLEAR!", clear_color)
+    sprites.blt_poops(sim.poop_list, poop_bounce(frame))
+    if prof:
+        prof.lap("draw_poop")
+    # リスタート案内
+    g.text(45, 70, "PRESS R TO RESTART", 7)
+
+
+def draw_door(g, sim, prof=None):
+    # クリアアニメーションの描画（犬と HUD の上に描く）
+    door_x = g.width // 2 - 15
+
+    # ドアの描画（常に犬の前面）
+    if sim.door_state < 2 or (sim.door_state >= 4 and sim.door_open_width == 0):
+        # 完全に閉じたドア（開く前と閉じた後で同じ見た目）
+        g.rect(door_x, sim.clear_door_y, 30, 50, 7)
+        g.rectb(door_x, sim.clear_door_y, 30, 50, 5)
+        g.rect(door_x + 25, sim.clear_door_y + 25, 3, 3, 10)
+
+    else:  # 開いているときと閉じかけのとき
+        # 左扉
+        g.rect(door_x - sim.door_open_width, sim.clear_door_y,
+               15, 50, 7)
+        g.rectb(door_x - sim.door_open_width, sim.clear_door_y,
+                15, 50, 5)
+        # 左ドアノブ
+        g.rect(door_x - sim.door_open_width + 12, sim.clear_door_y + 25,
+               3, 3, 10)
+
+        # 右扉
+        g.rect(door_x + 15 + sim.door_open_width, sim.clear_door_y,
+               15, 50, 7)
+        g.rectb(door_x + 15 + sim.door_open_width, sim.clear_door_y,
+                15, 50, 5)
+        # 右ドアノブ
+        g.rect(door_x + 15 + sim.door_open_width, sim.clear_door_y + 25,
+               3, 3, 10)
+    if prof:
+        prof.lap("draw_door")
@@ -0,0 +1,57 @@
+from time import perf_counter
+
+# 固定ステップの時計
+# 描画の速さに関係なく、実時間に合わせて WalkSim を 1 秒に rate 回進める
+# ゲームの時間は全て「ステップ数」で進むので、入力が同じなら結果も同じ（決定的）
+
+SIM_RATE = 60
+
+
+class FixedStepClock:
+    # tick() を毎フレーム呼ぶと、そのフレームで進めるべきステップ数を返す
+    # 描画が遅れて溜まった分は max_steps ずつ追いつき、追いついていない間は描画を飛ばす
+    # それでも追いつけないとき（max_skips 回続けて描画を飛ばしたとき）は溜まった分を捨てて描く
+
+    def __init__(self, rate=SIM_RATE, max_steps=4, max_skips=3, timer=perf_counter):
+        self.step_time = 1 / rate
+        self.max_steps = max_steps
+        self.max_skips = max_skips
+        self.timer = timer
+        self.last = None
+        self.accumulator = 0.0
+        self.skipped = 0
+        self.draw_this_frame = True
+        self.dropped_steps = 0  # 追いつけずに捨てたステップ数（統計用）
+
+    def reset(self):
+        # 止めていた時計を再開するとき（溜まった時間を捨てる）
+        self.last = None
+        self.accumulator = 0.0
+        self.skipped = 0
+
+    def tick(self):
+        now = self.timer()
+        if self.last is None:
+            # 最初のフレームは 1 ステップだけ進める
+            self.last = now - self.step_time
+        # タブの切り替えなどで長く止まっていた分は数えない
+        self.accumulator += min(now - self.last, self.step_time * self.max_steps * (self.max_skips + 1))
+        self.last = now
+
+        # 小数の誤差でちょうど 1 ステップ分が足りなくならないよう少しだけ余裕を持たせる
+        steps = min(int(self.accumulator / self.step_time + 1e-6), self.max_steps)
+        self.accumulator -= steps * self.step_time
+
+        behind = self.accumulator / self.step_time + 1e-6 >= 1
+        if behind and self.skipped < self.max_skips:
+            # まだ遅れているので今回は描かずに次のフレームで追いつく
+            self.draw_this_frame = False
+            self.skipped += 1
+        else:
+            if behind:
+                lost = int(self.accumulator / self.step_time + 1e-6)
+                self.dropped_steps += lost
+                self.accumulator -= lost * self.step_time
+            self.draw_this_frame = True
+            self.skipped = 0
+        return steps
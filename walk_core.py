@@ -0,0 +1,613 @@
+from bisect import bisect_left
+import operator
+import struct
+from collections import deque
+
+from walk_pool import NO_LANE, EntityPool, LaneIndex
+
+# 画面サイズ（pyxel.init(160, 120) と同じ）
+SCREEN_WIDTH = 160
+SCREEN_HEIGHT = 120
+
+# 入力ビットマスク
+# LEFT / RIGHT / SHIFT は押しっぱなし（btn）、SPACE / S / R / P は押した瞬間（btnp）
+BTN_LEFT = 1 << 0
+BTN_RIGHT = 1 << 1
+BTN_SHIFT = 1 << 2
+BTN_SPACE = 1 << 3
+BTN_S = 1 << 4
+BTN_R = 1 << 5
+BTN_P = 1 << 6
+
+
+MASK64 = (1 << 64) - 1
+
+
+class WalkRandom:
+    # pyxel.rndi / pyxel.rndf の代わりに使うシード付き乱数（splitmix64）
+    # 状態が 64bit 1 つだけなので、毎フレームのスナップショットでも軽い
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed=0):
+        self.state = seed & MASK64
+
+    def next64(self):
+        self.state = z = (self.state + 0x9E3779B97F4A7C15) & MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+        return z ^ (z >> 31)
+
+    def randint(self, a, b):
+        # a 以上 b 以下の整数
+        return a + (((self.next64() >> 32) * (b - a + 1)) >> 32)
+
+    def uniform(self, a, b):
+        return a + (b - a) * ((self.next64() >> 11) * (1.0 / (1 << 53)))
+
+
+# 落下物の種類の番号（WalkSim.pools の並び）
+KIND_OBSTACLE = 0
+KIND_TRASH = 1
+KIND_POWER = 2
+KIND_FLASHLIGHT = 3
+
+# ゲームオーバーの理由（スナップショットでは番号で保存する）
+GAME_OVER_REASONS = ("", "Look ahead!!", "Don't leave the poop behind!!")
+
+# スナップショットに入れるスカラー値と struct の型
+STATE_FIELDS = (
+    ("frame_count", "q"),
+    ("pet_x", "d"),
+    ("pet_y", "d"),
+    ("pet_vx", "d"),
+    ("poop_gauge", "d"),
+    ("stamina_gauge", "d"),
+    ("speed", "d"),
+    ("game_over", "?"),
+    ("score", "d"),
+    ("poop_speed_multiplier", "d"),
+    ("heal_multiplier", "d"),
+    ("day_cycle", "d"),
+    ("day_speed", "d"),
+    ("night_speed", "d"),
+    ("is_darkening", "?"),
+    ("has_power", "?"),
+    ("power_timer", "i"),
+    ("reload_timer", "i"),
+    ("has_flashlight", "?"),
+    ("fl_timer", "i"),
+    ("progress", "d"),
+    ("play_tick", "i"),
+    ("stage", "i"),
+    ("banked_score", "q"),
+    ("is_cleared", "?"),
+    ("game_started", "?"),
+    ("title_pet_rotation", "i"),
+    ("clear_door_y", "i"),
+    ("door_state", "i"),
+    ("door_open_width", "d"),
+    ("clear_timer", "i"),
+    ("show_clear_screen", "?"),
+)
+STATE_NAMES = tuple(name for name, _ in STATE_FIELDS)
+_get_state = operator.attrgetter(*STATE_NAMES)
+# スカラー値 + ゲームオーバー理由の番号 + 乱数の状態
+_STATE = struct.Struct("<" + "".join(fmt for _, fmt in STATE_FIELDS) + "BQ")
+_COUNT = struct.Struct("<I")
+
+
+class WalkSim:
+    # pyxel に依存しないゲームロジック本体
+    # step(buttons) で 1 フレーム進める
+    # 調整用の値は __init__ で、プレイ中に変わる値は reset_game() でまとめて初期化する
+
+    __slots__ = (
+        "width", "height", "seed", "rng",
+        "pet_width", "pet_height", "pet_speed", "pet_speed_fast",
+        "lane_centers", "lane_lines", "left_wall", "right_wall", "lane_width",
+        "speed_increase", "max_speed", "min_spawn_distance", "spawn_roll",
+        "spawn_period", "min_spawn_interval",
+        "day_speed_range", "night_speed_range",
+        "base_poop_increase", "poop_acceleration",
+        "base_heal_amount", "heal_acceleration",
+        "warning_threshold", "power_duration", "reload_time", "bullet_vy",
+        "flashlight_duration", "max_progress", "max_poops",
+        "obstacles", "trash_bags", "power_items", "flashlight_items", "bullets",
+        "pools", "lane_index", "bullet_lanes", "poop_list",
+        "game_over_reason", "profiler", "schedule", "spawn_cursor", "endless",
+    ) + STATE_NAMES
+
+    def __init__(self, seed=0):
+        self.width = SCREEN_WIDTH
+        self.height = SCREEN_HEIGHT
+        self.seed = seed
+        self.rng = WalkRandom(seed)
+        self.frame_count = 0
+
+        self.pet_width = 12
+        self.pet_height = 12
+        self.pet_speed = 2.0
+        self.pet_speed_fast = 4.0
+
+        self.lane_centers = [35, 75, 115]
+        self.lane_lines = (0, 20, 60, 100, 140, 158)  # レーンを区切る線の x（描画用）
+        self.left_wall = 20
+        self.right_wall = 130
+        self.lane_width = 40
+
+        self.speed_increase = 0.005
+        self.max_speed = 4.0
+        self.min_spawn_distance = 40  # 最小距離を40に増加
+        self.spawn_roll = 20  # rndi(0, spawn_roll) が 0 ならアイテム、それ以外は障害物かゴミ袋
+        self.spawn_period = 30  # 生成の間隔は spawn_period / speed フレーム
+        self.min_spawn_interval = 10  # ただしこれより短くしない（1 以上）
+        self.day_speed_range = (0.001, 0.005)    # 夜へ向かう速度の範囲
+        self.night_speed_range = (0.001, 0.005)  # 夜明けの速度の範囲
+        self.base_poop_increase = 0.1    # 基本増加量
+        self.poop_acceleration = 0.005  # 倍率の増加速度
+
+        # ゴミ袋の回復効果関連の変数を追加
+        self.base_heal_amount = 10      # 基本回復量
+        self.heal_acceleration = 0.001   # 倍率の増加速度
+
+        self.warning_threshold = 0.4  # 警告を表示開始する閾値
+
+        # パワーアップアイテム関連
+        self.power_duration = 180  # 3秒間（60FPS × 3）に変更
+        self.reload_time = 10
+        self.bullet_vy = -4  # 弾のY方向の速度
+        self.flashlight_duration = 250  # 5秒間
+
+        # ゴールまでの距離
+        self.max_progress = 500
+
+        # クリア画面のうんちの上限（超えたら古いものから消える）
+        self.max_poops = 4096
+
+        # 落下物と弾（スロット配列）
+        self.obstacles = EntityPool()
+        self.trash_bags = EntityPool()
+        self.power_items = EntityPool()  # パワーアップアイテム
+        self.flashlight_items = EntityPool()
+        self.bullets = EntityPool(8)
+        self.pools = (self.obstacles, self.trash_bags, self.power_items, self.flashlight_items)
+        self.lane_index = LaneIndex(len(self.lane_centers))
+        self.bullet_lanes = LaneIndex(len(self.lane_centers))  # 弾を当たりうるレーンごとに並べたもの
+        self.poop_list = deque(maxlen=self.max_poops)  # うんちのリスト（クリア画面、リングバッファ）
+        self.profiler = None  # walk_profile.FrameProfiler を入れると区間ごとの時間を計る
+        self.schedule = None  # walk_level で作った生成スケジュール (フレーム, レーン, 種類) の配列
+        self.endless = None  # walk_endless.Endless を入れるとクリアせずにステージが続く
+
+        self.reset_game()
+
+    # pyxel.rndi / pyxel.rndf の代わり（シード付きで再現可能）
+    def rndi(self, a, b):
+        return self.rng.randint(a, b)
+
+    def rndf(self, a, b):
+        return self.rng.uniform(a, b)
+
+    def is_space_clear(self, x, y):
+        # 同じレーンと隣接レーンもチェック
+        # 各レーンは新しい（y が小さい）ものから見て、min_spawn_distance より下に来たら打ち切る
+        for lane_no, center in enumerate(self.lane_centers):
+            if abs(center - x) > 42:
+                continue
+            for pool, i in reversed(self.lane_index.lanes[lane_no]):
+                dy = pool.y[i] - y
+                if dy >= self.min_spawn_distance:
+                    break
+                if dy > -self.min_spawn_distance and abs(pool.x[i] - x) <= 40:
+                    return False
+
+        return True
+
+    def spawn_entity(self, pool, lane, x):
+        self.lane_index.add(pool, pool.spawn(x, 0, lane))
+
+    def spawn_kind(self, lane, kind):
+        # 種類の番号（KIND_*）の落下物を lane に出す。アイテムはレーンの中心から少し右
+        x = self.lane_centers[lane] + (2 if kind >= KIND_POWER else 0)
+        self.spawn_entity(self.pools[kind], lane, x)
+
+    def roll_spawn(self, tick):
+        # tick のフレームに出す落下物を抽選し、(レーン, 種類) を返す（出さないなら None）
+        # スピードに応じて生成間隔を調整
+        spawn_interval = int(self.spawn_period / self.speed)
+        spawn_interval = max(self.min_spawn_interval, spawn_interval)
+        if tick % spawn_interval != 0:
+            return None
+
+        # 各レーンでスペースをチェックし、空いているレーンのリストを作成
+        available_lanes = []
+        for lane in range(len(self.lane_centers)):
+            if self.is_space_clear(self.lane_centers[lane], 0):
+                available_lanes.append(lane)
+        if not available_lanes:
+            return None
+
+        # 空いているレーンからランダムに1つ選び、障害物、ゴミ袋、アイテムをランダムに1つ生成
+        lane = available_lanes[self.rndi(0, len(available_lanes) - 1)]
+        if self.rndi(0, self.spawn_roll) >= 1:
+            kind = KIND_OBSTACLE if self.rndi(0, 1) == 0 else KIND_TRASH
+        else:
+            kind = KIND_POWER if self.rndi(0, 1) == 0 else KIND_FLASHLIGHT
+        return lane, kind
+
+    def move_entities(self):
+        # 落下物の移動（画面外に出たものはレーンからも外す）
+        speed = self.speed
+        height = self.height
+        lane_index = self.lane_index
+        for pool in self.pools:
+            ys, alive = pool.y, pool.alive
+            for i in range(pool.top):
+                if alive[i]:
+                    ys[i] += speed
+                    if ys[i] > height:
+                        lane_index.remove(pool, i)
+                        pool.despawn(i)
+
+    def clear_entities(self):
+        for pool in self.pools:
+            pool.clear()
+        self.lane_index.clear()
+
+    def step(self, buttons=0):
+        self.update(buttons)
+        self.frame_count += 1
+
+    def update(self, buttons):
+        if not self.game_started:
+            # スタート画面での犬の回転アニメーション
+            self.title_pet_rotation = (self.title_pet_rotation + 1) % 32  # 32フレームで1周
+            if buttons & BTN_S:
+                self.game_started = True
+            return
+
+        if self.game_over:
+            if buttons & BTN_R:
+                self.reset_game()
+            return
+
+        # クリアのあとの演出は最後にしか使わないので、最初に要るときに walk_clear を読む
+        if self.show_clear_screen:
+            from walk_clear import update_clear_screen
+            update_clear_screen(self, buttons)
+            return
+
+        if self.is_cleared:
+            from walk_clear import update_door
+            update_door(self)
+            return
+
+        prof = self.profiler
+
+        self.update_day_night()
+        if prof:
+            prof.lap("day_night")
+
+        # 便意ゲージの増加（徐々に速くなる）
+        self.poop_speed_multiplier += self.poop_acceleration
+        self.poop_gauge += self.base_poop_increase * self.poop_speed_multiplier
+
+        # 回復効果の増加
+        self.heal_multiplier += self.heal_acceleration
+
+        if self.speed < self.max_speed:
+            self.speed += self.speed_increase
+        if prof:
+            prof.lap("gauges")
+
+        self.spawn_step()
+        if prof:
+            prof.lap("spawn")
+
+        # シフトキーが押されているかチェック
+        dash = buttons & BTN_SHIFT
+        if dash and self.stamina_gauge > 0:
+            self.stamina_gauge -= 1
+        elif self.stamina_gauge < 100:
+            self.stamina_gauge += 0.2
+        current_speed = self.pet_speed_fast if (dash and self.stamina_gauge > 0)else self.pet_speed
+
+        # 左右キーで移動速度を設定（現在の速度を使用）
+        if buttons & BTN_LEFT:
+            self.pet_vx = -current_speed
+        elif buttons & BTN_RIGHT:
+            self.pet_vx = current_speed
+
+        self.pet_x += self.pet_vx
+
+        if self.pet_x < self.left_wall:
+            self.pet_x = self.left_wall
+            self.pet_vx = -self.pet_vx
+        if self.pet_x > self.right_wall:
+            self.pet_x = self.right_wall
+            self.pet_vx = -self.pet_vx
+        if prof:
+            prof.lap("move_pet")
+
+        self.move_entities()
+        if prof:
+            prof.lap("move_entities")
+
+        self.resolve_pet_hits()
+        if prof:
+            prof.lap("pet_hits")
+
+        if self.poop_gauge >= 100:
+            self.game_over = True
+            self.game_over_reason = "Don't leave the poop behind!!"
+
+        # スコアを更新（時間経過で増加）
+        self.score += self.speed * 0.1
+        # パワーアップ効果の更新
+        if self.has_power:
+            self.power_timer -= 1
+            if self.power_timer <= 0:
+                self.has_power = False
+        # 懐中電灯の効果時間更新
+        if self.has_flashlight:
+            self.fl_timer -= 1
+        if self.fl_timer <= 0:
+            self.has_flashlight = False
+
+        # リロードタイマーの更新
+        if self.reload_timer > 0:
+            self.reload_timer -= 1
+        if prof:
+            prof.lap("timers")
+
+        # 弾の発射
+        if self.has_power and buttons & BTN_SPACE and self.reload_timer == 0:
+            # 犬の上方向に弾を発射
+            self.fire_bullet(self.pet_x)
+            self.reload_timer = self.reload_time
+
+        self.move_bullets()
+        if prof:
+            prof.lap("shoot")
+
+        self.resolve_bullet_hits()
+        if prof:
+            prof.lap("bullet_hits")
+
+        self.advance_progress()
+
+    def resolve_pet_hits(self):
+        # 犬と重なりうるレーンの、犬の高さ付近だけ当たり判定
+        lane_index = self.lane_index
+        pet_x = self.pet_x
+        pet_y = self.pet_y
+        for lane_no, center in enumerate(self.lane_centers):
+            # レーン上の x は center（障害物・ゴミ袋）か center + 2（アイテム）
+            if not -14 < center - pet_x < 12:
+                continue
+            lane = lane_index.lanes[lane_no]
+            k = 0
+            while k < len(lane):
+                pool, i = lane[k]
+                y = pool.y[i]
+                if y >= pet_y + 12:
+                    k += 1
+                    continue
+                if y <= pet_y - 12:
+                    break  # ここから先は全て犬より上
+                if abs(pool.x[i] - pet_x) >= 12:
+                    k += 1
+                    continue
+                if pool is self.obstacles:
+                    self.game_over = True
+                    self.game_over_reason = "Look ahead!!"
+                    k += 1
+                    continue
+                if pool is self.trash_bags:
+                    # 回復量に倍率を用
+                    heal_amount = self.base_heal_amount * self.heal_multiplier
+                    self.poop_gauge = max(self.poop_gauge - heal_amount, 0)
+                elif pool is self.power_items:
+                    self.has_power = True
+                    self.power_timer = self.power_duration
+                else:
+                    self.has_flashlight = True
+                    self.fl_timer = self.flashlight_duration
+                del lane[k]
+                pool.despawn(i)
+
+    def advance_progress(self):
+        # 進行度の更新（時間経過で少しずつ進む）
+        self.progress += 0.5
+        self.play_tick += 1
+
+        # クリア判定（エンドレスでは次のステージへ）
+        if self.progress >= self.max_progress:
+            if self.endless is None:
+                self.is_cleared = True
+            else:
+                self.endless.next_stage(self)
+        elif self.endless is not None:
+            self.endless.prepare()  # 次のステージのスケジュールを少しずつ作っておく
+
+    def update_day_night(self):
+        # 昼夜サイクルの更新（速度を昼夜で変える）
+        if self.is_darkening:
+            self.day_cycle += self.day_speed
+            if self.day_cycle >= 0.5:  # 0.5で夜になったら明け始める
+                self.is_darkening = False
+                self.day_cycle = 0.5  # 夜の開始値で固定
+                # 夜になった時点で新しい夜明けの速度を設定
+                self.night_speed = self.rndf(*self.night_speed_range)
+        else:
+            self.day_cycle += self.night_speed  # 夜明けは速く
+            if self.day_cycle >= 0.6:
+                self.is_darkening = True
+                self.day_cycle = 0  # 最小値で固定
+                # 昼になった時点で新しい夜への速度を設定
+                self.day_speed = self.rndf(*self.day_speed_range)
+
+    def spawn_step(self):
+        # 落下物の生成（スケジュールがあれば、このフレームの分を順に出すだけ）
+        if self.schedule is None:
+            spawned = self.roll_spawn(self.frame_count)
+            if spawned is not None:
+                self.spawn_kind(*spawned)
+        else:
+            ticks, lanes, kinds = self.schedule
+            k = self.spawn_cursor
+            while k < len(ticks) and ticks[k] <= self.play_tick:
+                self.spawn_kind(lanes[k], kinds[k])
+                k += 1
+            self.spawn_cursor = k
+
+    def fire_bullet(self, pet_x):
+        x = pet_x + 3  # 犬の中心より少し左から発射（大きくなった弾の中心調整）
+        lane = NO_LANE      # 障害物に当たりうるレーン（どのレーンにも届かない位置なら無し）
+        for lane_no, center in enumerate(self.lane_centers):
+            if abs(center - x) < 12:
+                lane = lane_no
+        slot = self.bullets.spawn(x, self.pet_y, lane)  # 犬の上端から発射
+        if lane != NO_LANE:
+            self.bullet_lanes.add(self.bullets, slot)
+
+    def move_bullets(self):
+        # 弾の移動（Y方向のみ）
+        bullets = self.bullets
+        ys, alive = bullets.y, bullets.alive
+        for i in range(bullets.top):
+            if alive[i]:
+                ys[i] += self.bullet_vy
+                # 画面外に出たら削除
+                if ys[i] < -10:  # 上端判定に変更
+                    if bullets.lane[i] != NO_LANE:
+                        self.bullet_lanes.remove(bullets, i)
+                    bullets.despawn(i)
+
+    def resolve_bullet_hits(self):
+        # 弾と障害物の当たり判定
+        # レーンごとに弾も落下物も y 順に並んでいるので、上（y が小さい方）から 2 本のポインタで突き合わせる
+        # 1 フレームで近づく距離が当たり幅を超えるときは、すり抜けた分も当たりとする
+        closing = self.speed - self.bullet_vy
+        low = min(-12, 12 - closing)
+        bxs, bys = self.bullets.x, self.bullets.y
+        for lane_no in range(len(self.lane_centers)):
+            shots = self.bullet_lanes.lanes[lane_no]
+            if not shots:
+                continue
+            targets = self.lane_index.lanes[lane_no]
+            j = 0                 # 古い弾（一番上）から
+            k = len(targets) - 1  # 新しい落下物（一番上）から
+            while j < len(shots) and k >= 0:
+                pool, i = targets[k]
+                if pool is not self.obstacles:
+                    k -= 1
+                    continue
+                b = shots[j][1]
+                dy = bys[b] - pool.y[i]
+                if dy <= low:
+                    j += 1  # この弾は残りの障害物より全て上にいる
+                elif dy >= 12:
+                    k -= 1  # 残りの弾は全てこの障害物より下にいる
+                elif abs(bxs[b] - pool.x[i]) < 12:
+                    del targets[k]
+                    pool.despawn(i)
+                    del shots[j]
+                    self.bullets.despawn(b)
+                    k -= 1
+                else:
+                    j += 1
+
+    def reset_game(self):
+        # プレイ中に変わる値を全て初期値に戻す（frame_count と乱数は続きから）
+        self.pet_x = 80
+        self.pet_y = 100
+        self.pet_vx = 2.0
+
+        self.poop_gauge = 0
+        self.stamina_gauge = 100
+        self.speed = 1.0
+        self.game_over = False
+        self.game_over_reason = ""
+        self.score = 0  # スコアもリセット
+        self.poop_speed_multiplier = 1.0  # 倍率もリセット
+        self.heal_multiplier = 1.0  # 回復効果の倍率もリセット
+
+        # 昼夜サイクル関連の変数を修正
+        self.day_cycle = 0      # 0-1の値で時間を表現（0:昼、0.5:夜）
+        self.day_speed = 0.002  # 初期値（update内で変更される）
+        self.night_speed = 0.002  # 初期値（update内で変更される）
+        self.is_darkening = True # True:暗くなる、False:明るくなる
+
+        self.has_power = False
+        self.power_timer = 0
+        self.reload_timer = 0
+        self.has_flashlight = False
+        self.fl_timer = 0
+        self.clear_entities()
+        self.bullets.clear()
+        self.bullet_lanes.clear()
+
+        # ゴールまでの進行度関連
+        self.progress = 0
+        self.play_tick = 0  # プレイ開始からのフレーム数（生成スケジュールの位置）
+        self.spawn_cursor = 0  # 次に出すスケジュールの番号
+        self.is_cleared = False   # クリアフラグ
+        self.stage = 0  # エンドレスのステージ
+        self.banked_score = 0  # 終わったステージのスコアの整数部分（score が大きくなりすぎないように）
+
+        self.game_started = False  # スタート画面フラグ
+        self.title_pet_rotation = 0  # タイトル画面での犬の回転角度
+
+        self.clear_door_y = -50  # ドアの初期Y位置
+        self.door_state = 0      # 0: 降下中, 1: 停止, 2: 開扉中, 3: 開, 4: 閉扉中, 5: 完了
+        self.door_open_width = 0 # ドアの開き具合
+        self.clear_timer = 0     # クリアアニメーションのタイミング用
+        self.show_clear_screen = False # クリア画面表示フラグ
+        self.poop_list.clear()
+        if self.endless is not None:
+            self.endless.enter(self, 0)
+
+    def total_score(self):
+        return self.banked_score + self.score
+
+    def snapshot(self):
+        # 状態をバイト列にする（スカラー値 + 乱数 + 落下物・弾の配列 + うんち）
+        # レーンごとの並びは y から復元できるので保存しない
+        out = bytearray(_STATE.pack(
+            *_get_state(self),
+            GAME_OVER_REASONS.index(self.game_over_reason),
+            self.rng.state,
+        ))
+        for pool in self.pools:
+            pool.dump(out)
+        self.bullets.dump(out)
+        out += _COUNT.pack(len(self.poop_list))
+        out += bytes(v for poop in self.poop_list for v in poop)
+        return bytes(out)
+
+    def restore(self, data):
+        # snapshot() で作ったバイト列から状態を戻す（調整用の値はそのまま）
+        values = _STATE.unpack_from(data)
+        n = len(STATE_NAMES)
+        for name, value in zip(STATE_NAMES, values):
+            setattr(self, name, value)
+        self.game_over_reason = GAME_OVER_REASONS[values[n]]
+        self.rng.state = values[n + 1]
+        data = memoryview(data)
+        offset = _STATE.size
+        for pool in self.pools:
+            offset = pool.load(data, offset)
+        offset = self.bullets.load(data, offset)
+        self.lane_index.rebuild(self.pools, reverse=True)
+        if self.endless is not None:
+            self.endless.load(self)
+        if self.schedule is not None:
+            self.spawn_cursor = bisect_left(self.schedule[0], self.play_tick)
+        self.bullet_lanes.rebuild((self.bullets,), reverse=False)
+        count, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        raw = data[offset:offset + 3 * count]
+        self.poop_list.clear()
+        self.poop_list.extend(tuple(raw[i:i + 3]) for i in range(0, 3 * count, 3))
+        return offset + 3 * count
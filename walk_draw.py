@@ -0,0 +1,242 @@
+from walk_light import Lighting, night_level
+from walk_sprites import COLKEY, poop_bounce
+
+# ゲーム画面の描画（pyxel.run の draw から呼ぶ。画面なしで pyxel.Image に描くこともできる）
+
+
+def draw_scene(g, sim, sprites, frame, prof=None):
+    # 1 フレーム分の画面を g（pyxel か pyxel.Image など同じ描画関数を持つもの）に描く
+    # frame は点滅や弾みのアニメーション用のフレーム番号
+    if not sim.game_started:
+        # スタート画面の描画
+        g.cls(3)  # 明るい緑の背景
+        
+        # タイトルテキスト
+        g.text(60, 40, "Sampo Game", 7)
+        g.text(48, 70, "PRESS S TO START", 7)
+        
+        # 回転する犬のアニメーション
+        center_x = g.width // 2
+        center_y = 55
+        rotation = sim.title_pet_rotation
+        
+        # 向きごとに焼いておいたスプライトを描く
+        sprites.blt("title_dog", center_x, center_y, variant=rotation // 8)
+        
+        return
+    
+    if sim.game_over:
+        g.cls(0)  # 画面を黒く暗転
+        g.text(65, 50, "GAME OVER", 8)
+        if sim.poop_gauge >= 100:
+            g.text(25, 60,"Don't leave the poop behind!",7)
+        else:
+            g.text(60,60,"Look Ahead!",7)
+        progress_percent = int((sim.progress / sim.max_progress) * 100)
+        g.text(55, 70, f"Progress: {progress_percent}%", 7)
+        g.text(45, 80, "PRESS R TO RESTART", 7)
+        if sim.endless is not None:
+            # エンドレスでは着いたステージと合計スコアも出す
+            result_text = f"Stage {sim.stage + 1}  Score {int(sim.total_score())}"
+            g.text((g.width - len(result_text) * 4) // 2, 95, result_text, 7)
+        return
+    
+    if sim.show_clear_screen:
+        # クリア画面（最後にしか使わないので walk_clear は要るときに読む）
+        from walk_clear import draw_clear_screen
+        draw_clear_screen(g, sim, sprites, frame, prof)
+        return
+    
+    # 背景とレーンを区切る線（レーンの並びごとに焼いておいた層を 1 回で描く。夜の暗さはあとで付ける）
+    sprites.blt("background", 0, 0, variant=(3, sim.lane_lines))
+    if prof:
+        prof.lap("draw_background")
+    
+    # 障害物（クリスマスツリー風の木）
+    for x, y in sim.obstacles:
+        sprites.blt("tree", x, y)
+    # ゴミ袋（丸みのあるデザイン）
+    for x, y in sim.trash_bags:
+        sprites.blt("trash_bag", x, y)
+    for x, y in sim.power_items:
+        sprites.blt("power_item", x, y)
+    for x, y in sim.flashlight_items:
+        sprites.blt("flashlight_item", x, y)
+    if prof:
+        prof.lap("draw_entities")
+
+    # 夜の明かり: 夕方から少しずつ暗くし、犬のまわりと懐中電灯の光の中だけ見えるようにする
+    # （クリアの演出は明るいまま。ゲージ・弾・犬は暗くしない）
+    level = night_level(sim)
+    if level and not sim.is_cleared:
+        if sprites.lighting is None:
+            sprites.lighting = Lighting(sprites)
+        sprites.lighting.draw(g, sim, level)
+        if prof:
+            prof.lap("draw_light")
+    
+    
+    # 便意ゲージのラベル位置を上に移動）
+    # g.text(5, 5, "Poop Meter", 7)
+    # スタミナゲージの名前と背景（焼いておいたもの）
+    sprites.blt("gauge_frame", 5, 25, variant="Stamina")
+    
+    # # 便意ゲージの描画（位置を下に移動）
+    # poop_gauge_width = 100
+    # poop_gauge_height = 8
+    # poop_gauge_y = 15  # ゲージのY座標を調整
+
+    stamina_gauge_width = 100
+    stamina_gauge_height = 8
+    stamina_gauge_y = 35
+    
+    # # ゲージの背景（）
+    # g.rect(5, poop_gauge_y, poop_gauge_width, poop_gauge_height, 7)
+    
+    # # ゲージの中身
+    # current_width = int((sim.poop_gauge * poop_gauge_width) / 100)
+    # poop_gauge_color = 9 if sim.poop_gauge < 70 else 8
+    # g.rect(5, poop_gauge_y, current_width, poop_gauge_height, poop_gauge_color)
+
+    current_width = int((sim.stamina_gauge * stamina_gauge_width) / 100)
+    stamina_gauge_color = 9 if sim.stamina_gauge < 70 else 8
+    g.rect(5, stamina_gauge_y, current_width, stamina_gauge_height, stamina_gauge_color)
+         
+    # # スコアを右上に表示（整数で表示）
+    # score_text = f"Score: {int(sim.score)}"
+    # score_x = g.width - len(score_text) * 4 - 5
+    # g.text(score_x, 5, score_text, 7)
+
+    # 夜が近づいてきた時の警告表示
+    if sim.is_darkening and 0.4 <= sim.day_cycle < 0.5 and not sim.is_cleared:
+        warning_text = "Night approaching"
+        text_width = len(warning_text) * 4
+        x = (g.width - text_width) // 2
+        y = 60  # 画面中央より少し上
+        # 滅効果（30フレームごとに切り替え）
+        if (frame // 30) % 2 == 0:
+            g.text(x, y, warning_text, 8)  # 赤色で表
+    
+    if prof:
+        prof.lap("draw_hud")
+
+    # 弾の描画
+    for x, y in sim.bullets:
+        sprites.blt("bullet", x, y)
+    
+    # 犬の描画（パワーアップ中は点滅）
+    dog_color = 4  # 通常の茶色
+    if sim.has_power and not sim.is_cleared:
+        if (frame % 8) < 4:
+            dog_color = 10  # 金色（黄色）
+    
+    # 犬の描画（懐中電灯の光は効果中のみ）
+    lit = sim.has_flashlight and sim.is_cleared == False
+    sprites.blt("dog", sim.pet_x, sim.pet_y, variant=(dog_color, lit))
+    if prof:
+        prof.lap("draw_entities")
+
+    # 進行度ゲージの描画（より右端に）
+    gauge_x = g.width - 20  # 160 - 20 = 140
+    gauge_y = 15
+    gauge_height = 80
+    
+    # ゲージの枠（白い縁取りと暗い背景）
+    sprites.blt("progress_frame", gauge_x, gauge_y)
+    
+    # 進行度に応じたゲージの描画
+    progress_height = int((sim.progress * gauge_height) / sim.max_progress)
+    g.rect(gauge_x, gauge_y + gauge_height - progress_height, 
+               10, progress_height, 11)  # 水色でゲージを表示
+    
+    # 家のアイコン（ゴり右に）
+    house_x = gauge_x - 2
+    house_y = gauge_y - 15
+    
+    sprites.blt("house", house_x, house_y)
+
+    # エンドレスのステージ（家の左）
+    if sim.endless is not None:
+        stage_text = f"Stage {sim.stage + 1}"
+        g.text(house_x - 4 - len(stage_text) * 4, 5, stage_text, 7)
+
+    # 便意ゲージとうんちオブジェクトの描画
+    gauge_x = 5
+    gauge_y = 5
+    
+    sprites.blt("gauge_frame", gauge_x, gauge_y, variant="Poop Meter")
+    g.rect(gauge_x, gauge_y + 10, sim.poop_gauge, 8, 14)
+    if prof:
+        prof.lap("draw_hud")
+    
+    # うんちオブジェクトのアニメーション
+    if sim.poop_gauge > 0:
+        poop_x = gauge_x + sim.poop_gauge  # ゲージに合わせて位置を変更
+        poop_y = gauge_y + 14
+        
+        # うんちの大きさをゲージに応じて変更
+        size_factor = sim.poop_gauge / 100.0  # 0.0 から 1.0 の値
+        
+        # うんちの描画（サイズは便意ゲージに応じて変化）
+        base_size = int(6 * size_factor) + 2  # 最小2、最大8
+        
+        if sim.poop_gauge > 80:
+            y_offset = poop_bounce(frame)
+        else:
+            y_offset = 0
+        sprites.blt("poop", poop_x, poop_y + y_offset, size=base_size)
+    if prof:
+        prof.lap("draw_poop")
+
+    # クリアアニメーションの描画
+    if sim.is_cleared:
+        from walk_clear import draw_door
+        draw_door(g, sim, prof)
+
+
+# 群れモードの犬の色（番号順に繰り返す。パワーアップ中は点滅で 10）
+# COLKEY の色で焼くと透明になって体が消えるので使わない
+DOG_COLORS = (4, 9, 7, 6, 12, 14, 2, 13)
+assert COLKEY not in DOG_COLORS
+
+
+def draw_pack(g, sim, sprites, frame, focus=0, prof=None):
+    # 群れモード（walk_pack.PackSim）の画面
+    # focus の犬から見た画面（ゲージと懐中電灯）を draw_scene で描き、ほかの犬を上に重ねる
+    if sim.game_over or sim.is_cleared:
+        g.cls(0 if sim.game_over else 3)
+        title = "GAME OVER" if sim.game_over else "GOAL!"
+        g.text((g.width - len(title) * 4) // 2, 15, title, 8 if sim.game_over else 7)
+        # スコアの上位（* はゴールまで残った犬）
+        ranking = sorted(range(sim.n_dogs), key=lambda k: (-sim.dog_score[k], k))
+        for rank, k in enumerate(ranking[:8]):
+            mark = "*" if sim.dog_alive[k] else ""
+            g.text(40, 30 + rank * 8, f"{rank + 1}. Dog {k + 1}  {int(sim.dog_score[k])}{mark}",
+                   DOG_COLORS[k % len(DOG_COLORS)])
+        g.text(45, 105, "PRESS R TO RESTART", 7)
+        return
+
+    # 見ている犬が倒れたら残っている最初の犬に移る
+    if not sim.dog_alive[focus]:
+        focus = next((k for k in range(sim.n_dogs) if sim.dog_alive[k]), focus)
+    draw_scene(g, sim.view(focus), sprites, frame, prof)
+    if not sim.game_started:
+        return
+
+    for k in range(sim.n_dogs):
+        if k == focus or not sim.dog_alive[k]:
+            continue
+        dog_color = DOG_COLORS[k % len(DOG_COLORS)]
+        if sim.dog_power[k] > 0 and (frame % 8) < 4:
+            dog_color = 10
+        sprites.blt("dog", sim.dog_x[k], sim.pet_y, variant=(dog_color, sim.dog_light[k] > 0))
+    alive_text = f"{sim.dogs_alive}/{sim.n_dogs}"
+    g.text(5, 47, alive_text, 7)
+    if prof:
+        prof.lap("draw_entities")
+
+
+def draw_ghosts(g, sprites, xs, y):
+    # ゴースト（walk_ghost）は焼いておいた 1 つのスプライトを x ごとに置くだけ
+    for x in xs:
+        sprites.blt("ghost", x, y)
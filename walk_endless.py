@@ -0,0 +1,164 @@
+from array import array
+from itertools import count
+
+from walk_core import WalkRandom, WalkSim
+from walk_level import record_spawns
+
+# エンドレスモード（levels/endless.json など "endless" のあるレベル）
+# max_progress に着いてもクリアにならず、次のステージに進む。ステージごとに
+#   最高速度が上がり（speed_cap まで）、生成の間隔と最小距離が縮み（下限まで）、昼夜が速く回る（day_cap まで）
+# ステージの生成スケジュールは、前のステージを遊んでいる間に 1 フレーム BUILD_TICKS フレーム分ずつ作っておき、
+# ステージが変わったら差し替えるだけにする（まとめて作ると数 ms かかり、そのフレームだけ遅れる）
+# （ステージ番号とシードだけで決まるので、やり直しやスナップショットからの復元でも同じものになる。
+#   そのときや、作り終える前にステージが変わったときは、残りをその場で作る）
+#
+# 何時間遊んでも状態が増え続けないように、ステージが変わるたびに
+#   progress・play_tick・うんちと回復の倍率を戻し、score の整数部分を banked_score（整数）に移す
+# 落下物はプールで使い回すので、画面にある数より増えない
+
+# 難しさの上がり方（レベルの "endless" で上書きできる）
+RAMP_PARAMS = {
+    "speed_step": 0.25,          # ステージごとの最高速度の上がり幅
+    "speed_cap": 7.0,            # 最高速度の上限
+    "spawn_decay": 0.93,         # ステージごとに生成の間隔と最小距離に掛ける
+    "spawn_period_floor": 12,    # spawn_period の下限
+    "spawn_interval_floor": 3,   # min_spawn_interval の下限
+    "spawn_distance_floor": 26,  # min_spawn_distance の下限
+    "day_step": 0.2,             # ステージごとの昼夜の速さの倍率の上がり幅
+    "day_cap": 4.0,              # 昼夜の速さの倍率の上限
+    "lead_in": 30,               # ステージの最初に何も出さないフレーム数（前のステージの落下物と重ならないように）
+}
+
+# 1 フレームに進める、次のステージのスケジュール作りのフレーム数
+# （エンドレスのレベルの 1 ステージは 800 フレームほどなので、ステージの最初の 1/8 ほどで作り終える）
+BUILD_TICKS = 8
+
+# ステージごとに変える WalkSim の値
+STAGE_PARAMS = (
+    "max_speed",
+    "spawn_period",
+    "min_spawn_interval",
+    "min_spawn_distance",
+    "day_speed_range",
+    "night_speed_range",
+)
+
+
+class Endless:
+    # 1 つの WalkSim のステージを進める（WalkSim.endless に入れる）
+
+    def __init__(self, level, seed):
+        ramp = dict(RAMP_PARAMS)
+        for key, value in (level.endless or {}).items():
+            if key not in RAMP_PARAMS:
+                raise ValueError(f"unknown endless parameter: {key}")
+            ramp[key] = value
+        self.level = level
+        self.seed = seed
+        self.ramp = ramp
+        base = WalkSim(seed)
+        level.apply(base)
+        self.base = {key: getattr(base, key) for key in STAGE_PARAMS}
+        self.first_speed = base.speed
+        self.current = None   # 今のステージの (番号, 調整用の値, スケジュール)
+        self.building = None  # 作っている次のステージ（start_chunk() の値）
+
+    def stage_params(self, stage):
+        ramp = self.ramp
+        base = self.base
+        decay = ramp["spawn_decay"] ** stage
+        day = min(1 + ramp["day_step"] * stage, ramp["day_cap"])
+        return {
+            "max_speed": max(min(base["max_speed"] + ramp["speed_step"] * stage, ramp["speed_cap"]),
+                             base["max_speed"]),
+            "spawn_period": max(base["spawn_period"] * decay, ramp["spawn_period_floor"]),
+            "min_spawn_interval": max(round(base["min_spawn_interval"] * decay), ramp["spawn_interval_floor"], 1),
+            "min_spawn_distance": max(base["min_spawn_distance"] * decay, ramp["spawn_distance_floor"]),
+            "day_speed_range": tuple(v * day for v in base["day_speed_range"]),
+            "night_speed_range": tuple(v * day for v in base["night_speed_range"]),
+        }
+
+    def start_speed(self, stage):
+        # 前のステージの最高速度から始める
+        return self.first_speed if stage == 0 else self.stage_params(stage - 1)["max_speed"]
+
+    def stages(self, first):
+        # ステージ番号と調整用の値を first から順に出す
+        for stage in count(first):
+            yield stage, self.stage_params(stage)
+
+    def start_chunk(self, stage, params):
+        # 何もない画面から、ステージの速度と生成の値で 1 ステージ分のスケジュールを作り始める
+        # [番号, 調整用の値, 生成だけを進める WalkSim, スケジュール, 作ったフレーム数, 全体のフレーム数]
+        sim = WalkSim(self.seed)
+        self.level.apply(sim)
+        for key, value in params.items():
+            setattr(sim, key, value)
+        sim.rng = WalkRandom(self.seed ^ (stage << 32))
+        sim.speed = self.start_speed(stage)
+        schedule = array("I"), array("B"), array("B")
+        return [stage, params, sim, schedule, 0, int(sim.max_progress * 2) + 1]
+
+    def build_chunk(self, build, n_ticks):
+        # start_chunk() の続きを n_ticks フレーム分作る（作り終えたら True）
+        _, _, sim, schedule, done, total = build
+        end = min(done + n_ticks, total)
+        record_spawns(sim, end, self.ramp["lead_in"], schedule, done)
+        build[4] = end
+        return end == total
+
+    def compile_chunk(self, stage, params):
+        # 1 ステージ分のスケジュールをその場で全部作る
+        build = self.start_chunk(stage, params)
+        self.build_chunk(build, build[5])
+        return build[3]
+
+    def chunk(self, stage):
+        current = self.current
+        if current is not None and current[0] == stage:
+            return current
+        build = self.building
+        if build is not None and build[0] == stage:
+            self.build_chunk(build, build[5])  # 作り終えていない分（ふつうは残っていない）
+            self.current = stage, build[1], build[3]
+        else:
+            # 最初のステージや、やり直し・復元のとき
+            params = self.stage_params(stage)
+            self.current = stage, params, self.compile_chunk(stage, params)
+        self.building = None  # 次のステージは prepare() で作り始める
+        return self.current
+
+    def prepare(self):
+        # 毎フレーム呼ぶ: 今のステージの次のスケジュールを BUILD_TICKS フレーム分ずつ作る
+        if self.current is None:
+            return
+        build = self.building
+        if build is None:
+            stage = self.current[0] + 1
+            self.building = self.start_chunk(stage, self.stage_params(stage))
+        elif build[4] < build[5]:
+            self.build_chunk(build, BUILD_TICKS)
+
+    def load(self, sim):
+        # sim.stage のステージの値とスケジュールを sim に入れる（状態はそのまま、restore から）
+        _, params, schedule = self.chunk(sim.stage)
+        for key, value in params.items():
+            setattr(sim, key, value)
+        sim.schedule = schedule
+
+    def enter(self, sim, stage):
+        # sim をステージ stage の最初にする（犬・ゲージ・落下物はそのまま）
+        sim.stage = stage
+        self.load(sim)
+        sim.speed = self.start_speed(stage)
+        sim.progress = 0
+        sim.play_tick = 0
+        sim.spawn_cursor = 0
+        sim.poop_speed_multiplier = 1.0
+        sim.heal_multiplier = 1.0
+        whole = int(sim.score)
+        sim.banked_score += whole
+        sim.score -= whole
+
+    def next_stage(self, sim):
+        self.enter(sim, sim.stage + 1)
@@ -0,0 +1,239 @@
+import numpy as np
+
+from walk_batch import BatchWalkSim
+from walk_core import (
+    SCREEN_HEIGHT,
+    SCREEN_WIDTH,
+    BTN_LEFT,
+    BTN_RIGHT,
+    BTN_SHIFT,
+    BTN_SPACE,
+    BTN_S,
+    WalkSim,
+)
+from walk_draw import draw_scene
+from walk_framebuffer import Framebuffer
+from walk_level import set_params
+from walk_sprites import SpriteCache
+
+# 強化学習用の環境（Gymnasium と同じ形の reset / step）
+#   WalkEnv:    WalkSim 1 本。reset(seed) -> (obs, info)、step(action) -> (obs, reward, terminated, truncated, info)
+#   VecWalkEnv: BatchWalkSim で N 本を 1 回の呼び出しで進める。終わったゲームはその場でやり直す
+# 観測は特徴量ベクトル（env.obs_size 個の float32。既定の 3 レーンなら OBS_SIZE 個）か、
+# obs_type="pixels" なら 160x120 のパレット番号の画面
+# level（walk_level.Level）を渡すとそのレベルで遊ぶ。レーンの数が違えば特徴量の数も変わる
+
+# 行動: 左右（なし・左・右）x シフト x スペース の 12 通り
+ACTION_BUTTONS = tuple(
+    direction | dash | fire
+    for fire in (0, BTN_SPACE)
+    for dash in (0, BTN_SHIFT)
+    for direction in (0, BTN_LEFT, BTN_RIGHT)
+)
+N_ACTIONS = len(ACTION_BUTTONS)
+
+# 特徴量: レーンごとに [障害物, ゴミ袋, アイテム] までの距離（レーンの数 x 3）+ 犬・ゲージ・昼夜・タイマー・進行度
+N_LANES = 3  # 既定のレーンの数
+ENTITY_GROUPS = 3
+N_FEATURES = 13
+
+# 報酬: 進行度 1 周分で PROGRESS_REWARD、クリアで CLEAR_REWARD、ゲームオーバーで DEATH_PENALTY
+# 便意ゲージが POOP_WARNING を超えている間は毎フレーム少しずつ減点
+PROGRESS_REWARD = 10.0
+CLEAR_REWARD = 10.0
+DEATH_PENALTY = -10.0
+POOP_WARNING = 70
+POOP_PENALTY = 0.02
+
+
+def obs_size(n_lanes):
+    return n_lanes * ENTITY_GROUPS + N_FEATURES
+
+
+OBS_SIZE = obs_size(N_LANES)
+
+
+def lane_count(level=None, params=None):
+    # level と上書きの値で遊ぶときのレーンの数
+    sim = WalkSim()
+    if level is not None:
+        level.apply(sim)
+    set_params(sim, params or {})
+    return len(sim.lane_centers)
+
+
+def poop_penalty(poop_gauge):
+    return POOP_PENALTY * np.clip((poop_gauge - POOP_WARNING) / (100 - POOP_WARNING), 0, 1)
+
+
+class WalkEnv:
+    # WalkSim 1 本を包んだ環境。タイトル画面は reset() の中で飛ばす
+
+    def __init__(self, obs_type="features", max_steps=5000, level=None, **params):
+        if obs_type not in ("features", "pixels"):
+            raise ValueError(f"unknown obs_type: {obs_type}")
+        self.obs_type = obs_type
+        self.max_steps = max_steps
+        self.level = level
+        self.params = params  # WalkSim の調整用の値を上書きする（level の値より後に入れる）
+        self.obs_size = obs_size(lane_count(level, params))
+        self.sim = None
+        self.steps = 0
+        self.renderer = None
+
+    def reset(self, seed=None):
+        if seed is None:
+            seed = 0 if self.sim is None else self.sim.rng.randint(0, 0x7FFFFFFF)
+        sim = self.sim = WalkSim(seed) if self.level is None else self.level.new_sim(seed)
+        set_params(sim, self.params)
+        sim.step(BTN_S)
+        self.steps = 0
+        return self.observe(), {}
+
+    def step(self, action):
+        sim = self.sim
+        progress = sim.progress
+        sim.step(ACTION_BUTTONS[action])
+        self.steps += 1
+
+        reward = PROGRESS_REWARD * (sim.progress - progress) / sim.max_progress
+        reward -= float(poop_penalty(sim.poop_gauge))
+        terminated = sim.game_over or sim.is_cleared
+        if sim.game_over:
+            reward += DEATH_PENALTY
+        elif sim.is_cleared:
+            reward += CLEAR_REWARD
+        truncated = not terminated and self.steps >= self.max_steps
+        info = {"game_over_reason": sim.game_over_reason} if sim.game_over else {}
+        return self.observe(), reward, terminated, truncated, info
+
+    def observe(self):
+        if self.obs_type == "pixels":
+            if self.renderer is None:
+                self.renderer = PixelRenderer()
+            return self.renderer.render(self.sim)
+        return observe_sim(self.sim)
+
+
+class PixelRenderer:
+    # ゲーム画面を Framebuffer に描き、(120, 160) の uint8 配列（パレット番号）で返す（pyxel は不要）
+    def __init__(self):
+        self.screen = Framebuffer(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.sprites = SpriteCache(self.screen, bank=Framebuffer(256, 256))
+
+    def render(self, sim):
+        draw_scene(self.screen, sim, self.sprites, sim.frame_count)
+        return self.screen.pixels.copy()
+
+
+def observe_sim(sim):
+    # WalkSim から特徴量ベクトルを作る（obs_size(レーンの数) 個）
+    n_lanes = len(sim.lane_index.lanes)
+    obs = np.empty(obs_size(n_lanes), dtype=np.float32)
+    obs[:n_lanes * ENTITY_GROUPS] = 1.0
+    groups = {id(sim.obstacles): 0, id(sim.trash_bags): 1}
+    pet_y = sim.pet_y
+    for lane_no, lane in enumerate(sim.lane_index.lanes):
+        base = lane_no * ENTITY_GROUPS
+        for pool, i in lane:
+            y = pool.y[i]
+            if y >= pet_y + 12:
+                continue
+            k = base + groups.get(id(pool), 2)
+            obs[k] = min(obs[k], (pet_y - y) / sim.height)
+    k = n_lanes * ENTITY_GROUPS
+    obs[k:] = (
+        (sim.pet_x - sim.left_wall) / (sim.right_wall - sim.left_wall),
+        sim.pet_vx / sim.pet_speed_fast,
+        sim.poop_gauge / 100,
+        sim.stamina_gauge / 100,
+        sim.speed / sim.max_speed,
+        sim.day_cycle / 0.6,
+        sim.is_darkening,
+        sim.has_power,
+        sim.power_timer / sim.power_duration,
+        sim.has_flashlight,
+        sim.fl_timer / sim.flashlight_duration,
+        sim.reload_timer / max(sim.reload_time, 1),
+        sim.progress / sim.max_progress,
+    )
+    return obs
+
+
+class VecWalkEnv:
+    # BatchWalkSim で n 本の環境をまとめて進める
+    # step() で終わった環境はその場で reset_rows し、返す観測は次のゲームの最初のもの
+    # 終わった時点の観測は info["final_observation"] の同じ行に入る
+
+    def __init__(self, n, max_steps=5000, **params):
+        self.n = n
+        self.max_steps = max_steps
+        self.params = params  # BatchWalkSim の調整用の値（行ごとの配列も可）と level
+        self.obs_size = obs_size(lane_count(params.get("level")))
+        self.batch = None
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.buttons = np.array(ACTION_BUTTONS, dtype=np.int64)
+
+    def reset(self, seed=0):
+        self.batch = BatchWalkSim(self.n, seed, **self.params)
+        self.steps[:] = 0
+        return self.observe(), {}
+
+    def step(self, actions):
+        batch = self.batch
+        progress = batch.progress.copy()
+        batch.step(self.buttons[actions])
+        self.steps += 1
+
+        reward = PROGRESS_REWARD * (batch.progress - progress) / batch.max_progress
+        reward -= poop_penalty(batch.poop_gauge)
+        reward += np.where(batch.game_over, DEATH_PENALTY, 0.0)
+        reward += np.where(batch.is_cleared, CLEAR_REWARD, 0.0)
+        terminated = batch.game_over | batch.is_cleared
+        truncated = ~terminated & (self.steps >= self.max_steps)
+
+        obs = self.observe()
+        info = {}
+        done = terminated | truncated
+        if done.any():
+            rows = np.nonzero(done)[0]
+            info["final_observation"] = obs.copy()
+            info["game_over_reason"] = batch.game_over_reason.copy()
+            batch.reset_rows(rows)
+            self.steps[rows] = 0
+            obs[rows] = self.observe(rows)  # やり直した行だけ作り直す
+        return obs, reward.astype(np.float32), terminated, truncated, info
+
+    def observe(self, rows=slice(None)):
+        # (n, obs_size) の特徴量（WalkEnv の observe_sim と同じ並び）。rows を渡したらその行の分だけ作る
+        batch = self.batch
+        pet_x = batch.pet_x[rows]
+        n_lanes = len(batch.lane_centers)
+        obs = np.empty((len(pet_x), obs_size(n_lanes)), dtype=np.float32)
+
+        pet_y = batch.pet_y
+        ent_y = batch.ent_y[rows]
+        ahead = batch.ent_alive[rows] & (ent_y < pet_y + 12)
+        dist = np.where(ahead, (pet_y - ent_y) / batch.height, 1.0)
+        lane = np.abs(batch.ent_x[rows][:, :, None] - batch.lane_centers).argmin(axis=2)
+        group = np.minimum(batch.ent_kind[rows], 2)
+        for lane_no in range(n_lanes):
+            in_lane = lane == lane_no
+            for g in range(ENTITY_GROUPS):
+                mask = in_lane & (group == g)
+                obs[:, lane_no * ENTITY_GROUPS + g] = np.where(mask, dist, 1.0).min(axis=1)
+        k = n_lanes * ENTITY_GROUPS
+        obs[:, k] = (pet_x - batch.left_wall) / (batch.right_wall - batch.left_wall)
+        obs[:, k + 1] = batch.pet_vx[rows] / batch.pet_speed_fast[rows]
+        obs[:, k + 2] = batch.poop_gauge[rows] / 100
+        obs[:, k + 3] = batch.stamina_gauge[rows] / 100
+        obs[:, k + 4] = batch.speed[rows] / batch.max_speed[rows]
+        obs[:, k + 5] = batch.day_cycle[rows] / 0.6
+        obs[:, k + 6] = batch.is_darkening[rows]
+        obs[:, k + 7] = batch.has_power[rows]
+        obs[:, k + 8] = batch.power_timer[rows] / batch.power_duration[rows]
+        obs[:, k + 9] = batch.has_flashlight[rows]
+        obs[:, k + 10] = batch.fl_timer[rows] / batch.flashlight_duration[rows]
+        obs[:, k + 11] = batch.reload_timer[rows] / np.maximum(batch.reload_time[rows], 1)
+        obs[:, k + 12] = batch.progress[rows] / batch.max_progress[rows]
+        return obs
@@ -0,0 +1,319 @@
+import math
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from walk_sprites import PALETTE
+
+# pyxel を使わずに NumPy の配列（パレット番号の uint8）に描く画面
+# ゴールデンフレームの比較、サムネイル、強化学習の画素の観測を pyxel なしで高速に作るためのもの
+# pyxel.Image と同じ描画関数（cls / pset / rect / rectb / circ / circb / tri / text / blt）と set を持つので
+# draw_scene や SpriteCache にそのまま渡せる
+# 座標の丸め方、円と三角形の塗り方は pyxel 2 に合わせてあり、pyxel.Image と画素単位で一致する
+# circs / tris は多数の円・三角形を 1 回の呼び出しでまとめて描く（重なったところは後のものが上）
+
+# 16 進の 1 文字（"0"〜"f" の文字コード）-> 色の番号（set 用）
+HEX_COLORS = np.zeros(256, dtype=np.uint8)
+for i, c in enumerate(b"0123456789abcdef"):
+    HEX_COLORS[c] = i
+    HEX_COLORS[ord(chr(c).upper())] = i
+
+# pyxel の 4x6 のフォント（" " から "~" まで。1 文字 24 ビットで、上の行・左の列から）
+FONT_WIDTH = 4
+FONT_HEIGHT = 6
+FONT_FIRST = 32
+FONT_DATA = (
+    "000000 444040 aa0000 aeaea0 6c6c40 824820 4a4ac0 440000 244420 844480 a4e4a0 04e400 "
+    "000480 00e000 000040 224880 6aaac0 4c4440 c248e0 c242c0 aae220 e8c2c0 68eae0 e24880 "
+    "eaeae0 eae2c0 040400 040480 248420 0e0e00 842480 e24040 4aa860 4aeaa0 cacac0 688860 "
+    "caaac0 e8e8e0 e8e880 68ea60 aaeaa0 e444e0 222a40 aacaa0 8888e0 aeeaa0 caaaa0 4aaa40 "
+    "cac880 4aae60 caeca0 6842c0 e44440 aaaa60 aaaa40 aaeea0 aa4aa0 aa4440 e248e0 644460 "
+    "884220 c444c0 4a0000 0000e0 840000 06aa60 8caac0 068860 26aa60 06ac60 24e440 06ae24 "
+    "8caaa0 404440 2022a4 8acca0 c444e0 0eeea0 0caaa0 04aa40 0caac8 06aa62 068880 06c6c0 "
+    "4e4460 0aaa60 0aaa40 0aaee0 0a44a0 0aa624 0e24e0 64c460 444440 c464c0 6c0000"
+)
+FONT = np.array(
+    [[[int(code, 16) >> (23 - y * FONT_WIDTH - x) & 1 for x in range(FONT_WIDTH)]
+      for y in range(FONT_HEIGHT)] for code in FONT_DATA.split()],
+    dtype=bool,
+)
+
+
+def to_int(v):
+    # pyxel と同じ丸め（f32 にしてから 0 から遠い方へ四捨五入）
+    if type(v) is int:
+        return v
+    v = float(np.float32(v))
+    return math.floor(v + 0.5) if v >= 0 else -math.floor(-v + 0.5)
+
+
+def to_ints(v):
+    v = np.asarray(v, dtype=np.float32).astype(np.float64)
+    return (np.sign(v) * np.floor(np.abs(v) + 0.5)).astype(np.int64)
+
+
+def circle_extent(r):
+    # 中心からの距離 d の行（列）で塗る半幅（d = 0..r）
+    d = np.arange(r + 1)
+    return np.floor(np.sqrt(r * r - d * d) + 0.51).astype(np.int64)
+
+
+@lru_cache(maxsize=None)
+def circle_mask(r):
+    # 半径 r の塗りつぶした円（(2r+1) x (2r+1) の bool）
+    a = circle_extent(r)
+    d = np.abs(np.arange(-r, r + 1))
+    dy = d[:, None]
+    dx = d[None, :]
+    return (dx <= a[dy]) | (dy <= a[dx])
+
+
+@lru_cache(maxsize=None)
+def circle_outline(r):
+    # 半径 r の円の輪郭
+    a = circle_extent(r)
+    d = np.abs(np.arange(-r, r + 1))
+    dy = d[:, None]
+    dx = d[None, :]
+    return (dx == a[dy]) | (dy == a[dx])
+
+
+@lru_cache(maxsize=None)
+def circle_offsets(r):
+    # 塗りつぶした円の画素の中心からのずれ (dy, dx)
+    dy, dx = np.nonzero(circle_mask(r))
+    return dy - r, dx - r
+
+
+@lru_cache(maxsize=256)
+def text_mask(s):
+    # 文字列の画素（改行で次の行。フォントにない文字は詰めて飛ばす）
+    lines = [[ord(c) - FONT_FIRST for c in line if FONT_FIRST <= ord(c) < FONT_FIRST + len(FONT)]
+             for line in s.split("\n")]
+    width = max(len(codes) for codes in lines) * FONT_WIDTH
+    mask = np.zeros((len(lines) * FONT_HEIGHT, width), dtype=bool)
+    for i, codes in enumerate(lines):
+        if codes:
+            glyphs = FONT[codes].transpose(1, 0, 2).reshape(FONT_HEIGHT, -1)
+            mask[i * FONT_HEIGHT:(i + 1) * FONT_HEIGHT, :glyphs.shape[1]] = glyphs
+    return mask
+
+
+class Framebuffer:
+    def __init__(self, width=160, height=120):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width), dtype=np.uint8)
+        self.remap = None  # pal() で置き換える色の表（置き換えなしなら None）
+
+    def clip(self, x, y, w, h):
+        # (x, y, w, h) の範囲のうち画面に入る部分の画面側と元側の切り出し（入らなければ None）
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return (slice(y0, y1), slice(x0, x1)), (slice(y0 - y, y1 - y), slice(x0 - x, x1 - x))
+
+    def paint(self, x, y, mask, col):
+        # mask の True の画素を (x, y) を左上にして col で塗る
+        h, w = mask.shape
+        window = self.clip(x, y, w, h)
+        if window is not None:
+            dst, src = window
+            self.pixels[dst][mask[src]] = self.color(col)
+
+    def pal(self, col1=None, col2=None):
+        # pyxel.Image.pal と同じ: これから描く色 col1 を col2 にする（引数なしで元に戻す）
+        # blt では透明色を元の色で比べてから置き換える
+        if col1 is None:
+            self.remap = None
+            return
+        if self.remap is None:
+            self.remap = np.arange(256, dtype=np.uint8)
+        self.remap[col1] = col2
+
+    def color(self, col):
+        # pal() の置き換えをした色（配列でもよい）
+        return col if self.remap is None else self.remap[col]
+
+    def cls(self, col):
+        self.pixels.fill(self.color(col))
+
+    def pset(self, x, y, col):
+        x = to_int(x)
+        y = to_int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            self.pixels[y, x] = self.color(col)
+
+    def rect(self, x, y, w, h, col):
+        window = self.clip(to_int(x), to_int(y), to_int(w), to_int(h))
+        if window is not None:
+            self.pixels[window[0]] = self.color(col)
+
+    def rectb(self, x, y, w, h, col):
+        x = to_int(x)
+        y = to_int(y)
+        w = to_int(w)
+        h = to_int(h)
+        if w < 1 or h < 1:
+            return
+        self.rect(x, y, w, 1, col)
+        self.rect(x, y + h - 1, w, 1, col)
+        self.rect(x, y, 1, h, col)
+        self.rect(x + w - 1, y, 1, h, col)
+
+    def circ(self, x, y, r, col):
+        r = max(to_int(r), 0)
+        self.paint(to_int(x) - r, to_int(y) - r, circle_mask(r), col)
+
+    def circb(self, x, y, r, col):
+        r = max(to_int(r), 0)
+        self.paint(to_int(x) - r, to_int(y) - r, circle_outline(r), col)
+
+    def tri(self, x1, y1, x2, y2, x3, y3, col):
+        self.tris([x1], [y1], [x2], [y2], [x3], [y3], [col])
+
+    def text(self, x, y, s, col):
+        self.paint(to_int(x), to_int(y), text_mask(s), col)
+
+    def set(self, x, y, data):
+        # pyxel.Image.set と同じ: data は 1 行ごとの文字列で、1 文字が 1 画素の色（16 進）
+        if not data:
+            return
+        h, w = len(data), len(data[0])
+        codes = np.frombuffer("".join(data).encode(), dtype=np.uint8).reshape(h, w)
+        window = self.clip(x, y, w, h)
+        if window is not None:
+            dst, src = window
+            self.pixels[dst] = HEX_COLORS[codes[src]]
+
+    def blt(self, x, y, img, u, v, w, h, colkey=None):
+        # img は Framebuffer（幅・高さが負なら反転）
+        x = to_int(x)
+        y = to_int(y)
+        u = to_int(u)
+        v = to_int(v)
+        w = to_int(w)
+        h = to_int(h)
+        src = img.pixels[v:v + abs(h), u:u + abs(w)]
+        if w < 0:
+            src = src[:, ::-1]
+        if h < 0:
+            src = src[::-1]
+        window = self.clip(x, y, src.shape[1], src.shape[0])
+        if window is None:
+            return
+        dst, part = window
+        src = src[part]
+        if colkey is None:
+            self.pixels[dst] = self.color(src)
+        else:
+            np.copyto(self.pixels[dst], self.color(src), where=src != colkey)
+
+    def circs(self, xs, ys, rs, cols):
+        # 円をまとめて描く（引数は同じ長さの配列。色は 1 つの値でもよい）
+        xs = to_ints(xs)
+        ys = to_ints(ys)
+        rs = np.maximum(to_ints(rs), 0)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.uint8), xs.shape)
+        parts = []
+        for r in np.unique(rs):
+            which = np.nonzero(rs == r)[0]
+            dy, dx = circle_offsets(int(r))
+            parts.append((
+                (ys[which, None] + dy).ravel(),
+                (xs[which, None] + dx).ravel(),
+                np.repeat(which, len(dy)),
+            ))
+        if parts:
+            py, px, order = (np.concatenate(p) for p in zip(*parts))
+            self.fill(py, px, order, cols[order])
+
+    def tris(self, x1, y1, x2, y2, x3, y3, cols):
+        # 三角形をまとめて描く。pyxel と同じく頂点を y で並べ、
+        # 真ん中の頂点の高さで長い辺を区切って上下の半分を 1 行ずつ塗る
+        xa, ya, xb, yb, xc, yc = (to_ints(v) for v in (x1, y1, x2, y2, x3, y3))
+        n = len(xa)
+        cols = np.broadcast_to(np.asarray(cols, dtype=np.uint8), (n,))
+        # 頂点を y の小さい順（同じなら x の小さい順）に並べる
+        vx = np.stack([xa, xb, xc], axis=1)
+        vy = np.stack([ya, yb, yc], axis=1)
+        order = np.lexsort((vx, vy), axis=1)
+        vx = np.take_along_axis(vx, order, axis=1)
+        vy = np.take_along_axis(vy, order, axis=1)
+        xa, xb, xc = vx.T
+        ya, yb, yc = vy.T
+
+        def slope(dx, dy):
+            return np.where(dy == 0, np.float32(0), dx.astype(np.float32) / np.maximum(dy, 1).astype(np.float32))
+
+        a12 = slope(xb - xa, yb - ya)
+        a13 = slope(xc - xa, yc - ya)
+        a23 = slope(xc - xb, yc - yb)
+        x_inter = to_ints(xa.astype(np.float32) + a13 * (yb - ya).astype(np.float32))
+
+        # 1 行ずつ（三角形の番号, y）に展開する
+        rows = yc - ya + 1
+        t = np.repeat(np.arange(n), rows)
+        y = ya[t] + np.arange(rows.sum()) - np.repeat(np.cumsum(rows) - rows, rows)
+        dy = (y - yb[t]).astype(np.float32)
+        long_edge = to_ints(x_inter[t].astype(np.float32) + a13[t] * dy)
+        short_edge = to_ints(xb[t].astype(np.float32) + np.where(y <= yb[t], a12[t], a23[t]) * dy)
+        # 長い辺が左か右かは真ん中の頂点の高さで決める（途中で逆転した行は塗らない）
+        left_long = x_inter[t] < xb[t]
+        x0 = np.where(left_long, long_edge, short_edge)
+        x1 = np.where(left_long, short_edge, long_edge)
+
+        inside = (y >= 0) & (y < self.height)
+        x0 = np.maximum(x0, 0)
+        x1 = np.minimum(x1, self.width - 1)
+        keep = inside & (x0 <= x1)
+        t, y, x0, x1 = t[keep], y[keep], x0[keep], x1[keep]
+        lengths = x1 - x0 + 1
+        k = np.repeat(np.arange(len(t)), lengths)
+        px = x0[k] + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        self.fill(y[k], px, t[k], cols[t[k]])
+
+    def fill(self, ys, xs, order, cols):
+        # 画素をまとめて塗る。同じ画素に複数あれば order の大きい（後に描いた）ものを残す
+        ok = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        index = ys[ok] * self.width + xs[ok]
+        order = order[ok]
+        cols = cols[ok]
+        last = np.lexsort((order, index))
+        index = index[last]
+        top = np.ones(len(index), dtype=bool)
+        top[:-1] = index[1:] != index[:-1]
+        self.pixels.reshape(-1)[index[top]] = self.color(cols[last][top])
+
+    def to_rgb(self, palette=PALETTE):
+        # (高さ, 幅, 3) の RGB 画像
+        table = np.array([[c >> 16 & 0xFF, c >> 8 & 0xFF, c & 0xFF] for c in palette], dtype=np.uint8)
+        return table[self.pixels]
+
+    def thumbnail(self, scale=2):
+        # 1/scale に縮小したパレット番号の画像（各ブロックの左上の画素）
+        return self.pixels[::scale, ::scale].copy()
+
+    def save_png(self, path, scale=1, palette=PALETTE):
+        # RGB の PNG で保存する（scale 倍に拡大）
+        rgb = self.to_rgb(palette)
+        if scale != 1:
+            rgb = rgb.repeat(scale, axis=0).repeat(scale, axis=1)
+        h, w, _ = rgb.shape
+        raw = np.zeros((h, w * 3 + 1), dtype=np.uint8)
+        raw[:, 1:] = rgb.reshape(h, -1)
+
+        def chunk(kind, data):
+            body = kind + data
+            return len(data).to_bytes(4, "big") + body + zlib.crc32(body).to_bytes(4, "big")
+
+        header = w.to_bytes(4, "big") + h.to_bytes(4, "big") + bytes((8, 2, 0, 0, 0))
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n")
+            f.write(chunk(b"IHDR", header))
+            f.write(chunk(b"IDAT", zlib.compress(raw.tobytes())))
+            f.write(chunk(b"IEND", b""))
@@ -0,0 +1,158 @@
+import mmap
+import os
+import struct
+import uuid
+from array import array
+
+# ゴースト: 前の走りの犬の x をフレームごとに記録しておき、今の走りに重ねて半透明の犬で描く
+# 記録は 1 フレーム 1 バイトの差分（array("b")、1 回の走りで 1000 バイトほど）
+# レベルごとに ghosts/<レベル名>/ にスコアの上位 MAX_GHOSTS 本を置き、読み込みは mmap（全体を読まない）
+# 再生は 1 フレームごとに差分を 1 つ足すだけなので、本数が増えても 1 フレームの手間はほとんど変わらない
+#
+# ファイル: HEADER（MAGIC, バージョン, スコア, シード, 最初の x, フレーム数）+ 差分（i8 x フレーム数）
+# x は整数に丸めて記録する（丸めた位置どうしの差分なので、長く走っても誤差はたまらない）
+
+GHOST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ghosts")
+MAX_GHOSTS = 10
+MAGIC = b"DGGH"
+VERSION = 1
+HEADER = struct.Struct("<4sBdIhI")
+
+
+class GhostTrace:
+    # 記録中の走り
+    def __init__(self, x):
+        self.start_x = round(x)
+        self.x = self.start_x
+        self.deltas = array("b")
+
+    def record(self, x):
+        delta = max(-128, min(127, round(x) - self.x))
+        self.deltas.append(delta)
+        self.x += delta
+
+
+class Ghost:
+    # 保存したゴーストを mmap で開いて先頭から再生する
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.score, self.seed, self.start_x, ticks = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or len(self.map) != HEADER.size + ticks:
+            self.map.close()
+            raise ValueError(f"not a ghost file: {path}")
+        self.deltas = memoryview(self.map)[HEADER.size:].cast("b")
+        self.rewind()
+
+    def rewind(self):
+        self.x = self.start_x
+        self.tick = 0
+
+    def advance(self):
+        # 1 フレーム進める（記録が終わったら False。その走りはそこで倒れた）
+        if self.tick >= len(self.deltas):
+            return False
+        self.x += self.deltas[self.tick]
+        self.tick += 1
+        return True
+
+    @property
+    def running(self):
+        return self.tick < len(self.deltas)
+
+    def close(self):
+        self.deltas.release()
+        self.map.close()
+
+
+def write_ghost(path, trace, score, seed):
+    # 別名で書いてから置き換える
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, score, seed & 0xFFFFFFFF, trace.start_x, len(trace.deltas)))
+        f.write(trace.deltas.tobytes())
+    os.replace(tmp, path)
+
+
+class GhostBoard:
+    # レベルごとのゴーストの上位 limit 本（ファイルは ghosts/<レベル名>/*.ghost）
+
+    def __init__(self, level="default", root=GHOST_DIR, limit=MAX_GHOSTS):
+        self.dir = os.path.join(root, level)
+        self.limit = limit
+        self.ghosts = []
+        self.load()
+
+    def load(self, prune=False):
+        # スコアの高い順に limit 本まで開く（prune なら入らなかったファイルを消す）
+        self.close()
+        ghosts = []
+        if os.path.isdir(self.dir):
+            for name in os.listdir(self.dir):
+                if name.endswith(".ghost"):
+                    try:
+                        ghosts.append(Ghost(os.path.join(self.dir, name)))
+                    except (OSError, ValueError):
+                        pass
+        ghosts.sort(key=lambda ghost: -ghost.score)
+        for ghost in ghosts[self.limit:]:
+            ghost.close()
+            if prune:
+                try:
+                    os.remove(ghost.path)
+                except OSError:
+                    pass
+        self.ghosts = ghosts[:self.limit]
+        return self.ghosts
+
+    def qualifies(self, score):
+        return len(self.ghosts) < self.limit or score > self.ghosts[-1].score
+
+    def submit(self, trace, score, seed):
+        # 上位に入るなら保存し、あふれた分のファイルを消す
+        if not trace.deltas or not self.qualifies(score):
+            return False
+        os.makedirs(self.dir, exist_ok=True)
+        write_ghost(os.path.join(self.dir, f"{uuid.uuid4().hex}.ghost"), trace, score, seed)
+        self.load(prune=True)
+        return True
+
+    def close(self):
+        for ghost in self.ghosts:
+            ghost.close()
+        self.ghosts = []
+
+
+class GhostRun:
+    # ゲームに付けて使う: step(sim) を WalkSim.step のあとに毎回呼ぶ
+    # プレイ中は犬の x を記録しながらゴーストを 1 フレームずつ進め、走りが終わったら上位に入れば保存する
+
+    def __init__(self, board):
+        self.board = board
+        self.trace = None
+        self.finished = False
+
+    def step(self, sim):
+        if not sim.game_started:
+            self.trace = None
+            self.finished = False
+            return
+        if sim.game_over or sim.is_cleared:
+            if self.trace is not None and not self.finished:
+                self.board.submit(self.trace, sim.total_score(), sim.seed)
+                self.finished = True
+            return
+        if self.trace is None:
+            self.trace = GhostTrace(sim.pet_x)
+            for ghost in self.board.ghosts:
+                ghost.rewind()
+        self.trace.record(sim.pet_x)
+        for ghost in self.board.ghosts:
+            ghost.advance()
+
+    def positions(self):
+        # 描画用: 走っているゴーストの x
+        if self.trace is None or self.finished:
+            return []
+        return [ghost.x for ghost in self.board.ghosts if ghost.tick and ghost.running]
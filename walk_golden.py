@@ -0,0 +1,168 @@
+import argparse
+import sys
+
+import numpy as np
+
+from walk_bots import dodge, idle
+from walk_core import BTN_S, WalkSim
+from walk_draw import draw_scene
+from walk_framebuffer import Framebuffer
+from walk_sprites import SpriteCache
+
+# ゴールデンフレーム: 決まった場面の画面を Framebuffer に描き、保存しておいた画面と画素単位で比べる
+# 描画を変えたときに見た目が変わっていないことを pyxel なしで確かめる
+#
+#   python walk_golden.py            # 保存してある画面と比べる（違えば終了コード 1）
+#   python walk_golden.py --update   # 今の描画で保存し直す
+#   python walk_golden.py --png out  # 場面ごとの PNG を書き出す
+#   python walk_golden.py --pyxel    # pyxel.Image に描いたものとも比べる
+
+GOLDEN_FILE = "golden_frames.npz"
+SEED = 1
+
+
+def play_until(sim, policy, done, max_ticks=20000):
+    for _ in range(max_ticks):
+        if done(sim):
+            break
+        sim.step(policy(sim))
+    return sim
+
+
+def scene_title(seed):
+    sim = WalkSim(seed)
+    for _ in range(20):
+        sim.step(0)
+    return sim
+
+
+def scene_hud(seed):
+    return play_until(WalkSim(seed), dodge, lambda sim: sim.frame_count >= 120 or sim.game_over)
+
+
+def scene_night(seed):
+    return play_until(WalkSim(seed), dodge, lambda sim: not sim.is_darkening or sim.game_over)
+
+
+def scene_dusk(seed):
+    # 暗くなりかけ（夜の明かりの途中の段）
+    return play_until(WalkSim(seed), dodge, lambda sim: sim.day_cycle >= 0.44 or sim.game_over)
+
+
+def scene_night_flashlight(seed):
+    # 夜に懐中電灯を持って左にダッシュしているところ（左右反転したマスク）
+    sim = scene_night(seed)
+    sim.has_flashlight = True
+    sim.fl_timer = sim.flashlight_duration - 10
+    sim.pet_vx = -sim.pet_speed_fast
+    return sim
+
+
+def start_near_goal(seed):
+    # ゴールの手前から始める
+    sim = WalkSim(seed)
+    sim.step(BTN_S)
+    sim.progress = sim.max_progress - 1
+    return sim
+
+
+def scene_clear_door(seed):
+    return play_until(start_near_goal(seed), dodge, lambda sim: sim.door_state >= 3 or sim.game_over)
+
+
+def scene_clear_screen(seed):
+    return play_until(start_near_goal(seed), dodge,
+                      lambda sim: sim.show_clear_screen or sim.game_over)
+
+
+def scene_game_over(seed):
+    return play_until(WalkSim(seed), idle, lambda sim: sim.game_over)
+
+
+SCENES = {
+    "title": scene_title,
+    "hud": scene_hud,
+    "dusk": scene_dusk,
+    "night": scene_night,
+    "night_flashlight": scene_night_flashlight,
+    "clear_door": scene_clear_door,
+    "clear_screen": scene_clear_screen,
+    "game_over": scene_game_over,
+}
+
+
+def render_scenes(screen, sprites, seed=SEED):
+    # 場面ごとの画面（パレット番号の配列）を返す
+    frames = {}
+    for name, make in SCENES.items():
+        sim = make(seed)
+        draw_scene(screen, sim, sprites, sim.frame_count)
+        frames[name] = np.array(pixels_of(screen))
+    return frames
+
+
+def pixels_of(screen):
+    if isinstance(screen, Framebuffer):
+        return screen.pixels
+    return np.frombuffer(screen.data_ptr(), dtype=np.uint8).reshape(screen.height, screen.width)
+
+
+def render_framebuffer(seed=SEED):
+    screen = Framebuffer()
+    return render_scenes(screen, SpriteCache(screen, bank=Framebuffer(256, 256)), seed)
+
+
+def render_pyxel(seed=SEED):
+    import pyxel  # 比べるときだけ必要
+
+    screen = pyxel.Image(Framebuffer().width, Framebuffer().height)
+    return render_scenes(screen, SpriteCache(screen, bank=pyxel.Image(256, 256)), seed)
+
+
+def compare(name, expected, actual):
+    # 違う画素の数を表示し、一致したかを返す
+    if expected.shape != actual.shape:
+        print(f"{name}: size {actual.shape} != {expected.shape}")
+        return False
+    diff = int((expected != actual).sum())
+    print(f"{name}: {'ok' if diff == 0 else f'{diff} pixels differ'}")
+    return diff == 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ゴールデンフレームと今の描画を比べる")
+    parser.add_argument("--file", default=GOLDEN_FILE)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--update", action="store_true", help="今の描画で保存し直す")
+    parser.add_argument("--png", metavar="DIR", help="場面ごとの PNG を書き出す")
+    parser.add_argument("--scale", type=int, default=2, help="PNG の拡大率")
+    parser.add_argument("--pyxel", action="store_true", help="pyxel.Image に描いたものとも比べる")
+    args = parser.parse_args(argv)
+
+    frames = render_framebuffer(args.seed)
+    if args.png:
+        image = Framebuffer()
+        for name, pixels in frames.items():
+            image.pixels[:] = pixels
+            image.save_png(f"{args.png}/{name}.png", args.scale)
+    if args.update:
+        np.savez_compressed(args.file, **frames)
+        print(f"saved {len(frames)} frames to {args.file}")
+        return 0
+
+    ok = True
+    golden = np.load(args.file)
+    for name, pixels in frames.items():
+        if name not in golden:
+            print(f"{name}: missing from {args.file}")
+            ok = False
+        else:
+            ok &= compare(name, golden[name], pixels)
+    if args.pyxel:
+        for name, pixels in render_pyxel(args.seed).items():
+            ok &= compare(f"{name} (pyxel)", pixels, frames[name])
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,279 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import queue
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+# ランキング（ゲームオーバーとクリアの結果を集める）
+#   LeaderboardClient: submit() はキューに入れてすぐ戻る。送るのは別スレッドで、
+#                      batch_wait の間に来たものを batch_size 件までまとめて 1 回の POST にする
+#                      送れなければ間隔を倍にしながら送り直し、送れていない分はスプールファイルに書いておく
+#                      （次に起動したときにスプールから送る）
+#   ScoreBoard / serve: 手元で動かす代わりのサーバー。POST /scores でまとめて登録、GET /top?n=10 で上位
+#
+#   python walk_leaderboard.py                 # サーバーを起動（127.0.0.1:8765）
+#   python walk_leaderboard.py --top 10        # 上位 10 件を表示
+#
+# 結果には送る側で id を付け、サーバーは同じ id を 2 度登録しない
+# （登録できたのに返事が届かず送り直したときも 1 件になる）
+
+DEFAULT_URL = "http://127.0.0.1:8765"
+SPOOL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".leaderboard_spool.jsonl")
+
+
+def run_result(sim, level=""):
+    # 1 回のプレイの結果（ゲームオーバーかクリアのとき）
+    return {
+        "id": uuid.uuid4().hex,
+        "score": round(sim.total_score(), 1),
+        "progress": int(sim.progress / sim.max_progress * 100),
+        "game_over_reason": sim.game_over_reason,
+        "cleared": sim.is_cleared,
+        "stage": sim.stage,
+        "seed": sim.seed,
+        "level": level,
+        "machine": platform.node(),
+        "time": time.time(),
+    }
+
+
+class LeaderboardClient:
+    # 結果をまとめて非同期に送る（ゲームのフレームを止めない）
+
+    def __init__(self, url=DEFAULT_URL, spool=SPOOL_PATH, batch_size=32, batch_wait=0.2,
+                 retry_delay=1.0, max_delay=60.0, timeout=2.0, max_spool=10000):
+        self.url = url.rstrip("/")
+        self.spool = spool
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait    # 1 件来てから続きを待つ秒数
+        self.retry_delay = retry_delay  # 送れなかったときの最初の待ち（失敗するたびに倍、max_delay まで）
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.max_spool = max_spool      # スプールに残す件数の上限（超えたら古いものから捨てる）
+        self.sent = 0
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    def submit(self, result):
+        # JSON にはここでする（送れない値が入っていたら呼んだ側でエラーにし、送るスレッドは止めない）
+        self.queue.put(json.dumps(result))
+
+    def close(self, timeout=5.0):
+        # 残りを送ってからスレッドを止める（送れなければスプールに残る）
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def run(self):
+        pending = self.load_spool()  # 前回送れなかった分から
+        delay = 0.0
+        retry_at = 0.0
+        while True:
+            closing = self.collect(pending, max(retry_at - time.monotonic(), 0) if pending else None)
+            if pending and (closing or time.monotonic() >= retry_at):
+                try:
+                    sent = self.send_all(pending)
+                except Exception as e:
+                    # 思わぬエラーでもスレッドは止めず、送れなかったときと同じに後で送り直す
+                    print(f"leaderboard: {type(e).__name__}: {e}", file=sys.stderr)
+                    sent = False
+                if sent:
+                    delay = 0.0
+                else:
+                    delay = min(max(delay * 2, self.retry_delay), self.max_delay)
+                    retry_at = time.monotonic() + delay
+                self.save_spool(pending)
+            elif pending:
+                self.save_spool(pending)  # 待っている間に来た分も落ちたときのために書いておく
+            if closing:
+                return
+
+    def collect(self, pending, timeout):
+        # 1 件目を timeout 秒（None なら来るまで）待ち、来たら batch_wait の間だけ続きも受け取る
+        # close() の印が来たら True
+        try:
+            item = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        deadline = time.monotonic() + self.batch_wait
+        while item is not None:
+            pending.append(item)
+            if len(pending) >= self.batch_size:
+                return False
+            try:
+                item = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return False
+        return True
+
+    def send_all(self, pending):
+        # batch_size 件ずつ送り、送れた分を pending から消す
+        while pending:
+            batch = pending[:self.batch_size]
+            if not self.send(batch):
+                return False
+            del pending[:len(batch)]
+            self.sent += len(batch)
+        return True
+
+    def send(self, batch):
+        # batch は submit() で JSON にした結果の文字列
+        body = ('{"scores": [' + ", ".join(batch) + "]}").encode()
+        request = Request(f"{self.url}/scores", data=body, headers={"Content-Type": "application/json"})
+        try:
+            with urlopen(request, timeout=self.timeout) as response:
+                return response.status == 200
+        except (OSError, ValueError, http.client.HTTPException):
+            return False
+
+    def load_spool(self):
+        if self.spool is None:
+            return []
+        pending = []
+        try:
+            with open(self.spool) as f:
+                for line in f:
+                    line = line.strip()
+                    try:
+                        json.loads(line)
+                    except ValueError:
+                        continue  # 壊れた行は捨てる（ほかの分は送る）
+                    pending.append(line)
+        except OSError:
+            pass
+        return pending
+
+    def save_spool(self, pending):
+        # 送れていない分でスプールを書き直す（全部送れたら消す）
+        if self.spool is None:
+            return
+        try:
+            if not pending:
+                if os.path.exists(self.spool):
+                    os.remove(self.spool)
+                return
+            del pending[:-self.max_spool]
+            tmp = f"{self.spool}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                for result in pending:
+                    f.write(result + "\n")
+            os.replace(tmp, self.spool)
+        except OSError:
+            pass
+
+
+def fetch_top(url=DEFAULT_URL, n=10, timeout=2.0):
+    # 上位 n 件を取る（待つのでゲーム中には呼ばない）
+    with urlopen(f"{url.rstrip('/')}/top?n={n}", timeout=timeout) as response:
+        return json.load(response)["scores"]
+
+
+class ScoreBoard:
+    # メモリ上の順位表。(-score, 受け付け順, 結果) をスコアの高い順に並べておく
+
+    def __init__(self):
+        self.entries = []
+        self.ids = set()
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def insert_many(self, results):
+        # まとめて足してから並べ直す（並んだ部分は 1 本の列として扱われるので、足した件数分の手間で済む）
+        added = 0
+        with self.lock:
+            for result in results:
+                key = result.get("id")
+                if key is not None:
+                    if key in self.ids:
+                        continue
+                    self.ids.add(key)
+                self.entries.append((-float(result["score"]), self.count, result))
+                self.count += 1
+                added += 1
+            self.entries.sort()  # 受け付け順は重ならないので結果どうしは比べない
+        return added
+
+    def top(self, n):
+        with self.lock:
+            return [result for _, _, result in self.entries[:n]]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class ScoreHandler(BaseHTTPRequestHandler):
+    board = None  # serve() で入れる
+    quiet = True
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/scores":
+            self.reply(404, {"error": "not found"})
+            return
+        try:
+            data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            results = data["scores"]
+            for result in results:
+                float(result["score"])
+        except (ValueError, KeyError, TypeError):
+            self.reply(400, {"error": "expected {\"scores\": [{\"score\": ...}, ...]}"})
+            return
+        added = self.board.insert_many(results)
+        self.reply(200, {"inserted": added, "total": len(self.board)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/top":
+            self.reply(404, {"error": "not found"})
+            return
+        try:
+            n = int(parse_qs(url.query).get("n", ["10"])[0])
+        except ValueError:
+            n = 10
+        self.reply(200, {"scores": self.board.top(max(0, min(n, 1000)))})
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def serve(host="127.0.0.1", port=8765, board=None, quiet=True):
+    # 代わりのサーバーを作る（serve_forever() で動かす。port=0 なら空いている番号）
+    handler = type("Handler", (ScoreHandler,), {"board": board or ScoreBoard(), "quiet": quiet})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ランキングの代わりのサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--top", type=int, metavar="N", help="サーバーは起動せず、上位 N 件を表示する")
+    parser.add_argument("--verbose", action="store_true", help="リクエストごとにログを出す")
+    args = parser.parse_args()
+    if args.top is not None:
+        for rank, result in enumerate(fetch_top(f"http://{args.host}:{args.port}", args.top), 1):
+            print(f"{rank:3}. {result['score']:10.1f}  {result.get('level') or '-':10} "
+                  f"seed {result.get('seed')}  {result.get('machine', '')}")
+    else:
+        server = serve(args.host, args.port, quiet=not args.verbose)
+        print(f"leaderboard on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import struct
+import sys
+from array import array
+
+from walk_core import WalkSim
+from walk_pool import LaneIndex
+
+# データファイル（levels/*.json）で定義するレベル
+#   {"name": "...", "params": {WalkSim の調整用の値の名前: 値, ...}}
+# 読み込み時に、シードごとの落下物の生成スケジュール（フレーム, レーン, 種類）を前もって作っておく
+# プレイ中の生成はスケジュールのカーソルを進めるだけになる（WalkSim.update の生成の部分）
+# スケジュールは設定のハッシュとシードをキーにしてディスクに置き、次からは読むだけにする
+#
+# スケジュールは犬の動きに関係なく決まる（拾った・撃ったもので空き判定は変わらない）ので、
+# 同じレベルとシードなら何度やり直しても同じ並びで落ちてくる
+#
+# "endless" があるレベルはクリアがなく、ステージごとに難しくなりながら続く（walk_endless）
+#   {"name": "...", "params": {...}, "endless": {walk_endless.RAMP_PARAMS の名前: 値, ...}}
+
+LEVEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "levels")
+CACHE_DIR = os.path.join(LEVEL_DIR, ".cache")
+
+# レベルで変えられる値（WalkSim の同名の属性）
+LEVEL_PARAMS = (
+    "lane_centers",
+    "lane_lines",
+    "left_wall",
+    "right_wall",
+    "pet_speed",
+    "pet_speed_fast",
+    "speed_increase",
+    "max_speed",
+    "min_spawn_distance",
+    "spawn_roll",
+    "spawn_period",
+    "min_spawn_interval",
+    "day_speed_range",
+    "night_speed_range",
+    "base_poop_increase",
+    "poop_acceleration",
+    "base_heal_amount",
+    "heal_acceleration",
+    "power_duration",
+    "reload_time",
+    "bullet_vy",
+    "flashlight_duration",
+    "max_progress",
+)
+TUPLE_PARAMS = ("lane_lines", "day_speed_range", "night_speed_range")
+
+# スケジュールのファイル: MAGIC, バージョン(u8), 件数(u32) + フレーム(u32 x 件数) + レーン(u8 x 件数) + 種類(u8 x 件数)
+# 生成の抽選の仕方を変えたら SCHEDULE_VERSION を上げる（ハッシュに入るので古いキャッシュは使われなくなる）
+SCHEDULE_MAGIC = b"DGSC"
+SCHEDULE_VERSION = 1
+SCHEDULE_HEADER = struct.Struct("<4sBI")
+
+
+class Level:
+    def __init__(self, name, params, endless=None):
+        for key in params:
+            if key not in LEVEL_PARAMS:
+                raise ValueError(f"unknown level parameter: {key}")
+        self.name = name
+        self.params = {
+            key: tuple(value) if key in TUPLE_PARAMS else value for key, value in params.items()
+        }
+        self.endless = endless  # エンドレスの難しさの上がり方（なければ普通のレベル）
+        self.source = name  # 読み直すときの名前かパス（load_level で読んだときはその引数）
+        text = json.dumps({"params": params, "endless": endless, "version": SCHEDULE_VERSION}, sort_keys=True)
+        self.hash = hashlib.sha1(text.encode()).hexdigest()
+
+    def apply(self, sim):
+        # 調整用の値を sim に入れる
+        set_params(sim, self.params)
+
+    def new_sim(self, seed, cache_dir=CACHE_DIR, sim=None):
+        # このレベルで遊ぶ WalkSim（生成はスケジュールから）。sim を渡したらそれに入れる（walk_pack.PackSim など）
+        if sim is None:
+            sim = WalkSim(seed)
+        self.apply(sim)
+        if self.endless is not None:
+            # スケジュールはステージごとに遊びながら作る（ディスクには置かない）
+            from walk_endless import Endless
+            sim.endless = Endless(self, seed)
+            sim.endless.enter(sim, 0)
+        else:
+            sim.schedule = self.schedule(seed, cache_dir)
+        return sim
+
+    def schedule(self, seed, cache_dir=CACHE_DIR):
+        # ディスクにあれば読み、なければ作って保存する（保存できなくてもそのまま使う）
+        path = os.path.join(cache_dir, f"{self.hash[:16]}-{seed}.sched") if cache_dir else None
+        if path is not None:
+            try:
+                return read_schedule(path)
+            except (OSError, ValueError):
+                pass
+        schedule = compile_schedule(self, seed)
+        if path is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                write_schedule(path, schedule)
+            except OSError:
+                pass
+        return schedule
+
+
+def load_level(path):
+    # levels/ の名前（"default"）かファイルのパスからレベルを読む
+    source = path
+    if not os.path.exists(path):
+        path = os.path.join(LEVEL_DIR, path + ".json")
+    with open(path) as f:
+        data = json.load(f)
+    name = data.get("name", os.path.splitext(os.path.basename(path))[0])
+    level = Level(name, data.get("params", {}), data.get("endless"))
+    level.source = source
+    return level
+
+
+def compile_schedule(level, seed):
+    # 犬のいない WalkSim で生成の部分だけを最後（クリア）まで進め、出したものを記録する
+    # 速度の上がり方・生成間隔・空き判定・抽選はプレイ中と同じ WalkSim のメソッドを使う
+    sim = WalkSim(seed)
+    level.apply(sim)
+    return record_spawns(sim, int(sim.max_progress * 2) + 1)  # 進行度は 1 フレーム 0.5
+
+
+def set_params(sim, params):
+    # 調整用の値を sim に入れる（レーンの数が変わったらレーンごとの並びも作り直す）
+    for key, value in params.items():
+        setattr(sim, key, value)
+    if len(sim.lane_index.lanes) != len(sim.lane_centers):
+        sim.lane_index = LaneIndex(len(sim.lane_centers))
+        sim.bullet_lanes = LaneIndex(len(sim.lane_centers))
+
+
+def record_spawns(sim, n_ticks, first_tick=0, out=None, start=0):
+    # sim の生成の部分だけを n_ticks フレーム目まで進め、first_tick 以降に出したものを記録する
+    # 何回かに分けて作るときは、前の回のスケジュールを out に、続きのフレームを start に渡す
+    ticks, lanes, kinds = (array("I"), array("B"), array("B")) if out is None else out
+    for tick in range(start, n_ticks):
+        if sim.speed < sim.max_speed:
+            sim.speed += sim.speed_increase
+        spawned = sim.roll_spawn(tick) if tick >= first_tick else None
+        if spawned is not None:
+            sim.spawn_kind(*spawned)
+            ticks.append(tick)
+            lanes.append(spawned[0])
+            kinds.append(spawned[1])
+        sim.move_entities()
+    return ticks, lanes, kinds
+
+
+def write_schedule(path, schedule):
+    # 別名で書いてから置き換える（途中で止まっても壊れたファイルを残さない）
+    ticks, lanes, kinds = schedule
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(SCHEDULE_HEADER.pack(SCHEDULE_MAGIC, SCHEDULE_VERSION, len(ticks)))
+        f.write(ticks.tobytes())
+        f.write(lanes.tobytes())
+        f.write(kinds.tobytes())
+    os.replace(tmp, path)
+
+
+def read_schedule(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, n = SCHEDULE_HEADER.unpack_from(data)
+    if magic != SCHEDULE_MAGIC or version != SCHEDULE_VERSION:
+        raise ValueError(f"not a schedule file: {path}")
+    ticks = array("I")
+    if len(data) != SCHEDULE_HEADER.size + n * (ticks.itemsize + 2):
+        raise ValueError(f"broken schedule file: {path}")
+    offset = SCHEDULE_HEADER.size
+    ticks.frombytes(data[offset:offset + n * ticks.itemsize])
+    offset += n * ticks.itemsize
+    lanes = array("B", data[offset:offset + n])
+    kinds = array("B", data[offset + n:offset + 2 * n])
+    return ticks, lanes, kinds
+
+
+if __name__ == "__main__":
+    # レベルとシードの範囲を指定してスケジュールを前もって作る（例: python walk_level.py default 0:100）
+    level = load_level(sys.argv[1])
+    if level.endless is not None:
+        raise SystemExit(f"{level.name}: endless levels compile their schedules stage by stage while playing")
+    start, _, stop = (sys.argv[2] if len(sys.argv) > 2 else "0").partition(":")
+    seeds = range(int(start), int(stop)) if stop else [int(start)]
+    for seed in seeds:
+        ticks, lanes, kinds = level.schedule(seed)
+        print(f"{level.name} seed {seed}: {len(ticks)} spawns over {ticks[-1] + 1 if ticks else 0} ticks")
@@ -0,0 +1,169 @@
+import math
+
+from walk_sprites import COLKEY, PALETTE
+
+# 夜の明かり
+# 夕方（day_cycle が DUSK の間）から少しずつ暗くなり、夜明け（DAWN の間）に少しずつ明るくなる
+# 暗さは NIGHT_LEVELS 段の色の置き換え表（SHADES）で付け、犬のまわりと懐中電灯の光の中だけ元の色のまま残す
+# 光の形（マスク）は懐中電灯の大きさ（残り時間で縮む）と向き（犬の左右の動き）ごとに、最初に要るときに 1 度だけ作る
+#
+# 1 フレームの手間は blt 3 回だけ（画素ごとの Python の処理はない）:
+#   1. 画面を作業用の画像に置き換え表を通して写す（pal で暗い色にしながら blt）
+#   2. その上にマスクを blt して、光の当たる画素を LIT（透明色）にする
+#   3. 作業用の画像を LIT を透明色にして画面に blt する（光の外だけ暗くなる）
+# 光の端は市松模様（4x4 のディザ）で抜き、中心から離れるほど暗くなって見えるようにする
+
+DUSK = (0.35, 0.5)    # day_cycle がこの間で暗くなっていく（0.5 で真っ暗）
+DAWN = (0.55, 0.6)    # この間で明るくなっていく（0.5〜0.55 は真っ暗のまま）
+NIGHT_LEVELS = 8      # 暗さの段数（0 が昼）
+NIGHT_COLOR = 1       # 真っ暗のときの色（暗い青）
+
+LIT = COLKEY          # マスクの光の当たる画素（暗くした色には出てこない色）
+DARK = 0              # マスクの光の当たらない画素
+
+GLOW_RADIUS = 20              # 懐中電灯がなくても見える犬のまわりの半径
+CONE_LENGTHS = (0, 45, 70, 95)  # 懐中電灯の光の長さ（大きさ 0 は懐中電灯なし）
+CONE_HALF_ANGLE = 0.4         # 光の広がり（中心からの角度、ラジアン）
+CONE_TILT = 0.15              # 向き 1 段あたりの光の傾き（ラジアン）
+MAX_TILT = 2                  # 向きは -MAX_TILT〜MAX_TILT（左が負。負の向きは正の向きのマスクを左右反転して使う）
+CONE_APEX = -8                # 光の出る位置（犬の体の中心からの y）
+
+# 4x4 のディザの閾値（明るさがこれより大きい画素を光の中にする）
+BAYER = ((0, 8, 2, 10), (12, 4, 14, 6), (3, 11, 1, 9), (15, 7, 13, 5))
+
+
+def shade_table(t):
+    # 暗さ t（0〜1）の置き換え表: 色を NIGHT_COLOR に t だけ近づけ、パレットで一番近い色にする
+    # LIT は暗くした色に出てこないように、どの色の置き換え先にもしない
+    def rgb(color):
+        return color >> 16 & 0xFF, color >> 8 & 0xFF, color & 0xFF
+
+    night = rgb(PALETTE[NIGHT_COLOR])
+    table = []
+    for col, color in enumerate(PALETTE):
+        if t == 0 or col == LIT:
+            table.append(col)
+            continue
+        target = [c + (n - c) * t for c, n in zip(rgb(color), night)]
+        table.append(min(
+            (c for c in range(len(PALETTE)) if c != LIT),
+            key=lambda c: sum((a - b) ** 2 for a, b in zip(rgb(PALETTE[c]), target)),
+        ))
+    return tuple(table)
+
+
+# 暗さの段ごとの置き換え表（SHADES[段][色]）
+SHADES = tuple(shade_table(level / (NIGHT_LEVELS - 1)) for level in range(NIGHT_LEVELS))
+
+
+def night_level(sim):
+    # 今の暗さの段（0 なら昼で、明かりの処理はしない）
+    cycle = sim.day_cycle
+    if sim.is_darkening:
+        t = (cycle - DUSK[0]) / (DUSK[1] - DUSK[0])
+    else:
+        t = (DAWN[1] - cycle) / (DAWN[1] - DAWN[0])
+    return round(min(max(t, 0.0), 1.0) * (NIGHT_LEVELS - 1))
+
+
+def cone_size(sim):
+    # 懐中電灯の光の大きさ（残り時間が減ると小さくなる。なければ 0）
+    if not sim.has_flashlight:
+        return 0
+    steps = len(CONE_LENGTHS) - 1
+    return min(steps, 1 + sim.fl_timer * steps // (sim.flashlight_duration + 1))
+
+
+def cone_tilt(sim):
+    # 光の向き（歩いている方に傾き、ダッシュ中はもっと傾く）
+    tilt = round(sim.pet_vx / sim.pet_speed_fast * MAX_TILT)
+    return max(-MAX_TILT, min(MAX_TILT, tilt))
+
+
+def brightness(x, y, length, tilt):
+    # 犬の体の中心から (x, y) の位置の明るさ（1 以上なら必ず光の中）
+    r = math.hypot(x, y)
+    light = 1.5 * (1 - r / GLOW_RADIUS)
+    if length:
+        dy = y - CONE_APEX
+        d = math.hypot(x, dy)
+        if 0 < d < length:
+            angle = abs(math.atan2(x, -dy) - tilt * CONE_TILT)
+            if angle < CONE_HALF_ANGLE:
+                light = max(light, 1.6 * (1 - d / length) * (1 - (angle / CONE_HALF_ANGLE) ** 2))
+    return light
+
+
+def light_rows(size, tilt):
+    # マスクの行（1 文字 1 画素の 16 進の文字列）と、犬の体の中心から見たマスクの左上
+    length = CONE_LENGTHS[size]
+    angle = tilt * CONE_TILT
+    top = min(-GLOW_RADIUS, CONE_APEX - length)
+    left = min(-GLOW_RADIUS, math.floor(math.sin(angle - CONE_HALF_ANGLE) * length)) if length else -GLOW_RADIUS
+    right = max(GLOW_RADIUS, math.ceil(math.sin(angle + CONE_HALF_ANGLE) * length)) if length else GLOW_RADIUS
+    width = right - left + 1
+    lit = f"{LIT:x}"
+    rows = []
+    for y in range(top, GLOW_RADIUS + 1):
+        row = [f"{DARK:x}"] * width
+        if abs(y) <= GLOW_RADIUS:
+            x0, x1 = -GLOW_RADIUS, GLOW_RADIUS
+        else:
+            x0, x1 = 0, -1
+        if length and y < CONE_APEX:
+            # 光の中に入りうる x の範囲（光の両端の辺の間）
+            dy = CONE_APEX - y
+            x0 = min(x0, math.floor(dy * math.tan(angle - CONE_HALF_ANGLE)))
+            x1 = max(x1, math.ceil(dy * math.tan(angle + CONE_HALF_ANGLE)))
+        threshold = BAYER[y % 4]
+        for x in range(max(x0, left), min(x1, right) + 1):
+            if brightness(x, y, length, tilt) * 16 > threshold[x % 4] + 0.5:
+                row[x - left] = lit
+        rows.append("".join(row))
+    return rows, left, top
+
+
+class Lighting:
+    # SpriteCache に付けて使う（sprites.lighting）。マスクと作業用の画像を持つ
+    # 作業用の画像は、イメージバンクの番号で描いているならバンク 2、画像なら同じ種類の新しい画像
+
+    def __init__(self, sprites):
+        bank = sprites.images[0]
+        self.image_type = type(bank)
+        self.work = sprites.gfx.images[2] if isinstance(sprites.banks[0], int) else self.image_type(bank.width, bank.height)
+        self.masks = {}  # (大きさ, 向き) -> (画像, 左上 x, 左上 y, 幅, 高さ)
+        self.level = None  # 作業用の画像に pal で入れてある暗さの段
+
+    def mask(self, size, tilt):
+        key = (size, tilt)
+        mask = self.masks.get(key)
+        if mask is None:
+            rows, left, top = light_rows(size, tilt)
+            image = self.image_type(len(rows[0]), len(rows))
+            image.set(0, 0, rows)
+            mask = self.masks[key] = image, left, top, len(rows[0]), len(rows)
+        return mask
+
+    def draw(self, g, sim, level):
+        # 今の画面を暗さ level にして、犬の光の中だけ元に戻す（g は pyxel か画像）
+        screen = getattr(g, "screen", g)
+        work = self.work
+        if self.level != level:
+            work.pal()
+            for col, shaded in enumerate(SHADES[level]):
+                if col != shaded:
+                    work.pal(col, shaded)
+            self.level = level
+        w, h = screen.width, screen.height
+        work.blt(0, 0, screen, 0, 0, w, h)
+
+        size = cone_size(sim)
+        tilt = cone_tilt(sim) if size else 0
+        image, left, top, mw, mh = self.mask(size, abs(tilt))
+        x = sim.pet_x + 6  # 犬の体の中心
+        y = sim.pet_y + 6
+        if tilt < 0:
+            work.blt(x - left - mw + 1, y + top, image, 0, 0, -mw, mh, DARK)
+        else:
+            work.blt(x + left, y + top, image, 0, 0, mw, mh, DARK)
+        screen.blt(0, 0, work, 0, 0, w, h, LIT)
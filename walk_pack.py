@@ -0,0 +1,360 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+from walk_core import (
+    BTN_LEFT,
+    BTN_RIGHT,
+    BTN_SHIFT,
+    BTN_SPACE,
+    BTN_S,
+    BTN_R,
+    GAME_OVER_REASONS,
+    WalkSim,
+)
+
+# 群れモード: 1 つの道を何匹もの犬で歩く
+# 落下物・弾・昼夜・進行度は WalkSim と同じものを共有し、犬ごとの値（位置・ゲージ・タイマー）は配列で持つ
+# step(buttons) の buttons は犬ごとの入力の並び（S と R はどれか 1 匹が押せばよい）
+# 倒れた犬はそこで止まり、全員倒れたらゲームオーバー。誰かが残ったまま max_progress に着けばクリア
+#
+# 犬との当たり判定は、犬を x 順に並べてレーンごとに振り分け、レーンの犬の高さ付近の落下物ごとに
+# 重なる犬を二分探索で探す（犬は全員同じ高さにいるので、1 レーンで比べる落下物は 1〜2 個。
+# 落下物の数 × log(犬の数) + 当たった犬の数に比例する）
+# ゴミ袋・アイテムは重なった犬のうち 1 匹だけが取る。どの犬が先かはフレームごとに 1 匹ずつずらした順で決める
+# （frame_count % 犬の数 番の犬から。同じ入力なら必ず同じ犬が取る）
+
+REASON_HIT = GAME_OVER_REASONS.index("Look ahead!!")
+REASON_POOP = GAME_OVER_REASONS.index("Don't leave the poop behind!!")
+
+# 犬ごとの配列（名前, 型）。スナップショットにはこの順で入る
+DOG_FIELDS = (
+    ("dog_x", "d"),
+    ("dog_vx", "d"),
+    ("dog_poop", "d"),     # 便意ゲージ
+    ("dog_stamina", "d"),  # スタミナゲージ
+    ("dog_score", "d"),
+    ("dog_power", "i"),    # パワーアップの残りフレーム
+    ("dog_reload", "i"),
+    ("dog_light", "i"),    # 懐中電灯の残りフレーム
+    ("dog_alive", "B"),
+    ("dog_reason", "B"),   # 倒れた理由（GAME_OVER_REASONS の番号）
+)
+
+
+class PackSim(WalkSim):
+    __slots__ = ("n_dogs", "dogs_alive", "dog_order", "lane_dogs", "lane_dog_x", "views") + tuple(
+        name for name, _ in DOG_FIELDS)
+
+    def __init__(self, seed=0, n_dogs=2):
+        self.n_dogs = n_dogs
+        for name, typecode in DOG_FIELDS:
+            setattr(self, name, array(typecode, [0]) * n_dogs)
+        self.dog_order = list(range(n_dogs))  # x 順の犬の番号（前のフレームの順から並べ直すのでほぼ O(犬の数)）
+        self.lane_dogs = []   # レーンごとに、そのレーンと重なる生きた犬の番号（x 順。毎フレーム作り直す）
+        self.lane_dog_x = []  # lane_dogs の犬の x（二分探索用）
+        self.views = tuple(DogView(self, k) for k in range(n_dogs))
+        super().__init__(seed)
+
+    def reset_game(self):
+        super().reset_game()
+        # 犬は壁の間に等間隔に並べ、左右交互の向きで歩き始める
+        span = self.right_wall - self.left_wall
+        for k in range(self.n_dogs):
+            self.dog_x[k] = self.left_wall + span * (k + 0.5) / self.n_dogs
+            self.dog_vx[k] = self.pet_speed if k % 2 == 0 else -self.pet_speed
+            self.dog_poop[k] = 0
+            self.dog_stamina[k] = 100
+            self.dog_score[k] = 0
+            self.dog_power[k] = 0
+            self.dog_reload[k] = 0
+            self.dog_light[k] = 0
+            self.dog_alive[k] = 1
+            self.dog_reason[k] = 0
+        self.dogs_alive = self.n_dogs
+        self.dog_order.sort()
+
+    def view(self, k):
+        return self.views[k]
+
+    def update(self, buttons):
+        pressed = 0
+        for b in buttons:
+            pressed |= b
+
+        if not self.game_started:
+            self.title_pet_rotation = (self.title_pet_rotation + 1) % 32
+            if pressed & BTN_S:
+                self.game_started = True
+            return
+
+        # 群れモードにはドアの演出はなく、結果の画面で R を待つ
+        if self.game_over or self.is_cleared:
+            if pressed & BTN_R:
+                self.reset_game()
+            return
+
+        prof = self.profiler
+
+        self.update_day_night()
+        if prof:
+            prof.lap("day_night")
+
+        self.poop_speed_multiplier += self.poop_acceleration
+        self.heal_multiplier += self.heal_acceleration
+        if self.speed < self.max_speed:
+            self.speed += self.speed_increase
+        if prof:
+            prof.lap("gauges")
+
+        self.spawn_step()
+        if prof:
+            prof.lap("spawn")
+
+        self.move_dogs(buttons)
+        if prof:
+            prof.lap("move_pet")
+
+        self.move_entities()
+        if prof:
+            prof.lap("move_entities")
+
+        self.resolve_dog_hits()
+        if prof:
+            prof.lap("pet_hits")
+
+        self.update_dogs(buttons)
+        if prof:
+            prof.lap("timers")
+
+        self.move_bullets()
+        if prof:
+            prof.lap("shoot")
+
+        self.resolve_bullet_hits()
+        if prof:
+            prof.lap("bullet_hits")
+
+        if self.dogs_alive == 0:
+            self.game_over = True
+            return
+        self.advance_progress()
+
+    def move_dogs(self, buttons):
+        # 便意ゲージの増加・スタミナ・左右の移動（WalkSim.update の犬の部分と同じ）
+        xs, vxs, poops, staminas = self.dog_x, self.dog_vx, self.dog_poop, self.dog_stamina
+        alive = self.dog_alive
+        poop_increase = self.base_poop_increase * self.poop_speed_multiplier
+        left, right = self.left_wall, self.right_wall
+        for k in range(self.n_dogs):
+            if not alive[k]:
+                continue
+            poops[k] += poop_increase
+            b = buttons[k]
+            dash = b & BTN_SHIFT
+            if dash and staminas[k] > 0:
+                staminas[k] -= 1
+            elif staminas[k] < 100:
+                staminas[k] += 0.2
+            current_speed = self.pet_speed_fast if (dash and staminas[k] > 0) else self.pet_speed
+            if b & BTN_LEFT:
+                vxs[k] = -current_speed
+            elif b & BTN_RIGHT:
+                vxs[k] = current_speed
+            x = xs[k] + vxs[k]
+            if x < left:
+                x = left
+                vxs[k] = -vxs[k]
+            if x > right:
+                x = right
+                vxs[k] = -vxs[k]
+            xs[k] = x
+
+    def resolve_dog_hits(self):
+        # 犬を x 順のままレーンに振り分ける（レーンの x は center、アイテムは center + 2 なので
+        # -14 < center - x < 12）
+        centers = self.lane_centers
+        lane_dogs, lane_dog_x = self.lane_dogs, self.lane_dog_x
+        if len(lane_dogs) != len(centers):
+            lane_dogs[:] = [[] for _ in centers]
+            lane_dog_x[:] = [[] for _ in centers]
+        for dogs, dog_x in zip(lane_dogs, lane_dog_x):
+            dogs.clear()
+            dog_x.clear()
+        xs, alive = self.dog_x, self.dog_alive
+        self.dog_order.sort(key=xs.__getitem__)
+        for k in self.dog_order:
+            if not alive[k]:
+                continue
+            x = xs[k]
+            for lane_no in range(bisect_right(centers, x - 14), bisect_left(centers, x + 12)):
+                lane_dogs[lane_no].append(k)
+                lane_dog_x[lane_no].append(x)
+
+        # レーンごとに犬の高さ付近の落下物だけを見て、x が 12 未満の差の犬を二分探索で探す
+        pet_y = self.pet_y
+        obstacles = self.obstacles
+        n = self.n_dogs
+        start = self.frame_count % n  # 取り合いで先になる犬（フレームごとにずらす）
+        for lane_no, dogs in enumerate(lane_dogs):
+            if not dogs:
+                continue
+            dog_x = lane_dog_x[lane_no]
+            lane = self.lane_index.lanes[lane_no]
+            k = 0
+            while k < len(lane):
+                pool, i = lane[k]
+                y = pool.y[i]
+                if y >= pet_y + 12:
+                    k += 1
+                    continue
+                if y <= pet_y - 12:
+                    break  # ここから先は全て犬より上
+                x = pool.x[i]
+                lo = bisect_right(dog_x, x - 12)
+                hi = bisect_left(dog_x, x + 12)
+                if pool is obstacles:
+                    # 障害物は重なった犬を全員倒し、そのまま残る
+                    for d in dogs[lo:hi]:
+                        if alive[d]:
+                            self.knock_out(d, REASON_HIT)
+                    k += 1
+                    continue
+                # ゴミ袋・アイテムは重なった犬のうち、start 番から数えて一番先の犬が取る
+                taker = None
+                for d in dogs[lo:hi]:
+                    if alive[d] and (taker is None or (d - start) % n < (taker - start) % n):
+                        taker = d
+                if taker is None:
+                    k += 1
+                    continue
+                self.pick_up(taker, pool)
+                del lane[k]
+                pool.despawn(i)
+
+    def pick_up(self, k, pool):
+        if pool is self.trash_bags:
+            heal_amount = self.base_heal_amount * self.heal_multiplier
+            self.dog_poop[k] = max(self.dog_poop[k] - heal_amount, 0)
+        elif pool is self.power_items:
+            self.dog_power[k] = self.power_duration
+        else:
+            self.dog_light[k] = self.flashlight_duration
+
+    def knock_out(self, k, reason):
+        self.dog_alive[k] = 0
+        self.dog_reason[k] = reason
+        self.dogs_alive -= 1
+        self.game_over_reason = GAME_OVER_REASONS[reason]  # 最後に倒れた犬の理由が残る
+
+    def update_dogs(self, buttons):
+        # 便意ゲージの判定・スコア・タイマー・弾の発射
+        alive = self.dog_alive
+        powers, reloads, lights = self.dog_power, self.dog_reload, self.dog_light
+        score = self.speed * 0.1
+        for k in range(self.n_dogs):
+            if not alive[k]:
+                continue
+            if self.dog_poop[k] >= 100:
+                self.knock_out(k, REASON_POOP)
+                continue
+            self.dog_score[k] += score
+            if powers[k] > 0:
+                powers[k] -= 1
+            if lights[k] > 0:
+                lights[k] -= 1
+            if reloads[k] > 0:
+                reloads[k] -= 1
+            if powers[k] > 0 and buttons[k] & BTN_SPACE and reloads[k] == 0:
+                self.fire_bullet(self.dog_x[k])
+                reloads[k] = self.reload_time
+
+    def snapshot(self):
+        # WalkSim の状態のあとに犬ごとの配列を続ける
+        out = bytearray(super().snapshot())
+        for name, _ in DOG_FIELDS:
+            out += getattr(self, name)
+        return bytes(out)
+
+    def restore(self, data):
+        offset = super().restore(data)
+        for name, typecode in DOG_FIELDS:
+            values = getattr(self, name)
+            size = len(values) * values.itemsize
+            values[:] = array(typecode, bytes(data[offset:offset + size]))
+            offset += size
+        self.dogs_alive = sum(self.dog_alive)
+        return offset
+
+
+class DogView:
+    # PackSim を犬 k の 1 匹だけの WalkSim のように見せる
+    # （walk_bots の policy や draw_scene にそのまま渡せる。犬以外の値は PackSim のもの）
+
+    __slots__ = ("sim", "k")
+
+    def __init__(self, sim, k):
+        self.sim = sim
+        self.k = k
+
+    def __getattr__(self, name):
+        return getattr(self.sim, name)
+
+    @property
+    def pet_x(self):
+        return self.sim.dog_x[self.k]
+
+    @property
+    def pet_vx(self):
+        return self.sim.dog_vx[self.k]
+
+    @property
+    def poop_gauge(self):
+        return self.sim.dog_poop[self.k]
+
+    @property
+    def stamina_gauge(self):
+        return self.sim.dog_stamina[self.k]
+
+    @property
+    def score(self):
+        return self.sim.dog_score[self.k]
+
+    @property
+    def has_power(self):
+        return self.sim.dog_power[self.k] > 0
+
+    @property
+    def power_timer(self):
+        return self.sim.dog_power[self.k]
+
+    @property
+    def reload_timer(self):
+        return self.sim.dog_reload[self.k]
+
+    @property
+    def has_flashlight(self):
+        return self.sim.dog_light[self.k] > 0
+
+    @property
+    def fl_timer(self):
+        return self.sim.dog_light[self.k]
+
+    @property
+    def alive(self):
+        return bool(self.sim.dog_alive[self.k])
+
+
+def pack_policy(policies):
+    # 犬ごとの policy（walk_bots の形）をまとめ、PackSim に渡す入力の並びを返す関数にする
+    def play(sim):
+        return [policy(view) if view.alive else 0 for policy, view in zip(policies, sim.views)]
+    return play
+
+
+def new_pack(seed, n_dogs, level=None):
+    # 群れモードの PackSim（level を指定したらその値とスケジュールで）
+    sim = PackSim(seed, n_dogs)
+    if level is not None:
+        level.new_sim(seed, sim=sim)
+        sim.reset_game()  # 壁の位置が変わったので犬を並べ直す
+    return sim
@@ -0,0 +1,149 @@
+import struct
+from array import array
+from collections import deque
+from operator import itemgetter
+
+# どのレーンにも属さない（LaneIndex に入れない）スロット
+NO_LANE = 255
+
+# スナップショット用: (top, count, 空きスロット数)
+_POOL_HEAD = struct.Struct("<III")
+
+
+class EntityPool:
+    # 落下物（障害物・ゴミ袋・アイテム）をまとめて持つスロット配列
+    # 消えたスロットはフリーリストに積んで次の生成で再利用する
+    # 削除は O(1) で、フレームごとのリスト生成やコピーはしない
+
+    __slots__ = ("x", "y", "lane", "alive", "free", "top", "count")
+
+    def __init__(self, capacity=32):
+        self.x = array("d", bytes(8 * capacity))
+        self.y = array("d", bytes(8 * capacity))
+        self.lane = bytearray(capacity)  # 生成したレーン番号
+        self.alive = bytearray(capacity)
+        self.free = array("i")  # 空きスロットのスタック
+        self.top = 0    # 一度でも使ったスロット数（走査はここまで）
+        self.count = 0  # 生きているエンティティ数
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # 描画用: 生きているエンティティの (x, y) を返す
+        x, y, alive = self.x, self.y, self.alive
+        for i in range(self.top):
+            if alive[i]:
+                yield x[i], y[i]
+
+    def spawn(self, x, y, lane=0):
+        if self.free:
+            i = self.free.pop()
+        else:
+            i = self.top
+            if i == len(self.alive):
+                self._grow()
+            self.top += 1
+        self.x[i] = x
+        self.y[i] = y
+        self.lane[i] = lane
+        self.alive[i] = 1
+        self.count += 1
+        return i
+
+    def despawn(self, i):
+        self.alive[i] = 0
+        self.free.append(i)
+        self.count -= 1
+        if self.count == 0:
+            # 空になったら走査範囲を縮める
+            self.top = 0
+            del self.free[:]
+
+    def clear(self):
+        for i in range(self.top):
+            self.alive[i] = 0
+        self.top = 0
+        self.count = 0
+        del self.free[:]
+
+    def dump(self, out):
+        # 使ったスロット（top まで）の配列をそのまま out に追記する
+        top = self.top
+        out += _POOL_HEAD.pack(top, self.count, len(self.free))
+        if top == 0:
+            return
+        out += memoryview(self.x)[:top]
+        out += memoryview(self.y)[:top]
+        out += memoryview(self.lane)[:top]
+        out += memoryview(self.alive)[:top]
+        out += self.free
+
+    def load(self, data, offset):
+        # dump() した内容を読み込み、次の読み込み位置を返す
+        top, count, n_free = _POOL_HEAD.unpack_from(data, offset)
+        offset += _POOL_HEAD.size
+        while len(self.alive) < top:
+            self._grow()
+        for i in range(top, self.top):
+            self.alive[i] = 0
+        memoryview(self.x).cast("B")[:8 * top] = data[offset:offset + 8 * top]
+        offset += 8 * top
+        memoryview(self.y).cast("B")[:8 * top] = data[offset:offset + 8 * top]
+        offset += 8 * top
+        self.lane[:top] = data[offset:offset + top]
+        offset += top
+        self.alive[:top] = data[offset:offset + top]
+        offset += top
+        size = n_free * self.free.itemsize
+        del self.free[:]
+        self.free.frombytes(data[offset:offset + size])
+        offset += size
+        self.top = top
+        self.count = count
+        return offset
+
+    def _grow(self):
+        # 満杯のときだけ容量を倍にする（配列オブジェクト自体は同じものを使い続ける）
+        n = len(self.alive)
+        self.x.extend(array("d", bytes(8 * n)))
+        self.y.extend(array("d", bytes(8 * n)))
+        self.lane.extend(bytes(n))
+        self.alive.extend(bytes(n))
+
+
+class LaneIndex:
+    # レーンごとに (pool, slot) を生成順に並べた deque
+    # 落下物は全て y=0 で生成され同じ速度で落ちるので、
+    # 左端（古い）ほど y が大きく、右端（新しい）ほど y が小さい順に常に並んでいる
+
+    __slots__ = ("lanes",)
+
+    def __init__(self, n_lanes):
+        self.lanes = tuple(deque() for _ in range(n_lanes))
+
+    def add(self, pool, slot):
+        self.lanes[pool.lane[slot]].append((pool, slot))
+
+    def remove(self, pool, slot):
+        # 画面外に出るのは最古のものなので、ほぼ先頭で見つかる
+        self.lanes[pool.lane[slot]].remove((pool, slot))
+
+    def clear(self):
+        for lane in self.lanes:
+            lane.clear()
+
+    def rebuild(self, pools, reverse):
+        # スロット配列の y から並びを作り直す（スナップショットの復元用）
+        # 落下物は y の大きい順（reverse=True）、上へ進む弾は y の小さい順
+        for lane in self.lanes:
+            lane.clear()
+        entries = [
+            (pool.y[i], pool, i)
+            for pool in pools
+            for i in range(pool.top)
+            if pool.alive[i] and pool.lane[i] != NO_LANE
+        ]
+        entries.sort(key=itemgetter(0), reverse=reverse)
+        for _, pool, i in entries:
+            self.lanes[pool.lane[i]].append((pool, i))
@@ -0,0 +1,199 @@
+import argparse
+import random
+import sys
+
+from walk_core import (
+    STATE_NAMES,
+    BTN_LEFT,
+    BTN_P,
+    BTN_R,
+    BTN_RIGHT,
+    BTN_S,
+    BTN_SHIFT,
+    BTN_SPACE,
+    KIND_POWER,
+    WalkSim,
+)
+from walk_level import load_level
+from walk_replay import ReplayReader
+
+# 落下物と弾のスロット配列（walk_pool）を、プールにする前の作り（種類ごとの [x, y] のリスト）と比べる
+# 同じ入力で 2 つを並べて進め、毎フレームのスカラー値と落下物・弾の (x, y) の組が全て同じか確かめる
+#
+#   python walk_poolcheck.py                        # シードごとに決まった乱数の入力で比べる（違えば終了コード 1）
+#   python walk_poolcheck.py --seeds 0:300 --ticks 4000
+#   python walk_poolcheck.py --level rush           # レベルの生成スケジュールでも比べる
+#   python walk_poolcheck.py --replay run.dgr       # 記録したリプレイの入力で比べる
+#
+# 比べる相手の ListWalkSim は、リストを回しながら消すと次のものが飛ばされる元の不具合だけを直したもの
+# （コピーを回す）。WalkSim の落下物・弾の処理を変えたら、こちらも同じ意味になるように直す
+# 弾の当たり方は今の WalkSim と同じ「古い弾から、当たる障害物のうち一番上のもの」にしてある。
+# 元のゲーム（リストの先頭、つまり一番古い障害物に当たる）とは弾が何発も重なったときに違うので、
+# これで確かめられるのはスロット配列がリストと同じ動きをすることだけで、元のゲームと同じかどうかではない
+
+INPUTS = (0, BTN_LEFT, BTN_RIGHT, BTN_SHIFT | BTN_LEFT, BTN_SHIFT | BTN_RIGHT, BTN_SPACE, BTN_S, BTN_R, BTN_P)
+
+
+class ListWalkSim(WalkSim):
+    # 落下物は種類ごとの [x, y] のリスト、弾は [x, y] のリスト（生成順）
+    # それ以外（ゲージ・昼夜・生成の抽選など）は WalkSim と同じものを使う
+
+    def __init__(self, seed=0):
+        self.lists = ([], [], [], [])
+        self.bullet_list = []
+        super().__init__(seed)
+
+    def is_space_clear(self, x, y):
+        for entities in self.lists:
+            for ex, ey in entities:
+                if abs(ex - x) <= 40 and abs(ey - y) < self.min_spawn_distance:
+                    return False
+        return True
+
+    def spawn_kind(self, lane, kind):
+        x = self.lane_centers[lane] + (2 if kind >= KIND_POWER else 0)
+        self.lists[kind].append([x, 0])
+
+    def move_entities(self):
+        for entities in self.lists:
+            for entity in entities[:]:
+                entity[1] += self.speed
+                if entity[1] > self.height:
+                    entities.remove(entity)
+
+    def resolve_pet_hits(self):
+        obstacles, trash_bags, power_items, flashlight_items = self.lists
+        for obstacle in obstacles:
+            if abs(obstacle[0] - self.pet_x) < 12 and abs(obstacle[1] - self.pet_y) < 12:
+                self.game_over = True
+                self.game_over_reason = "Look ahead!!"
+        for trash_bag in trash_bags[:]:
+            if abs(trash_bag[0] - self.pet_x) < 12 and abs(trash_bag[1] - self.pet_y) < 12:
+                heal_amount = self.base_heal_amount * self.heal_multiplier
+                self.poop_gauge = max(self.poop_gauge - heal_amount, 0)
+                trash_bags.remove(trash_bag)
+        for item in power_items[:]:
+            if abs(item[0] - self.pet_x) < 12 and abs(item[1] - self.pet_y) < 12:
+                self.has_power = True
+                self.power_timer = self.power_duration
+                power_items.remove(item)
+        for light in flashlight_items[:]:
+            if abs(light[0] - self.pet_x) < 12 and abs(light[1] - self.pet_y) < 12:
+                self.has_flashlight = True
+                self.fl_timer = self.flashlight_duration
+                flashlight_items.remove(light)
+
+    def clear_entities(self):
+        for entities in self.lists:
+            entities.clear()
+
+    def fire_bullet(self, pet_x):
+        self.bullet_list.append([pet_x + 3, self.pet_y])
+
+    def move_bullets(self):
+        for bullet in self.bullet_list[:]:
+            bullet[1] += self.bullet_vy
+            if bullet[1] < -10:
+                self.bullet_list.remove(bullet)
+
+    def resolve_bullet_hits(self):
+        # 古い弾から、当たる障害物のうち一番上のものを消す
+        obstacles = self.lists[0]
+        for bullet in self.bullet_list[:]:
+            hits = [obstacle for obstacle in obstacles
+                    if abs(bullet[0] - obstacle[0]) < 12 and abs(bullet[1] - obstacle[1]) < 12]
+            if hits:
+                obstacles.remove(min(hits, key=lambda obstacle: obstacle[1]))
+                self.bullet_list.remove(bullet)
+
+    def reset_game(self):
+        super().reset_game()
+        self.bullet_list.clear()
+
+
+def state(sim):
+    # 比べる値: スカラー値と、種類ごと・弾の (x, y) の組
+    if isinstance(sim, ListWalkSim):
+        entities = [sorted(map(tuple, entities)) for entities in sim.lists]
+        bullets = sorted(map(tuple, sim.bullet_list))
+    else:
+        entities = [sorted(pool) for pool in sim.pools]
+        bullets = sorted(sim.bullets)
+    return [getattr(sim, name) for name in STATE_NAMES], entities, bullets
+
+
+def random_inputs(seed, ticks):
+    # シードごとに決まった入力（S でスタートし、ゲームオーバーなら R でやり直す）
+    rng = random.Random(seed * 7)
+    return [rng.choice(INPUTS) for _ in range(ticks)]
+
+
+def compare(name, pair, inputs, power=False):
+    # 2 つを同じ入力で進め、最初に違ったフレームを表示する（全て同じなら True）
+    # power なら毎フレームの前にパワーアップを持たせる（R でやり直したあともずっと撃てる）
+    sim, ref = pair
+    for tick, buttons in enumerate(inputs):
+        if power:
+            for s in pair:
+                s.has_power = True
+                s.power_timer = s.power_duration
+        sim.step(buttons)
+        ref.step(buttons)
+        got, expected = state(sim), state(ref)
+        if got != expected:
+            print(f"{name}: differs at tick {tick}")
+            for part, a, b in zip(("state", "entities", "bullets"), got, expected):
+                if a != b:
+                    print(f"  {part}: pools {a}")
+                    print(f"  {part}: lists {b}")
+            return False
+    return True
+
+
+def new_pair(seed, level=None, reload_time=None):
+    # 同じシード・レベルの WalkSim と ListWalkSim（reload_time を渡したらリロードの時間を変える）
+    pair = WalkSim(seed), ListWalkSim(seed)
+    for sim in pair:
+        if level is not None:
+            level.new_sim(seed, sim=sim)
+        if reload_time is not None:
+            sim.reload_time = reload_time
+    return pair
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="落下物のスロット配列をリストの作りと比べる")
+    parser.add_argument("--seeds", default="0:100", help="シードの範囲（例: 0:300）")
+    parser.add_argument("--ticks", type=int, default=4000, help="1 つのシードで進めるフレーム数")
+    parser.add_argument("--level", help="levels/ のレベル名かレベルのファイル")
+    parser.add_argument("--replay", metavar="FILE", action="append", default=[],
+                        help="リプレイの入力でも比べる（何度でも指定できる）")
+    args = parser.parse_args(argv)
+
+    level = None if args.level is None else load_level(args.level)
+    start, _, stop = args.seeds.partition(":")
+    seeds = range(int(start), int(stop)) if stop else [int(start)]
+    failed = 0
+    runs = 0
+    for seed in seeds:
+        inputs = random_inputs(seed, args.ticks)
+        # ふつうの入力と、ずっと撃てる状態（リロード 0・5・10）の 2 通り
+        for reload_time in (None, seed % 3 * 5):
+            power = reload_time is not None
+            name = f"seed {seed}" + (f" power reload {reload_time}" if power else "")
+            failed += not compare(name, new_pair(seed, level, reload_time), inputs, power)
+            runs += 1
+    for path in args.replay:
+        with ReplayReader(path) as reader:
+            pair = reader.new_sim(), ListWalkSim(reader.seed)
+            level = reader.load_level()
+            if level is not None:
+                level.new_sim(reader.seed, sim=pair[1])
+            failed += not compare(path, pair, list(reader.inputs()))
+            runs += 1
+    print(f"{runs - failed}/{runs} runs match")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
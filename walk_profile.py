@@ -0,0 +1,211 @@
+import csv
+import sys
+from array import array
+from time import perf_counter
+
+# 更新と描画の区間ごとの時間を計るプロファイラ
+# WalkSim.profiler に入れると update() の中で区間ごとに lap() が呼ばれる
+# 1 フレームは start() から end_frame() まで。区間の時間は直前の lap() からの経過時間
+
+# シミュレーション側の区間（WalkSim.update の中で lap する名前）
+SIM_PHASES = (
+    "day_night",      # 昼夜サイクル
+    "gauges",         # 便意・回復・速度
+    "spawn",          # 生成（is_space_clear）
+    "move_pet",       # 犬の移動
+    "move_entities",  # 落下物の移動
+    "pet_hits",       # 犬と落下物の当たり判定
+    "timers",         # パワーアップ・懐中電灯・リロード
+    "shoot",          # 弾の発射と移動
+    "bullet_hits",    # 弾と障害物の当たり判定
+    "update",         # 上以外の更新（タイトル・クリア演出・進行度など）
+)
+# 描画側の区間（WalkGame.draw の中で lap する名前）
+DRAW_PHASES = (
+    "draw_background",  # 背景・レーン
+    "draw_entities",    # 落下物・弾・犬
+    "draw_light",       # 夜の明かり
+    "draw_hud",         # スタミナ・進行度ゲージ・警告
+    "draw_poop",        # 便意ゲージのうんち・クリア画面のうんち
+    "draw_door",        # クリア演出のドア
+    "draw",             # 上以外の描画（タイトル・ゲームオーバーなど）
+)
+PHASES = SIM_PHASES + DRAW_PHASES + ("frame",)
+COUNTERS = ("entities", "bullets", "poops", "draw_calls")
+
+# ヒストグラムの区切り（マイクロ秒）。最後の区間はそれ以上全て
+HIST_EDGES_US = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# 描画呼び出しとして数える pyxel の関数
+DRAW_CALLS = ("cls", "pset", "line", "rect", "rectb", "circ", "circb", "tri", "trib", "text", "blt")
+
+
+class FrameProfiler:
+    # 直近 window フレーム分の値をリングバッファに持ち、p50/p99 とヒストグラムを出す
+
+    def __init__(self, window=600):
+        self.window = window
+        self.index = {name: i for i, name in enumerate(PHASES + COUNTERS)}
+        n = len(self.index)
+        self.current = array("d", bytes(8 * n))  # 今のフレームの値
+        self.samples = [array("d", bytes(8 * window)) for _ in range(n)]
+        self.frames = 0  # 記録したフレーム数
+        self.frame_start = 0.0
+        self.mark = 0.0
+        self.draw_calls = 0
+        self.patched = {}
+        self.overlay_lines = None
+
+    def start(self):
+        self.frame_start = self.mark = perf_counter()
+        self.draw_calls = 0
+
+    def lap(self, name):
+        # 直前の lap（または start）からの時間を name の区間に足す
+        now = perf_counter()
+        self.current[self.index[name]] += now - self.mark
+        self.mark = now
+
+    def count(self, name, value):
+        self.current[self.index[name]] = value
+
+    def count_sim(self, sim):
+        self.count("entities", sum(len(pool) for pool in sim.pools))
+        self.count("bullets", len(sim.bullets))
+        self.count("poops", len(sim.poop_list))
+
+    def end_frame(self):
+        current = self.current
+        current[self.index["frame"]] = perf_counter() - self.frame_start
+        current[self.index["draw_calls"]] = self.draw_calls
+        slot = self.frames % self.window
+        for samples, value in zip(self.samples, current):
+            samples[slot] = value
+        for i in range(len(current)):
+            current[i] = 0.0
+        self.frames += 1
+
+    def values(self, name):
+        # 直近のフレームの値（古い順とは限らない）
+        n = min(self.frames, self.window)
+        return self.samples[self.index[name]][:n]
+
+    def percentile(self, name, p):
+        values = sorted(self.values(name))
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+    def histogram(self, name):
+        # 時間の区間を HIST_EDGES_US で区切った件数
+        counts = [0] * (len(HIST_EDGES_US) + 1)
+        for value in self.values(name):
+            us = value * 1e6
+            k = 0
+            while k < len(HIST_EDGES_US) and us >= HIST_EDGES_US[k]:
+                k += 1
+            counts[k] += 1
+        return counts
+
+    def stats(self):
+        # 区間名 -> {"mean", "p50", "p99", "max"}（時間はマイクロ秒、カウンタはそのままの値）
+        result = {}
+        for name in PHASES + COUNTERS:
+            values = self.values(name)
+            scale = 1e6 if name in PHASES else 1
+            result[name] = {
+                "mean": sum(values) / len(values) * scale if values else 0.0,
+                "p50": self.percentile(name, 50) * scale,
+                "p99": self.percentile(name, 99) * scale,
+                "max": max(values, default=0.0) * scale,
+            }
+        return result
+
+    def write_csv(self, file):
+        # 1 行 1 区間: 統計値とヒストグラムの件数
+        stats = self.stats()
+        bins = [f"lt_{edge}us" for edge in HIST_EDGES_US] + [f"ge_{HIST_EDGES_US[-1]}us"]
+        with open(file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "unit", "frames", "mean", "p50", "p99", "max"] + bins)
+            for name in PHASES + COUNTERS:
+                s = stats[name]
+                row = [name, "us" if name in PHASES else "count", min(self.frames, self.window),
+                       f"{s['mean']:.1f}", f"{s['p50']:.1f}", f"{s['p99']:.1f}", f"{s['max']:.1f}"]
+                if name in PHASES:
+                    row += self.histogram(name)
+                else:
+                    row += [""] * len(bins)
+                writer.writerow(row)
+
+    def instrument(self, gfx):
+        # gfx（pyxel か Framebuffer）の描画関数を、呼び出し回数を数えるものに差し替える
+        for name in DRAW_CALLS:
+            if name in self.patched or not hasattr(gfx, name):
+                continue
+            func = getattr(gfx, name)
+            self.patched[name] = func
+            setattr(gfx, name, self._counted(func))
+
+    def uninstrument(self, gfx):
+        for name, func in self.patched.items():
+            setattr(gfx, name, func)
+        self.patched.clear()
+
+    def _counted(self, func):
+        def counted(*args):
+            self.draw_calls += 1
+            return func(*args)
+        return counted
+
+    def draw_overlay(self, gfx, x=0, y=0):
+        # 区間ごとの p50/p99（マイクロ秒）とカウンタを左上に描く
+        # 並べ替えは重いので、文字列は 30 フレームごとに作り直す
+        if self.frames % 30 == 0 or not self.overlay_lines:
+            lines = ["phase          p50   p99"]
+            for name in PHASES:
+                if max(self.values(name), default=0.0) > 0:
+                    lines.append(f"{name[:12]:12} {self.percentile(name, 50) * 1e6:5.0f}"
+                                 f" {self.percentile(name, 99) * 1e6:5.0f}")
+            lines.append("ent {:.0f} bul {:.0f} poop {:.0f} dc {:.0f}".format(
+                *(self.current_count(name) for name in COUNTERS)))
+            self.overlay_lines = lines
+        lines = self.overlay_lines
+        gfx.rect(x, y, 100, len(lines) * 6 + 2, 0)
+        for i, line in enumerate(lines):
+            gfx.text(x + 1, y + 1 + i * 6, line, 7)
+
+    def current_count(self, name):
+        # 最後に記録したフレームの値
+        if self.frames == 0:
+            return 0
+        return self.samples[self.index[name]][(self.frames - 1) % self.window]
+
+
+def profile_run(sim, inputs, window=600):
+    # 画面なしで入力を与えて WalkSim を進め、更新側の区間を計ったプロファイラを返す
+    profiler = FrameProfiler(window)
+    sim.profiler = profiler
+    try:
+        for buttons in inputs:
+            profiler.start()
+            sim.step(buttons)
+            profiler.lap("update")
+            profiler.count_sim(sim)
+            profiler.end_frame()
+    finally:
+        sim.profiler = None
+    return profiler
+
+
+if __name__ == "__main__":
+    # リプレイを画面なしで再生して区間ごとの時間を表示する（2 つ目の引数があれば CSV にも書く）
+    from walk_replay import ReplayReader
+
+    with ReplayReader(sys.argv[1]) as reader:
+        profiler = profile_run(reader.new_sim(), reader.inputs(), window=1 << 20)
+    for name, s in profiler.stats().items():
+        if name in SIM_PHASES or name == "frame" or name in COUNTERS:
+            print(f"{name:14} mean {s['mean']:8.1f}  p50 {s['p50']:8.1f}  p99 {s['p99']:8.1f}  max {s['max']:8.1f}")
+    if len(sys.argv) > 2:
+        profiler.write_csv(sys.argv[2])
@@ -0,0 +1,171 @@
+import struct
+import sys
+
+from walk_core import WalkSim
+
+# リプレイファイルの形式
+#   ヘッダ: MAGIC, バージョン(u8), シード(u64), キーフレーム間隔(u32), レベルのハッシュ(20 bytes), レベルの名前の長さ(u16)
+#           + レベルの名前（UTF-8。levels/ の名前かファイルのパス。レベルなしなら空でハッシュは 0）
+#   以降はブロックの並び: 種類(1 byte) + 長さ(u32) + 中身
+#     b"F": 入力ブロック  先頭フレーム番号(u32) + 1 フレーム 1 byte の入力ビットマスク
+#     b"K": キーフレーム  フレーム番号(u32) + そのフレームの入力を処理する前の状態
+# 先頭から順に読めばよいので、長いリプレイでも全体をメモリに載せずに再生できる
+MAGIC = b"DGRP"
+VERSION = 5
+HEADER = struct.Struct("<4sBQI20sH")
+BLOCK = struct.Struct("<cI")
+FRAME = struct.Struct("<I")
+
+BLOCK_INPUT = b"F"
+BLOCK_KEYFRAME = b"K"
+
+
+class ReplayWriter:
+    # WalkSim に渡した入力を 1 フレームずつ書き出す
+    # block_size フレームごとにファイルへ書き、keyframe_interval フレームごとに状態も保存する
+
+    # level は walk_level.load_level で読んだレベル（再生するときに同じレベルで WalkSim を作る）
+
+    def __init__(self, file, seed, keyframe_interval=600, block_size=60, level=None):
+        self.file = open(file, "wb") if isinstance(file, str) else file
+        self.keyframe_interval = keyframe_interval
+        self.block_size = block_size
+        self.pending = bytearray()
+        self.pending_start = 0
+        name = b"" if level is None else level.source.encode()
+        level_hash = bytes(20) if level is None else bytes.fromhex(level.hash)
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, keyframe_interval, level_hash, len(name)) + name)
+
+    def record(self, sim, buttons):
+        # sim.step(buttons) の直前に呼ぶ
+        frame = sim.frame_count
+        if self.keyframe_interval and frame > 0 and frame % self.keyframe_interval == 0:
+            self.flush()
+            self._write_block(BLOCK_KEYFRAME, FRAME.pack(frame) + sim.snapshot())
+        if not self.pending:
+            self.pending_start = frame
+        self.pending.append(buttons)
+        if len(self.pending) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self._write_block(BLOCK_INPUT, FRAME.pack(self.pending_start) + self.pending)
+            self.pending = bytearray()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def _write_block(self, kind, payload):
+        self.file.write(BLOCK.pack(kind, len(payload)))
+        self.file.write(payload)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayReader:
+    def __init__(self, file):
+        self.file = open(file, "rb") if isinstance(file, str) else file
+        head = self.file.read(HEADER.size)
+        if len(head) < HEADER.size or head[:4] != MAGIC:
+            raise ValueError("not a replay file")
+        magic, version, self.seed, self.keyframe_interval, level_hash, name_length = HEADER.unpack(head)
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version: {version}")
+        self.level_name = self.file.read(name_length).decode() or None  # 記録したときのレベル（なければ None）
+        self.level_hash = level_hash.hex()
+        self.level = None
+        self.data_start = self.file.tell()
+
+    def load_level(self):
+        # 記録したときのレベルを読む（レベルなしなら None）。中身が変わっていたら同じ走りにならないのでエラー
+        if self.level_name is not None and self.level is None:
+            from walk_level import load_level
+            level = load_level(self.level_name)
+            if level.hash != self.level_hash:
+                raise ValueError(f"level {self.level_name} has changed since the replay was recorded")
+            self.level = level
+        return self.level
+
+    def new_sim(self):
+        # 記録したときと同じシードとレベルの、最初の WalkSim
+        level = self.load_level()
+        return WalkSim(self.seed) if level is None else level.new_sim(self.seed)
+
+    def _blocks(self, start=None):
+        # (種類, 先頭フレーム番号, 中身の位置, 中身の長さ) を順に返す（中身は読まない）
+        f = self.file
+        f.seek(self.data_start if start is None else start)
+        while True:
+            head = f.read(BLOCK.size)
+            if len(head) < BLOCK.size:
+                return
+            kind, length = BLOCK.unpack(head)
+            frame, = FRAME.unpack(f.read(FRAME.size))
+            pos = f.tell()
+            yield kind, frame, pos, length - FRAME.size
+            f.seek(pos + length - FRAME.size)
+
+    def inputs(self, start=0):
+        # start フレーム目以降の入力を 1 つずつ返す
+        for kind, frame, pos, length in self._blocks():
+            if kind != BLOCK_INPUT or frame + length <= start:
+                continue
+            self.file.seek(pos)
+            data = self.file.read(length)
+            yield from data[max(0, start - frame):]
+
+    def seek(self, frame):
+        # frame フレーム目の入力を処理する直前の WalkSim を返す
+        # 一番近い手前のキーフレームから復元し、残りを入力で進める
+        keyframe = None
+        for kind, start, pos, length in self._blocks():
+            if kind != BLOCK_KEYFRAME:
+                continue
+            if start > frame:
+                break
+            keyframe = pos, length
+        sim = self.new_sim()
+        if keyframe is not None:
+            pos, length = keyframe
+            self.file.seek(pos)
+            sim.restore(self.file.read(length))
+        if sim.frame_count < frame:
+            for buttons in self.inputs(sim.frame_count):
+                sim.step(buttons)
+                if sim.frame_count >= frame:
+                    break
+        return sim
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def play(file, start=0):
+    # リプレイを最後まで画面なしで再生し、終わった時点の WalkSim を返す
+    with ReplayReader(file) as reader:
+        sim = reader.seek(start)
+        for buttons in reader.inputs(sim.frame_count):
+            sim.step(buttons)
+        return sim
+
+
+if __name__ == "__main__":
+    sim = play(sys.argv[1])
+    print(f"frames: {sim.frame_count}")
+    print(f"progress: {int((sim.progress / sim.max_progress) * 100)}%")
+    print(f"cleared: {sim.is_cleared}")
+    print(f"game over: {sim.game_over_reason or '-'}")
@@ -0,0 +1,364 @@
+import math
+
+# スプライトの透明色（どのスプライトにも使っていない色）
+COLKEY = 15
+
+# pyxel の既定のパレット（0xRRGGBB）
+PALETTE = (
+    0x000000, 0x2B335F, 0x7E2072, 0x19959C, 0x8B4852, 0x395C98, 0xA9C1FF, 0xEEEEEE,
+    0xD4186C, 0xD38441, 0xE9C35B, 0x70C6A9, 0x7696DE, 0xA3A3A3, 0xFF9798, 0xEDC7B0,
+)
+
+
+# 各スプライトの描き方（g は pyxel か pyxel.Image。x, y は描画位置の基準点）
+
+def draw_title_dog(g, center_x, center_y, view):
+    # とがった耳（常に表示）
+    # 左耳
+    g.tri(
+        center_x - 7, center_y - 2,  # 耳の付け根左
+        center_x - 4, center_y - 2,  # 耳の付け根右
+        center_x - 5, center_y - 8,  # 耳の先端
+        4  # 茶色
+    )
+    # 右耳
+    g.tri(
+        center_x + 4, center_y - 2,  # 耳の付け根左
+        center_x + 7, center_y - 2,  # 耳の付け根右
+        center_x + 5, center_y - 8,  # 耳の先端
+        4  # 茶色
+    )
+
+    # 回転に応じて犬の見た目を変更
+    if view == 0:  # 正面
+        # 通常の犬
+        g.circ(center_x, center_y, 6, 4)
+        g.pset(center_x - 2, center_y - 2, 0)  # 左目
+        g.pset(center_x + 2, center_y - 2, 0)  # 右目
+        g.pset(center_x, center_y + 1, 0)      # 鼻
+    elif view == 1:  # 右向き
+        g.circ(center_x, center_y, 6, 4)
+        g.pset(center_x + 3, center_y - 2, 0)  # 目
+        g.pset(center_x + 4, center_y, 0)      # 鼻
+    elif view == 2:  # 後ろ
+        g.circ(center_x, center_y, 6, 4)
+    else:  # 左向き
+        g.circ(center_x, center_y, 6, 4)
+        g.pset(center_x - 3, center_y - 2, 0)  # 目
+        g.pset(center_x - 4, center_y, 0)      # 鼻
+
+
+def draw_dog(g, x, y, variant):
+    dog_color, lit = variant
+    height = 12
+    # とがった耳の描画
+    # 左耳
+    g.tri(
+        x + 1, y + 4,     # 耳の付け根左
+        x + 4, y + 4,     # 耳の付け根右
+        x + 2, y - 2,     # 耳の先端
+        dog_color
+    )
+    # 右耳
+    g.tri(
+        x + 8, y + 4,     # 耳の付け根左
+        x + 11, y + 4,    # 耳の付け根右
+        x + 10, y - 2,    # 耳の先端
+        dog_color
+    )
+    g.tri(
+        x - 1, y + height//2,     # 右
+        x - 4, y + height//2 - 2, # 上
+        x - 4, y + height//2 + 2, # 下
+        dog_color
+    )
+
+    # 犬の本体
+    g.circ(x + 6, y + 6, 6, dog_color)
+
+    # 懐中電灯の光を表現（効果中のみ）
+    if lit:
+        g.tri(
+            x + 6,     y - 2,  # 下部中央
+            x + 3,     y - 6,  # 左上
+            x + 9,     y - 6,  # 右上
+            10  # 黄色
+        )
+
+    # 目と鼻
+    g.pset(x + 6 - 2, y + 6 - 2, 0)  # 左目
+    g.pset(x + 6 + 2, y + 6 - 2, 0)  # 右目
+    g.pset(x + 6, y + 6 + 1, 0)      # 鼻
+
+
+def draw_ghost(g, x, y):
+    # ゴースト（前の走りの犬）: 犬の形を白っぽい色で描き、市松模様に抜いて半透明に見せる
+    draw_dog(g, x, y, (13, False))
+    for dy in range(-6, 13):
+        for dx in range(-4, 13):
+            if (dx + dy) % 2:
+                g.pset(x + dx, y + dy, COLKEY)
+    g.pset(x + 6 - 2, y + 6 - 2, 0)  # 目は抜かない
+    g.pset(x + 6 + 2, y + 6 - 2, 0)
+
+
+def draw_tree(g, x, y):
+    # 障害物（クリスマスツリー風の木）
+    # 葉（緑の三角形）- より大きく
+    g.tri(
+        x + 6, y - 4,      # 頂点（上に伸ばす）
+        x - 2, y + 12,     # 左下（左に広げる）
+        x + 14, y + 12,    # 右下（右に広げる）
+        11                  # 暗い緑
+    )
+
+    # 内側の三角（明るい緑）- より大きく
+    g.tri(
+        x + 6, y,          # 頂点
+        x + 1, y + 10,     # 左下
+        x + 11, y + 10,    # 右下
+        11                 # 明るい緑
+    )
+
+    # 幹（茶色の長方形）- 細長く調整
+    trunk_width = 4  # 幅を細く
+    trunk_height = 8  # 高さを高く
+    trunk_x = x + 5  # 中心に配置
+    trunk_y = y + 13  # 少し下に移動
+    g.rect(trunk_x, trunk_y, trunk_width, trunk_height, 4)
+
+
+def draw_trash_bag(g, x, y):
+    # ゴミ袋（丸みのあるデザイン）
+    size = 12
+
+    # メインの袋部分（楕円形）
+    g.circ(x + size//2, y + size//2, size//2, 6)  # 基本形（薄い灰色）
+
+    # 上部の結び目（小さな楕円）
+    g.circ(x + size//2, y + 2, 2, 7)  # 白色
+
+    # 影の表現（より暗い部分）
+    g.circb(x + size//2, y + size//2, size//2 - 1, 5)  # 輪郭（濃い灰色）
+
+    # 光の反射（ハイライト）
+    g.pset(x + size//2 - 2, y + size//2 - 2, 7)  # 白い点
+
+
+def draw_power_item(g, x, y):
+    size = 12
+    g.circ(x + size//2, y + size//2, 4, 10)  # 黄色い星
+    g.circb(x + size //2, y + size//2, 4, 7)  # 白い縁取り
+
+
+def draw_flashlight_item(g, x, y):
+    g.rect(x - 3, y - 2, 6, 4, 7)  # 本体
+    g.rect(x + 3, y - 1, 2, 2, 10) # 電球部分
+    g.circb(x + 4, y, 3, 10)    # 白い縁取り
+
+
+def draw_bullet(g, x, y):
+    # 大きな弾
+    g.rect(x, y, 8, 12, 8)
+    g.rect(x + 1, y + 1, 6, 10, 14)
+
+
+# 毎フレーム同じ見た目の部分（背景・ゲージの枠・家のアイコン）も 1 回の blt で描けるように焼いておく
+
+def draw_background(g, x, y, variant):
+    # 背景とレーンを区切る線（3:明るい緑の昼は 10、1:暗い緑の夜は 0 の線）
+    # variant は (背景色, 線の x の並び)。普通のレベルの線は左端・20・60・100・140・右端
+    bg_color, lines = variant
+    lane_color = 10 if bg_color == 3 else 0
+    g.rect(x, y, 160, 120, bg_color)
+    for line_x in lines:
+        g.rect(x + line_x, y, 2, 120, lane_color)
+
+
+def draw_gauge_frame(g, x, y, label):
+    # ゲージの名前と白い背景（中身は毎フレーム描く）
+    g.text(x, y, label, 7)
+    g.rect(x, y + 10, 100, 8, 7)
+
+
+def draw_progress_frame(g, x, y):
+    # 進行度ゲージの枠（x, y はゲージの中身の左上）
+    g.rect(x - 2, y - 2, 14, 84, 7)  # 白い縁取り
+    g.rect(x, y, 10, 80, 1)  # 暗い背景
+
+
+def draw_house(g, x, y):
+    # 屋根（茶色）
+    g.tri(x, y + 8,
+          x + 7, y,
+          x + 14, y + 8, 4)
+
+    # 本体（白）
+    g.rect(x + 2, y + 8, 10, 10, 7)
+
+    # ドア（茶色）
+    g.rect(x + 6, y + 12, 3, 6, 4)
+    # ドアノブ（黄色）
+    g.pset(x + 7, y + 15, 10)
+
+
+# うんちの層（大きさの倍率, 基準点からの y の倍率）
+POOP_LAYERS = (
+    (1.0, 0.0),
+    (0.85, -0.4),
+    (0.7, -0.8),
+    (0.5, -1.1),
+)
+
+# うんちの弾み sin(frame * 0.2) * 2 の表（157 フレームでほぼ 5 周期なので繰り返して使う）
+POOP_BOUNCE = tuple(math.sin(i * 0.2) * 2 for i in range(157))
+
+
+def poop_bounce(frame):
+    return POOP_BOUNCE[frame % len(POOP_BOUNCE)]
+
+
+def draw_poop(g, poop_x, poop_y, size):
+    # 層を描画
+    for size_factor, y_factor in POOP_LAYERS:
+        layer_size = size * size_factor
+        layer_y = poop_y + size * y_factor
+
+        # メインカラー（茶色）
+        g.circ(poop_x, layer_y, layer_size, 4)
+
+        # 左側の影（暗い茶色）
+        g.circ(poop_x - layer_size * 0.3, layer_y, layer_size * 0.6, 2)
+
+        # 右側のハイライト（明るい茶色）
+        g.circ(poop_x + layer_size * 0.3, layer_y, layer_size * 0.4, 9)
+
+    # トップの装飾（渦巻き効果）
+    top_y = poop_y - size * 1.1
+    spiral_size = size * 0.3
+    g.circ(poop_x, top_y, spiral_size, 4)
+    g.circ(poop_x + spiral_size * 0.5,
+           top_y - spiral_size * 0.5,
+           spiral_size * 0.7, 4)
+
+
+def poop_box(size):
+    # うんちの描画範囲（基準点からの左上オフセットと幅・高さ）
+    r = math.ceil(size) + 1
+    top = math.ceil(size * 1.6) + 1
+    return -r, -top, 2 * r + 1, top + r + 1
+
+
+# 種類 -> (描き方, 基準点からの左上オフセット x, y, 幅, 高さ, 色などの違いを描き方に渡すか)
+SPRITES = {
+    "title_dog": (draw_title_dog, -7, -8, 15, 15, True),
+    "dog": (draw_dog, -4, -6, 17, 19, True),
+    "ghost": (draw_ghost, -4, -6, 17, 19, False),
+    "tree": (draw_tree, -2, -4, 17, 25, False),
+    "trash_bag": (draw_trash_bag, 0, 0, 13, 13, False),
+    "power_item": (draw_power_item, 2, 2, 9, 9, False),
+    "flashlight_item": (draw_flashlight_item, -3, -3, 11, 7, False),
+    "bullet": (draw_bullet, 0, 0, 8, 12, False),
+    "gauge_frame": (draw_gauge_frame, 0, 0, 100, 18, True),
+    "progress_frame": (draw_progress_frame, -2, -2, 14, 84, False),
+    "house": (draw_house, 0, 0, 15, 18, False),
+}
+
+# 画面の大きさの層（スプライトとは別のイメージバンクに焼く）
+LAYERS = {
+    "background": (draw_background, 0, 0, 160, 120, True),
+}
+
+# 普通のレベルのレーンを区切る線の x（WalkSim.lane_lines の初期値）
+LANE_LINES = (0, 20, 60, 100, 140, 158)
+
+# 起動時に焼いておくもの（種類, 色などの違い, 大きさ）
+PRELOAD = (
+    [("title_dog", view, 0) for view in range(4)]
+    + [("dog", (color, lit), 0) for color in (4, 10) for lit in (False, True)]
+    + [(kind, 0, 0) for kind in ("tree", "trash_bag", "power_item", "flashlight_item", "bullet", "ghost")]
+    + [("poop", 0, size) for size in range(2, 9)]
+    + [("gauge_frame", label, 0) for label in ("Poop Meter", "Stamina")]
+    + [("progress_frame", 0, 0), ("house", 0, 0)]
+    + [("background", (3, LANE_LINES), 0)]
+)
+
+
+class SpriteCache:
+    # スプライトを一度だけイメージバンクに描いておき、毎フレームは blt 1 回で描く
+    # キーは (種類, 色などの違い, 大きさ)
+    # bank はイメージバンクの番号か、焼き込み先の pyxel.Image（画面なしで描くとき）
+    # 画面の大きさの層は layer_bank に焼く（省略すると番号なら次の番号、画像なら同じ大きさの新しい画像）
+
+    def __init__(self, gfx, bank=0, layer_bank=None):
+        self.gfx = gfx
+        if layer_bank is None:
+            layer_bank = bank + 1 if isinstance(bank, int) else type(bank)(bank.width, bank.height)
+        self.banks = (bank, layer_bank)
+        self.images = tuple(gfx.images[b] if isinstance(b, int) else b for b in self.banks)
+        self.cache = {}
+        self.lighting = None  # 夜の明かり（walk_light.Lighting。夜になって初めて要るときに draw_scene が作る）
+        # 棚詰めで左上から空き場所を割り当てる（イメージごとに [x, y, 棚の高さ]）
+        self.shelves = ([0, 0, 0], [0, 0, 0])
+        for kind, variant, size in PRELOAD:
+            self.get(kind, variant, size)
+        # うんちは数が多くなるので大きさごとのスプライトを直接引く
+        self.poops = {size: self.get("poop", 0, size) for size in range(2, 9)}
+
+    def get(self, kind, variant=0, size=0):
+        key = (kind, variant, size)
+        sprite = self.cache.get(key)
+        if sprite is None:
+            sprite = self.cache[key] = self.bake(kind, variant, size)
+        return sprite
+
+    def bake(self, kind, variant, size):
+        if kind == "poop":
+            draw = draw_poop
+            ox, oy, w, h = poop_box(size)
+            args = (size,)
+        else:
+            draw, ox, oy, w, h, uses_variant = SPRITES[kind] if kind in SPRITES else LAYERS[kind]
+            args = (variant,) if uses_variant else ()
+        which = 1 if kind in LAYERS else 0
+        image = self.images[which]
+        try:
+            u, v = self.allocate(which, w, h)
+        except RuntimeError:
+            if which == 0:
+                raise
+            # 層のバンクは 2 枚でいっぱいになるので、入らなければ焼いた層を捨てて最初から使う
+            # （レーンの並びが違うレベルに変わったときだけ起きる）
+            for key in [key for key in self.cache if key[0] in LAYERS]:
+                del self.cache[key]
+            self.shelves[1][:] = [0, 0, 0]
+            u, v = self.allocate(which, w, h)
+        image.rect(u, v, w, h, COLKEY)
+        draw(image, u - ox, v - oy, *args)
+        return self.banks[which], u, v, w, h, ox, oy
+
+    def allocate(self, which, w, h):
+        image = self.images[which]
+        shelf = self.shelves[which]
+        if shelf[0] + w > image.width:
+            shelf[0] = 0
+            shelf[1] += shelf[2]
+            shelf[2] = 0
+        if shelf[1] + h > image.height:
+            raise RuntimeError("sprite bank is full")
+        u, v = shelf[0], shelf[1]
+        shelf[0] += w
+        shelf[2] = max(shelf[2], h)
+        return u, v
+
+    def blt(self, kind, x, y, variant=0, size=0):
+        bank, u, v, w, h, ox, oy = self.get(kind, variant, size)
+        self.gfx.blt(x + ox, y + oy, bank, u, v, w, h, COLKEY)
+
+    def blt_poops(self, poops, dy=0):
+        # (x, y, 大きさ) の並びをまとめて描く（フレームごとの辞書やキーは作らない）
+        blt = self.gfx.blt
+        sprites = self.poops
+        for x, y, size in poops:
+            bank, u, v, w, h, ox, oy = sprites[size]
+            blt(x + ox, y + dy + oy, bank, u, v, w, h, COLKEY)
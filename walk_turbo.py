@@ -0,0 +1,97 @@
+import argparse
+import sys
+from itertools import chain, repeat
+from time import perf_counter
+
+from walk_bots import POLICIES, policy_inputs
+from walk_core import BTN_S, WalkSim
+from walk_level import load_level
+from walk_replay import ReplayReader
+
+# 画面なしで 1 回のプレイを最後（クリア画面かゲームオーバー）まで最速で進める
+# 何百ものシードを数秒で確認するためのもの
+
+
+def title_script():
+    # スクリプト入力: タイトルで S を押し、あとは何も押さない（犬は壁で跳ね返りながら進む）
+    return chain((BTN_S,), repeat(0))
+
+
+def is_finished(sim):
+    return sim.game_over or sim.show_clear_screen
+
+
+def run_to_end(sim, inputs, max_ticks=100000, done=is_finished):
+    # inputs が尽きたら何も押さずに進める。進めたステップ数を返す
+    step = sim.step
+    ticks = 0
+    for buttons in chain(inputs, repeat(0)):
+        if ticks >= max_ticks or done(sim):
+            break
+        step(buttons)
+        ticks += 1
+    return ticks
+
+
+def outcome(sim):
+    if sim.is_cleared:
+        return "cleared"
+    if sim.game_over:
+        return sim.game_over_reason
+    return "unfinished"
+
+
+def report(seed, sim, ticks, elapsed):
+    progress = int((sim.progress / sim.max_progress) * 100)
+    rate = ticks / elapsed if elapsed > 0 else float("inf")
+    print(f"seed {seed}: {outcome(sim)}  progress {progress}%  "
+          f"ticks {ticks}  {rate:,.0f} ticks/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="画面なしで最後まで最速でプレイする")
+    parser.add_argument("--replay", metavar="FILE", help="リプレイファイルの入力で進める")
+    parser.add_argument("--seeds", default="0", help="シードの範囲（例: 0:100）。--replay のときは無視")
+    parser.add_argument("--policy", choices=sorted(POLICIES), help="スクリプト入力の代わりに自動プレイヤーで進める")
+    parser.add_argument("--max-ticks", type=int, default=100000)
+    parser.add_argument("--level", help="levels/ のレベル名かレベルのファイル（--replay のときは記録したものを使う）")
+    parser.add_argument("-q", "--quiet", action="store_true", help="合計だけ表示する")
+    args = parser.parse_args(argv)
+
+    if args.replay is not None:
+        runs = [(ReplayReader(args.replay), None)]
+    else:
+        start, _, stop = args.seeds.partition(":")
+        seeds = range(int(start), int(stop)) if stop else [int(start)]
+        runs = [(None, seed) for seed in seeds]
+
+    level = None if args.level is None else load_level(args.level)
+    total_ticks = 0
+    total_time = 0.0
+    for reader, seed in runs:
+        if reader is not None:
+            # シードとレベルはリプレイに記録したもの
+            seed = reader.seed
+            sim = reader.new_sim()
+            inputs = reader.inputs()
+        else:
+            sim = WalkSim(seed) if level is None else level.new_sim(seed)
+            if args.policy is not None:
+                inputs = policy_inputs(sim, POLICIES[args.policy](seed))
+            else:
+                inputs = title_script()
+        t0 = perf_counter()
+        ticks = run_to_end(sim, inputs, args.max_ticks)
+        elapsed = perf_counter() - t0
+        if reader is not None:
+            reader.close()
+        total_ticks += ticks
+        total_time += elapsed
+        if not args.quiet:
+            report(seed, sim, ticks, elapsed)
+    print(f"{len(runs)} runs, {total_ticks} ticks in {total_time:.3f}s "
+          f"({total_ticks / total_time if total_time else 0:,.0f} ticks/s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
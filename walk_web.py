@@ -0,0 +1,5 @@
+from dog_test import WalkGame
+
+# ブラウザ版の起動スクリプト（index.html から動かす。walk_build.py で dog_game.pyxapp にも入れる）
+# ブラウザでは保存したファイルが残らないので、ゴーストは使わない
+WalkGame(ghosts=False)